@@ -3,6 +3,27 @@ ASGI config for ccna_exam project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Opcional: el despliegue por defecto es WSGI con workers síncronos
+(docker-compose.yml) y las vistas son síncronas. Medido con benchmark_api
+sobre Postgres 16 y el pool de psycopg 3 (4 workers, 32 clientes; detalle en
+benchmarks/api.json):
+
+                  WSGI, vistas sync   WSGI, vistas async   ASGI, vistas async
+    check-answer  340 req/s           200 req/s            108 req/s
+    questions     143 req/s           106 req/s             68 req/s
+
+En Django 5.2 el ORM asíncrono todavía corre cada consulta con sync_to_async, así
+que el event loop no ahorra nada y suma su propio costo (bajo WSGI, además, cada
+vista async pasa por async_to_sync). Conviene volver a medir antes de activarlo,
+por ejemplo si muchos clientes lentos ocupan los workers síncronos:
+
+    gunicorn ccna_exam.asgi:application -k uvicorn_worker.UvicornWorker --workers 4
+
+Bajo ASGI Django corre las vistas síncronas en un hilo. Las conexiones salen
+del pool configurado en settings.DATABASES (DB_POOL_MAX_SIZE por worker, así
+que el total es workers × DB_POOL_MAX_SIZE y debe caber en max_connections de
+Postgres).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,6 +26,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'questions.instrumentation.InstrumentationMiddleware',  # Primero: mide la petición completa (ver instrumentation.py)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,7 +40,7 @@ ROOT_URLCONF = 'ccna_exam.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'questions.instrumentation.TimedDjangoTemplates',  # DjangoTemplates + tiempo de render por petición
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -53,10 +54,16 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'ccna_exam.wsgi.application'
+ASGI_APPLICATION = 'ccna_exam.asgi.application'  # Opcional: hoy es más lento que WSGI (ver asgi.py)
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Pool de conexiones de psycopg 3 (psycopg_pool), también bajo WSGI: en
+# check-answer dio 296 req/s frente a 260 con DB_POOL=False, que vuelve a las
+# conexiones persistentes por hilo (CONN_MAX_AGE).
+
+DB_POOL = config('DB_POOL', default=True, cast=bool)
 
 DATABASES = {
     'default': {
@@ -66,10 +73,36 @@ DATABASES = {
         'HOST': config('POSTGRES_HOST', default='127.0.0.1'),
         'PORT': config('POSTGRES_PORT', default='5432'),
         'PASSWORD': config('POSTGRES_PASSWORD', default='ccna_password'),
+        # Con el pool las conexiones ya se reutilizan: Django exige CONN_MAX_AGE = 0
+        'CONN_MAX_AGE': 0 if DB_POOL else config('CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,  # Descarta conexiones caídas antes de usarlas
+        'OPTIONS': {
+            'pool': {
+                'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+                'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),  # Por proceso de gunicorn
+                'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),  # Segundos esperando una conexión libre
+            },
+        } if DB_POOL else {},
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Con varios workers de gunicorn conviene un backend compartido (Redis/Memcached)
+# para no repetir el trabajo cacheado en cada proceso. La versión del banco no
+# depende de la caché: cada proceso la relee de la base cada BANK_VERSION_TTL.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='ccna-exam'),
+    }
+}
+
+BANK_VERSION_TTL = config('BANK_VERSION_TTL', default=2.0, cast=float)  # Segundos que un proceso reutiliza la versión leída (ver bank_version.py)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -121,3 +154,59 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # Carpeta donde están las imágen
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Carga de preguntas desde CSV
+CSV_IMPORT_BATCH_SIZE = config('CSV_IMPORT_BATCH_SIZE', default=500, cast=int)  # Filas por bulk_create/bulk_update
+CSV_PREVIEW_CHUNK_SIZE = config('CSV_PREVIEW_CHUNK_SIZE', default=2000, cast=int)  # NP por consulta in_bulk en la vista previa
+CSV_MAX_REPORTED_ERRORS = config('CSV_MAX_REPORTED_ERRORS', default=10, cast=int)  # Errores de validación mostrados como máximo
+CSV_STAGING_TTL_MINUTES = config('CSV_STAGING_TTL_MINUTES', default=60, cast=int)  # Vigencia de una carga pendiente de confirmar
+CSV_PREVIEW_PAGE_SIZE = config('CSV_PREVIEW_PAGE_SIZE', default=50, cast=int)  # Cambios por página en la confirmación
+
+
+# Exámenes: cantidad de preguntas muestreadas por modo (0 = todo el banco)
+EXAM_SIZES = {
+    'selection': config('EXAM_SIZE_SELECTION', default=100, cast=int),  # Simulación CCNA
+    'study': config('EXAM_SIZE_STUDY', default=100, cast=int),
+    'practice': config('EXAM_SIZE_PRACTICE', default=100, cast=int),
+}
+
+
+# Variantes optimizadas de media/images (manage.py optimize_images)
+IMAGE_VARIANT_WIDTHS = config('IMAGE_VARIANT_WIDTHS', default='480,960,1440', cast=Csv(int))  # Anchos para srcset (además del original)
+IMAGE_AVIF_QUALITY = config('IMAGE_AVIF_QUALITY', default=55, cast=int)
+IMAGE_WEBP_QUALITY = config('IMAGE_WEBP_QUALITY', default=80, cast=int)
+
+# Fragmentos HTML por pregunta (estudio/práctica); la clave ya cambia con cada edición
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)  # segundos
+EXAM_CACHE_TIMEOUT = config('EXAM_CACHE_TIMEOUT', default=60 * 60, cast=int)  # Orden muestreado de cada examen
+EXAM_RETENTION_DAYS = config('EXAM_RETENTION_DAYS', default=30, cast=int)  # Días que se guarda la lista de preguntas de un examen emitido
+
+# API JSON de preguntas (práctica incremental)
+QUESTIONS_API_PAGE_SIZE = config('QUESTIONS_API_PAGE_SIZE', default=20, cast=int)  # También la primera página incrustada en la práctica
+QUESTIONS_API_MAX_PAGE_SIZE = config('QUESTIONS_API_MAX_PAGE_SIZE', default=100, cast=int)
+SEARCH_MAX_QUERY_LENGTH = config('SEARCH_MAX_QUERY_LENGTH', default=200, cast=int)  # Caracteres de q en api/search/
+PRACTICE_CLIENT_VERIFY = config('PRACTICE_CLIENT_VERIFY', default=True, cast=bool)  # Veredicto local con resúmenes HMAC (ver answer_digests.py)
+CHECK_ANSWERS_MAX_ITEMS = config('CHECK_ANSWERS_MAX_ITEMS', default=50, cast=int)  # Respuestas por petición a api/check-answers/
+
+# Registro de intentos (questions/attempts.py): búfer en memoria escrito en lotes
+ATTEMPT_LOG = config('ATTEMPT_LOG', default=True, cast=bool)  # Guardar las respuestas de práctica y examen
+ATTEMPT_BUFFER_SIZE = config('ATTEMPT_BUFFER_SIZE', default=200, cast=int)  # Intentos pendientes que disparan un bulk_create
+ATTEMPT_FLUSH_SECONDS = config('ATTEMPT_FLUSH_SECONDS', default=5.0, cast=float)  # Espera máxima de un intento en el búfer
+ATTEMPT_BUFFER_MAX = config('ATTEMPT_BUFFER_MAX', default=20000, cast=int)  # Tope si la base no responde (se descartan los más viejos)
+ROLLUP_SAFETY_SECONDS = config('ROLLUP_SAFETY_SECONDS', default=60, cast=int)  # El rollup no suma intentos escritos hace menos (commits tardíos)
+REVIEW_BATCH_SIZE = config('REVIEW_BATCH_SIZE', default=20, cast=int)  # Preguntas vencidas por sesión de repaso (ver reviews.py)
+
+
+# Instrumentación por petición (questions/instrumentation.py, /metrics)
+SERVER_TIMING = config('SERVER_TIMING', default=True, cast=bool)  # Cabecera Server-Timing con app/db/tpl
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', default=1000, cast=int)  # Registrar peticiones más lentas con su SQL (0 = nunca)
+SLOW_REQUEST_MAX_SQL = config('SLOW_REQUEST_MAX_SQL', default=50, cast=int)  # Sentencias SQL guardadas por petición
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1', cast=Csv())  # Quién puede leer /metrics ('*' = todos)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'questions': {'handlers': ['console'], 'level': config('LOG_LEVEL', default='INFO'), 'propagate': False}},
+}
@@ -3,4 +3,7 @@
 # Ejecutar las migraciones
 python manage.py makemigrations --noinput
 python manage.py migrate --noinput
+
+# Generar las variantes AVIF/WebP de las imágenes nuevas o modificadas
+python manage.py optimize_images
 python manage.py createsuperuser --username admin --password admin --email admin@admin.com
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""
+Configuración que gunicorn carga sola desde el directorio de trabajo.
+
+Con PROMETHEUS_MULTIPROC_DIR cada worker escribe sus métricas en archivos de
+esa carpeta y /metrics las suma (questions/instrumentation.py). La carpeta se
+vacía al arrancar para no mezclar datos de una ejecución anterior, y los
+archivos de un worker que termina se marcan como muertos. Al salir, cada worker
+escribe los intentos que tenga en su búfer (questions/attempts.py).
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    # Intentos todavía en el búfer del worker (questions/attempts.py)
+    from questions import attempts
+    attempts.flush()
@@ -1,8 +1,48 @@
 from django.contrib import admin
-from .models import SingleChoiceQuestion, MultipleChoiceQuestion, DragAndDropQuestion
+from django.db.models import OuterRef, Q, Subquery
+from .forms import MultipleChoiceQuestionForm, SingleChoiceQuestionForm
+from .models import SingleChoiceQuestion, MultipleChoiceQuestion, DragAndDropQuestion, Attempt, QuestionStats
+from .read_model import QUESTION_TYPES
+from .search import search_questions
 
-class SingleChoiceQuestionAdmin(admin.ModelAdmin):
-    list_display = ('text_preview', 'answer', 'has_image', 'image_filename')
+class FullTextSearchMixin:
+    """
+    La caja de búsqueda usa el índice de texto completo (search.py: texto y
+    opciones) en lugar de ILIKE sobre search_fields; image_filename se busca exacto.
+    """
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        matches = search_questions(term, [QUESTION_TYPES[self.model]]).values('question_id')
+        return queryset.filter(Q(pk__in=matches) | Q(image_filename=term)), False
+
+class QuestionStatsMixin:
+    """
+    Columnas ordenables de dificultad: leen el acumulado de QuestionStats
+    (rollup_attempts), nunca el historial de intentos.
+    """
+    def get_queryset(self, request):
+        stats = QuestionStats.objects.filter(question_type=QUESTION_TYPES[self.model], question_id=OuterRef('pk'))
+        return super().get_queryset(request).annotate(
+            stats_attempts=Subquery(stats.values('attempts')[:1]),
+            stats_correct_rate=Subquery(stats.values('correct_rate')[:1]),
+        )
+
+    def attempts_count(self, obj):
+        return obj.stats_attempts or 0
+    attempts_count.short_description = 'Intentos'
+    attempts_count.admin_order_field = 'stats_attempts'
+
+    def correct_rate(self, obj):
+        return '—' if obj.stats_correct_rate is None else f'{obj.stats_correct_rate:.0%}'
+    correct_rate.short_description = '% acierto'
+    correct_rate.admin_order_field = 'stats_correct_rate'
+
+class SingleChoiceQuestionAdmin(QuestionStatsMixin, FullTextSearchMixin, admin.ModelAdmin):
+    form = SingleChoiceQuestionForm  # Casillas por letra en lugar de correct_mask/answer
+    readonly_fields = ('answer',)
+    list_display = ('text_preview', 'answer', 'has_image', 'image_filename', 'attempts_count', 'correct_rate')
     list_filter = ('has_image',)
     search_fields = ('text', 'image_filename')
     
@@ -10,8 +50,10 @@ class SingleChoiceQuestionAdmin(admin.ModelAdmin):
         return obj.text[:50] + "..." if len(obj.text) > 50 else obj.text
     text_preview.short_description = 'Pregunta'
 
-class MultipleChoiceQuestionAdmin(admin.ModelAdmin):
-    list_display = ('text_preview', 'answer', 'has_image', 'image_filename')
+class MultipleChoiceQuestionAdmin(QuestionStatsMixin, FullTextSearchMixin, admin.ModelAdmin):
+    form = MultipleChoiceQuestionForm  # Casillas por letra en lugar de correct_mask/answer
+    readonly_fields = ('answer',)
+    list_display = ('text_preview', 'answer', 'has_image', 'image_filename', 'attempts_count', 'correct_rate')
     list_filter = ('has_image',)
     search_fields = ('text', 'image_filename')
     
@@ -19,7 +61,7 @@ class MultipleChoiceQuestionAdmin(admin.ModelAdmin):
         return obj.text[:50] + "..." if len(obj.text) > 50 else obj.text
     text_preview.short_description = 'Pregunta'
 
-class DragAndDropQuestionAdmin(admin.ModelAdmin):
+class DragAndDropQuestionAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('text_preview', 'has_image', 'image_filename')
     list_filter = ('has_image',)
     search_fields = ('text', 'image_filename')
@@ -28,6 +70,24 @@ class DragAndDropQuestionAdmin(admin.ModelAdmin):
         return obj.text[:50] + "..." if len(obj.text) > 50 else obj.text
     text_preview.short_description = 'Pregunta'
 
+class AttemptAdmin(admin.ModelAdmin):
+    """Sólo lectura: las filas las escribe attempts.py"""
+    list_display = ('created_at', 'question_type', 'question_id', 'chosen', 'correct', 'source')
+    list_filter = ('source', 'question_type', 'correct')
+    date_hierarchy = 'created_at'
+    show_full_result_count = False  # Evita el COUNT(*) completo en una tabla que sólo crece
+
+    def chosen(self, obj):
+        return ', '.join(obj.chosen_letters) or '—'
+    chosen.short_description = 'Elegidas'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 admin.site.register(SingleChoiceQuestion, SingleChoiceQuestionAdmin)
 admin.site.register(MultipleChoiceQuestion, MultipleChoiceQuestionAdmin)
-admin.site.register(DragAndDropQuestion, DragAndDropQuestionAdmin)
\ No newline at end of file
+admin.site.register(DragAndDropQuestion, DragAndDropQuestionAdmin)
+admin.site.register(Attempt, AttemptAdmin)
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""
+Resúmenes firmados de las respuestas para la verificación local en la práctica.
+
+Por cada pregunta se envía HMAC-SHA256(sal de la sesión, "TIPO:id:LETRAS") de
+las letras correctas; practice_exam.js calcula el mismo HMAC con las letras
+elegidas (crypto.subtle) y compara, así el veredicto no espera a la red. La
+sal es por sesión, de modo que un resumen no sirve entre sesiones ni puede
+buscarse en una tabla precalculada.
+
+Esto oculta las respuestas, no las protege: la sal viaja en la página y con
+cinco letras hay sólo 31 combinaciones posibles, así que quien quiera puede
+probarlas todas. Sirve para práctica, nunca para evaluar (la selección sigue
+corrigiéndose en el servidor).
+"""
+import hashlib
+import hmac
+import secrets
+
+SESSION_KEY = 'answer_digest_salt'
+
+
+def answer_digest(salt, qtype, question_id, letters):
+    message = f"{qtype}:{question_id}:{''.join(sorted(letters))}"
+    return hmac.new(salt.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def question_digests(salt, questions):
+    """
+    {'TIPO:question_id': resumen de las letras correctas} para filas de
+    QuestionReadModel (los ids de SINGLE y MULTI pueden repetirse)
+    """
+    return {f'{q.question_type}:{q.question_id}': answer_digest(salt, q.question_type, q.question_id, q.correct_letters) for q in questions}
+
+
+def session_salt(session):
+    """Sal de la sesión; se crea en la primera visita a la práctica"""
+    salt = session.get(SESSION_KEY)
+    if salt is None:
+        salt = session[SESSION_KEY] = secrets.token_hex(16)
+    return salt
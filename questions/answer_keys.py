@@ -0,0 +1,47 @@
+"""
+Almacén precompilado de claves de respuesta para la verificación inmediata.
+
+Cada clave es (question_type, question_id) -> correct_mask (letras correctas
+como bits). Se carga de forma perezosa desde el modelo de lectura (una
+consulta indexada por tipo) y se guarda en la memoria del proceso junto con
+la versión del banco (bank_version); cuando la versión cambia en cualquier
+worker, la primera consulta posterior a BANK_VERSION_TTL la recarga (en el
+proceso que hizo el cambio, la siguiente).
+"""
+import threading
+
+from . import bank_version
+from .models import QuestionReadModel
+
+QUESTION_TYPES = ('SINGLE', 'MULTI')
+
+_lock = threading.Lock()
+_local = {}  # qtype -> (versión del banco, {question_id: correct_mask})
+
+
+def _load(qtype):
+    return dict(QuestionReadModel.objects.filter(question_type=qtype).values_list('question_id', 'correct_mask'))
+
+
+def _keys_for(qtype):
+    stamp = bank_version.current()[0]
+    entry = _local.get(qtype)
+    if entry is None or entry[0] != stamp:
+        with _lock:
+            entry = _local.get(qtype)
+            if entry is None or entry[0] != stamp:
+                entry = (stamp, _load(qtype))
+                _local[qtype] = entry
+    return entry[1]
+
+
+def get_answer_key(qtype, question_id):
+    """Devuelve la máscara de letras correctas o None si la pregunta no existe"""
+    if qtype not in QUESTION_TYPES:
+        return None
+    return _keys_for(qtype).get(question_id)
+
+
+def get_answer_keys(pairs):
+    """Resuelve varias claves a la vez: {(qtype, question_id): máscara o None}"""
+    return {(qtype, qid): get_answer_key(qtype, qid) for qtype, qid in pairs}
@@ -0,0 +1,119 @@
+"""
+Registro de intentos (Attempt) con escritura en lotes.
+
+record() sólo agrega los intentos a un búfer en la memoria del proceso: no
+escribe intentos en la base, así que las vistas no suman latencia (sólo la
+primera vez de un estudiante sin sesión se guarda la sesión, ver reviews.py).
+Un hilo de fondo por proceso escribe el búfer con un bulk_create cuando junta
+ATTEMPT_BUFFER_SIZE intentos o cada ATTEMPT_FLUSH_SECONDS; al terminar el
+proceso (atexit, worker_exit de gunicorn) se escribe lo que quede. Con cada
+lote escrito se actualiza también el repaso espaciado (reviews.schedule).
+
+Si la base no responde, los intentos vuelven al búfer hasta ATTEMPT_BUFFER_MAX;
+pasado ese tope se descartan los más viejos: perder estadísticas es preferible
+a quedarse sin memoria.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from . import reviews
+from .models import Attempt
+
+logger = logging.getLogger(__name__)
+
+# El lock sólo protege operaciones de lista (microsegundos): se puede tomar
+# también desde el event loop sin bloquearlo
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_buffer = []
+_writer = None
+
+
+def record(request, source, graded):
+    """
+    Encola los intentos `graded` = [(question_type, question_id, máscara elegida,
+    correcta)] de la sesión de `request`. source: 'CHECK' | 'EXAM'.
+    """
+    if not settings.ATTEMPT_LOG:
+        return
+    # Con la sesión creada si hacía falta: es la clave del repaso espaciado (reviews.py)
+    session = getattr(request, 'session', None)
+    session_key = reviews.learner_key(session) if session is not None else ''
+    attempts = [
+        Attempt(question_type=qtype, question_id=qid, chosen_mask=mask, correct=correct,
+                source=source, session_key=session_key)
+        for qtype, qid, mask, correct in graded
+    ]
+    if not attempts:
+        return
+    with _lock:
+        _buffer.extend(attempts)
+        _trim()
+        full = len(_buffer) >= settings.ATTEMPT_BUFFER_SIZE
+        _start_writer()
+    if full:
+        _wakeup.set()
+
+
+def flush():
+    """Escribe ya todo lo pendiente; devuelve cuántos intentos se guardaron"""
+    with _lock:
+        batch = _buffer[:]
+        _buffer.clear()
+    if not batch:
+        return 0
+    # Hora de escritura (también en los reintentos): el rollup espera ROLLUP_SAFETY_SECONDS desde aquí
+    recorded_at = timezone.now()
+    for attempt in batch:
+        attempt.recorded_at = recorded_at
+    try:
+        Attempt.objects.bulk_create(batch, batch_size=settings.ATTEMPT_BUFFER_SIZE)
+    except DatabaseError:
+        logger.exception('No se pudieron guardar %d intentos; se reintentará', len(batch))
+        with _lock:
+            _buffer[:0] = batch
+            _trim()
+        return 0
+    try:
+        reviews.schedule(batch)
+    except DatabaseError:
+        # Los intentos ya están guardados: no se reencolan (se duplicarían)
+        logger.exception('No se pudo actualizar el repaso de %d intentos', len(batch))
+    return len(batch)
+
+
+def _trim():
+    overflow = len(_buffer) - settings.ATTEMPT_BUFFER_MAX
+    if overflow > 0:
+        del _buffer[:overflow]
+        logger.warning('Búfer de intentos lleno: se descartaron %d intentos', overflow)
+
+
+def _start_writer():
+    # Se arranca en el primer intento (y de nuevo tras un fork: los hilos no se heredan)
+    global _writer
+    if _writer is None or not _writer.is_alive():
+        _writer = threading.Thread(target=_run, name='attempt-writer', daemon=True)
+        _writer.start()
+
+
+def _run():
+    while True:
+        _wakeup.wait(settings.ATTEMPT_FLUSH_SECONDS)
+        _wakeup.clear()
+        # El hilo tiene su propia conexión: mismo ciclo de vida que en una petición
+        close_old_connections()
+        try:
+            flush()
+        except Exception:
+            logger.exception('Error inesperado escribiendo intentos')
+        finally:
+            close_old_connections()
+
+
+atexit.register(flush)
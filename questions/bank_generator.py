@@ -0,0 +1,116 @@
+"""
+Banco de preguntas sintético para pruebas de carga y benchmarks.
+
+Produce filas con las mismas columnas que el CSV de cargar-csv/ (Question,
+OptionA..E, Answer, question_type, Image, NP, ImageFile) para que entren por
+el mismo camino que una carga real: validación, normalización, upserts por
+lote, modelo de lectura y versión del banco. Con la misma semilla se obtiene
+el mismo banco.
+"""
+import json
+import os
+import random
+
+from django.conf import settings
+from PIL import Image, ImageDraw
+
+from .images import SOURCE_DIR
+
+CSV_COLUMNS = ['NP', 'Question', 'OptionA', 'OptionB', 'OptionC', 'OptionD', 'OptionE', 'Answer', 'question_type', 'Image', 'ImageFile']
+
+TOPICS = [
+    'VLAN', 'trunk 802.1Q', 'STP', 'RSTP', 'EtherChannel', 'OSPF', 'EIGRP', 'RIPv2', 'BGP', 'NAT', 'PAT', 'DHCP',
+    'DNS', 'ACL extendida', 'ACL estándar', 'IPv6', 'SLAAC', 'HSRP', 'VRRP', 'QoS', 'SNMP', 'Syslog', 'NTP',
+    'port security', 'DHCP snooping', 'ARP', 'CDP', 'LLDP', 'SSH', 'AAA', 'RADIUS', 'TACACS+', 'WLC', 'CAPWAP',
+    'SDN', 'REST API', 'Ansible', 'subnetting', 'VLSM', 'router-on-a-stick', 'switch capa 3', 'ruta estática',
+]
+VERBS = ['configura', 'verifica', 'diagnostica', 'documenta', 'migra', 'asegura', 'optimiza', 'resume']
+DEVICES = ['R1', 'R2', 'SW1', 'SW2', 'el switch de distribución', 'el router de borde', 'el firewall', 'el WLC']
+COMMANDS = [
+    'show ip interface brief', 'show vlan brief', 'show running-config', 'show ip route', 'show interfaces trunk',
+    'show spanning-tree', 'show ip ospf neighbor', 'show ip nat translations', 'show access-lists',
+    'switchport mode trunk', 'ip helper-address', 'spanning-tree portfast', 'ip ospf cost', 'no shutdown',
+]
+SYNTHETIC_IMAGE_COUNT = 24
+
+
+def _sentence(rng, words):
+    topic, other = rng.sample(TOPICS, 2)
+    parts = [
+        f'Un administrador {rng.choice(VERBS)} {topic} en {rng.choice(DEVICES)}',
+        f'y necesita confirmar el estado de {other}.',
+        *rng.choices([
+            f'La salida de "{rng.choice(COMMANDS)}" muestra {rng.randint(1, 48)} interfaces activas.',
+            f'La red 10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.0/{rng.randint(16, 30)} está asignada a {topic}.',
+            f'Se observa que {rng.choice(DEVICES)} no aprende rutas desde {rng.choice(DEVICES)}.',
+            f'El área {rng.randint(0, 9)} contiene {rng.randint(2, 60)} routers.',
+        ], k=words),
+        '¿Qué acción resuelve el problema?',
+    ]
+    return ' '.join(parts)
+
+
+def _option(rng):
+    return f'{rng.choice(["Usar", "Habilitar", "Quitar", "Cambiar"])} {rng.choice(COMMANDS)} en {rng.choice(DEVICES)} ({rng.choice(TOPICS)})'
+
+
+def synthetic_image_names():
+    return [f'synthetic-{i:02d}.png' for i in range(SYNTHETIC_IMAGE_COUNT)]
+
+
+def write_synthetic_images(seed=0):
+    """Dibuja en media/images los diagramas que usan las preguntas con imagen (si no existen)"""
+    folder = os.path.join(settings.MEDIA_ROOT, SOURCE_DIR)
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    for name in synthetic_image_names():
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            continue
+        width, height = rng.choice([(800, 450), (1024, 600), (1280, 720), (640, 480)])
+        im = Image.new('RGB', (width, height), 'white')
+        draw = ImageDraw.Draw(im)
+        nodes = [(rng.randint(40, width - 120), rng.randint(40, height - 60)) for _ in range(rng.randint(4, 9))]
+        for (x1, y1), (x2, y2) in zip(nodes, nodes[1:] + nodes[:1]):
+            draw.line((x1 + 40, y1 + 15, x2 + 40, y2 + 15), fill='#334155', width=3)
+        for i, (x, y) in enumerate(nodes):
+            draw.rectangle((x, y, x + 80, y + 30), fill='#bfdbfe', outline='#1e3a8a', width=2)
+            draw.text((x + 10, y + 8), f'R{i + 1}', fill='#0f172a')
+        im.save(path, optimize=True)
+
+
+def synthetic_rows(single=0, multi=0, drag=0, images=0.0, seed=0, prefix='GEN'):
+    """
+    Filas tipo CSV: `single` SINGLE, `multi` MULTI y `drag` DRAG, con imagen en
+    la fracción `images` de ellas. El NP es {prefix}{tipo}{n}: volver a generar
+    con el mismo prefijo actualiza en lugar de duplicar.
+    """
+    rng = random.Random(seed)
+    image_names = synthetic_image_names()
+    plan = [('SINGLE', 'S', single), ('MULTI', 'M', multi), ('DRAG', 'D', drag)]
+    for qtype, code, count in plan:
+        for n in range(count):
+            row = dict.fromkeys(CSV_COLUMNS, '')
+            row.update(NP=f'{prefix}{code}{n}', question_type=qtype, Question=_sentence(rng, rng.randint(1, 4)))
+            if rng.random() < images:
+                row.update(Image='1', ImageFile=rng.choice(image_names))
+            else:
+                row['Image'] = '0'
+
+            if qtype == 'DRAG':
+                items = rng.sample(TOPICS, 4)
+                row.update(OptionA=json.dumps(items), OptionB='-', OptionC='-', OptionD='-',
+                           Answer=json.dumps(rng.sample(items, len(items))))
+                yield row
+                continue
+
+            letters = 'ABCDE' if rng.random() < 0.3 else 'ABCD'
+            options = set()
+            while len(options) < len(letters):
+                options.add(_option(rng))
+            row.update({f'Option{letter}': text for letter, text in zip(letters, sorted(options))})
+            if qtype == 'SINGLE':
+                row['Answer'] = rng.choice(letters)
+            else:
+                row['Answer'] = '-'.join(sorted(rng.sample(letters, rng.randint(2, 3))))
+            yield row
@@ -0,0 +1,63 @@
+"""
+Versión global del banco de preguntas.
+
+Un contador en la base (BankVersion, fila única) que sube con cada importación
+o edición, en la misma transacción que el cambio. La fuente de verdad es
+siempre esa fila: cada proceso guarda el valor leído sólo BANK_VERSION_TTL
+segundos y luego vuelve a consultarla, así que un cambio hecho en otro worker
+o proceso se ve como mucho tras ese margen, sin importar el backend de caché.
+El proceso que confirma el cambio descarta su copia al instante. La usan las
+claves de respuesta (answer_keys) y los ETag/Last-Modified de las páginas y
+endpoints de sólo lectura.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BankVersion
+
+SINGLETON_PK = 1
+
+_memo = None  # (momento de la lectura según time.monotonic(), (versión, fecha))
+
+
+def _fresh():
+    if _memo is not None and time.monotonic() - _memo[0] < settings.BANK_VERSION_TTL:
+        return _memo[1]
+    return None
+
+
+def _remember(value):
+    global _memo
+    _memo = (time.monotonic(), value)
+    return value
+
+
+def _forget():
+    global _memo
+    _memo = None
+
+
+def current():
+    """(versión, fecha del último cambio)"""
+    value = _fresh()
+    if value is None:
+        obj, _ = BankVersion.objects.get_or_create(pk=SINGLETON_PK)
+        value = _remember((obj.version, obj.updated_at))
+    return value
+
+
+def bump():
+    """Incrementa la versión dentro de la transacción en curso; este proceso la relee al confirmar"""
+    updated = BankVersion.objects.filter(pk=SINGLETON_PK).update(version=F('version') + 1, updated_at=timezone.now())
+    if not updated:
+        BankVersion.objects.get_or_create(pk=SINGLETON_PK, defaults={'version': 1})
+    transaction.on_commit(_forget)
+
+
+def last_modified(request, *args, **kwargs):
+    """last_modified_func para django.views.decorators.http.condition"""
+    return current()[1]
@@ -0,0 +1,133 @@
+"""
+Construcción de exámenes muestreados y reproducibles.
+
+En lugar de cargar y barajar todo el banco, la base elige K preguntas SINGLE y
+MULTI del modelo de lectura al azar (ORDER BY random() LIMIT K), devuelve sólo
+esos ids y se cargan únicamente esas filas. La lista elegida se guarda la
+primera vez (IssuedExam) y desde entonces la semilla identifica ese
+examen: reabrirlo o corregirlo usa la misma lista aunque el banco cambie. Pasados
+EXAM_RETENTION_DAYS el registro se descarta y la semilla vuelve a muestrear.
+"""
+import base64
+import binascii
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import IssuedExam, QuestionReadModel
+
+EXAM_TYPES = ('SINGLE', 'MULTI')
+
+MAX_SEED = 2 ** 31 - 1
+
+
+def new_seed():
+    return random.SystemRandom().randint(1, MAX_SEED)
+
+
+def parse_seed(value):
+    """Devuelve la semilla como int o None si falta o no es válida"""
+    try:
+        seed = int(value)
+    except (TypeError, ValueError):
+        return None
+    return seed if 0 < seed <= MAX_SEED else None
+
+
+def exam_size(mode):
+    """Cantidad de preguntas configurada para el modo (0 = todo el banco)"""
+    return settings.EXAM_SIZES.get(mode, 0)
+
+
+def _ids_cache_key(mode, seed, size):
+    return f'exam:ids:{mode}:{seed}:{size}'
+
+
+def sample_question_ids(size):
+    """
+    Ids de QuestionReadModel de una muestra al azar de `size` preguntas (o todo
+    el banco barajado si size es 0), elegida en la base: no se leen los demás ids.
+    """
+    ids = QuestionReadModel.objects.filter(question_type__in=EXAM_TYPES).order_by('?').values_list('id', flat=True)
+    return list(ids[:size] if size else ids)
+
+
+def _issue(mode, seed, size, create):
+    """
+    Lista guardada del examen; la primera vez la muestrea y la guarda (descartando
+    las vencidas). Con create=False, IssuedExam.DoesNotExist si nunca se emitió.
+    """
+    exam = IssuedExam.objects.filter(mode=mode, seed=seed, size=size).first()
+    if exam is None:
+        if not create:
+            raise IssuedExam.DoesNotExist(f'examen {mode} #{seed} no emitido o vencido')
+        IssuedExam.objects.filter(created_at__lt=timezone.now() - timedelta(days=settings.EXAM_RETENTION_DAYS)).delete()
+        exam, _ = IssuedExam.objects.get_or_create(
+            mode=mode, seed=seed, size=size, defaults={'question_ids': sample_question_ids(size)},
+        )
+    return exam.question_ids
+
+
+def exam_question_ids(mode, seed, create=True):
+    """
+    Ids del examen `mode` para la semilla, en orden: siempre la lista guardada al
+    emitirlo, nunca una muestra nueva. Se cachea para no leerla en cada página.
+    """
+    size = exam_size(mode)
+    key = _ids_cache_key(mode, seed, size)
+    ids = cache.get(key)
+    if ids is None:
+        ids = _issue(mode, seed, size, create)
+        cache.set(key, ids, timeout=settings.EXAM_CACHE_TIMEOUT)
+    return ids
+
+
+def load_questions(ids):
+    """Carga las filas de `ids` respetando su orden (una consulta)"""
+    rows = QuestionReadModel.objects.in_bulk(ids)
+    return [rows[pk] for pk in ids if pk in rows]
+
+
+def build_exam(mode, seed):
+    """Preguntas del examen `mode` para la semilla dada, en orden (QuestionReadModel)"""
+    return load_questions(exam_question_ids(mode, seed))
+
+
+def exam_question_refs(mode, seed):
+    """
+    [(question_type, question_id)] del examen ya emitido, en orden (una consulta),
+    para corregirlo. IssuedExam.DoesNotExist si esa semilla nunca se emitió.
+    """
+    ids = exam_question_ids(mode, seed, create=False)
+    refs = {pk: (qtype, qid) for pk, qtype, qid in QuestionReadModel.objects.filter(pk__in=ids).values_list(
+        'pk', 'question_type', 'question_id',
+    )}
+    return [refs[pk] for pk in ids if pk in refs]
+
+
+def exam_page(mode, seed, offset, limit):
+    """(preguntas desde `offset`, hasta `limit`; total del examen)"""
+    ids = exam_question_ids(mode, seed)
+    return load_questions(ids[offset:offset + limit]), len(ids)
+
+
+def encode_cursor(offset):
+    """Cursor opaco para la API: la posición dentro del orden del examen"""
+    return base64.urlsafe_b64encode(f'o:{offset}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Posición del cursor (0 si no hay); ValueError si no es válido"""
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError('cursor inválido')
+    prefix, _, offset = raw.partition(':')
+    if prefix != 'o' or not offset.isdigit():
+        raise ValueError('cursor inválido')
+    return int(offset)
@@ -1,5 +1,48 @@
 # questions/forms.py
 from django import forms
 
+from .models import LETTERS, MultipleChoiceQuestion, SingleChoiceQuestion, letters_to_mask, mask_to_letters
+
 class CSVUploadForm(forms.Form):
     csv_file = forms.FileField()  # Campo para subir el archivo CSV
+
+class ChoiceQuestionForm(forms.ModelForm):
+    """
+    Formulario del admin para SINGLE/MULTI: las respuestas correctas se marcan
+    con una casilla por letra y se guardan en correct_mask; el texto de
+    `answer` lo deriva save() a partir de la máscara.
+    """
+    correct_letters = forms.MultipleChoiceField(
+        label='Respuestas correctas', choices=[(letter, letter) for letter in LETTERS],
+        widget=forms.CheckboxSelectMultiple,
+    )
+
+    class Meta:
+        exclude = ('correct_mask', 'answer')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.correct_mask:
+            self.initial.setdefault('correct_letters', mask_to_letters(self.instance.correct_mask))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        letters = cleaned_data.get('correct_letters') or []
+        empty = [letter for letter in letters if not (cleaned_data.get(f'option_{letter.lower()}') or '').strip()]
+        if empty:
+            self.add_error('correct_letters', f"Opciones vacías marcadas como correctas: {', '.join(empty)}")
+        elif self.instance.question_type == 'SINGLE' and len(letters) != 1:
+            self.add_error('correct_letters', 'Una pregunta SINGLE tiene exactamente una respuesta correcta')
+        elif self.instance.question_type == 'MULTI' and len(letters) < 2:
+            self.add_error('correct_letters', 'Una pregunta MULTI tiene al menos dos respuestas correctas')
+        else:
+            self.instance.correct_mask = letters_to_mask(letters)
+        return cleaned_data
+
+class SingleChoiceQuestionForm(ChoiceQuestionForm):
+    class Meta(ChoiceQuestionForm.Meta):
+        model = SingleChoiceQuestion
+
+class MultipleChoiceQuestionForm(ChoiceQuestionForm):
+    class Meta(ChoiceQuestionForm.Meta):
+        model = MultipleChoiceQuestion
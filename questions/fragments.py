@@ -0,0 +1,46 @@
+"""
+Caché de fragmentos HTML por pregunta para los modos estudio y práctica.
+
+Cada pregunta se renderiza una vez por (modo, pregunta, updated_at) y se
+guarda en la caché de Django; una página es la concatenación de fragmentos en
+el orden del examen. updated_at cambia en cada save/importación/variante de
+imagen (ver read_model.py), así que un fragmento viejo nunca se reutiliza.
+Los fragmentos no deben depender de la posición ni de la petición: el
+contenedor con el índice y las clases de navegación queda en la página.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+FRAGMENT_TEMPLATES = {
+    'study': 'exam/_study_question.html',
+    'practice': 'exam/_practice_question.html',
+}
+
+# Subir al cambiar el markup de los fragmentos para no servir HTML viejo
+FRAGMENT_VERSION = 1
+
+
+def fragment_key(mode, question):
+    stamp = int(question.updated_at.timestamp() * 1_000_000)
+    return f'qfrag:{FRAGMENT_VERSION}:{mode}:{question.question_type}:{question.question_id}:{stamp}'
+
+
+def render_fragments(mode, questions):
+    """
+    Devuelve [(pregunta, html)] en el mismo orden. Los fragmentos se leen con un
+    solo get_many y sólo se renderizan (y guardan con set_many) los que faltan.
+    """
+    keys = [fragment_key(mode, q) for q in questions]
+    fragments = cache.get_many(keys)
+
+    missing = {
+        key: render_to_string(FRAGMENT_TEMPLATES[mode], {'question': q})
+        for key, q in zip(keys, questions) if key not in fragments
+    }
+    if missing:
+        cache.set_many(missing, timeout=settings.FRAGMENT_CACHE_TIMEOUT)
+        fragments.update(missing)
+
+    return [(q, mark_safe(fragments[key])) for key, q in zip(keys, questions)]
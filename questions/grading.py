@@ -0,0 +1,57 @@
+"""
+Corrección del examen de selección.
+
+Se corrigen exactamente las preguntas del examen, que el servidor reconstruye
+a partir de la semilla enviada (exams.exam_question_refs): el formulario sólo
+aporta las respuestas, como `question_<TIPO>_<id>`. Quitar campos del POST deja
+esas preguntas sin responder (incorrectas) y las respuestas a preguntas ajenas
+al examen se ignoran. Las claves salen del almacén en memoria (answer_keys),
+así que el costo depende del tamaño del examen y no del banco.
+"""
+import re
+
+from .answer_keys import get_answer_keys
+from .models import letters_to_mask, mask_to_letters
+
+ANSWER_FIELD_RE = re.compile(r'^question_(SINGLE|MULTI)_(\d+)$')
+
+
+def parse_submission(post, refs):
+    """
+    Devuelve {(question_type, question_id): máscara elegida} para las preguntas
+    `refs` del examen, en su orden. Las que no tienen respuesta quedan con
+    máscara 0 (cuentan como incorrectas).
+    """
+    submitted = dict.fromkeys(refs, 0)
+    for key in post:
+        match = ANSWER_FIELD_RE.match(key)
+        if match:
+            ref = (match.group(1), int(match.group(2)))
+            if ref in submitted:
+                submitted[ref] = letters_to_mask(post.getlist(key))
+    return submitted
+
+
+def grade_submission(submitted):
+    """
+    Corrige en una sola pasada. Devuelve (correctas, resultados) donde cada
+    resultado es {question_type, question_id, correct, chosen_letters, correct_letters}.
+    Las preguntas que ya no existen en el banco se ignoran.
+    """
+    keys = get_answer_keys(submitted)
+    correct_count = 0
+    results = []
+    for (qtype, qid), user_mask in submitted.items():
+        correct_mask = keys[(qtype, qid)]
+        if correct_mask is None:
+            continue
+        is_correct = bool(user_mask) and user_mask == correct_mask
+        correct_count += is_correct
+        results.append({
+            'question_type': qtype,
+            'question_id': qid,
+            'correct': is_correct,
+            'chosen_letters': mask_to_letters(user_mask),
+            'correct_letters': mask_to_letters(correct_mask),
+        })
+    return correct_count, results
@@ -0,0 +1,256 @@
+"""
+Variantes optimizadas de las imágenes de las preguntas.
+
+Por cada archivo de media/images se generan versiones AVIF/WebP (según lo que
+soporte Pillow) al ancho original y a los anchos de IMAGE_VARIANT_WIDTHS que
+sean menores. Los nombres incluyen el hash del original, así que una variante
+nunca cambia de contenido y puede cachearse indefinidamente. Se registran en
+ImageVariant por image_filename; sólo se recodifican las imágenes nuevas o
+cuyo archivo cambió.
+"""
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import django
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, features
+
+from . import bank_version
+from .models import (
+    IMAGE_META_FIELDS, DragAndDropQuestion, ImageVariant, MultipleChoiceQuestion, QuestionReadModel, SingleChoiceQuestion,
+    image_source,
+)
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DIR = 'images'
+VARIANT_DIR = 'images/variants'
+SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+QUESTION_MODELS = (SingleChoiceQuestion, MultipleChoiceQuestion, DragAndDropQuestion)
+
+# formato -> (nombre en Pillow, tipo MIME); se emiten en este orden en <picture>
+FORMATS = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+}
+
+
+def available_formats():
+    return [fmt for fmt in FORMATS if features.check(fmt)]
+
+
+def _save_params(fmt):
+    if fmt == 'avif':
+        return {'quality': settings.IMAGE_AVIF_QUALITY}
+    return {'quality': settings.IMAGE_WEBP_QUALITY, 'method': 6}
+
+
+def source_path(filename):
+    return os.path.join(settings.MEDIA_ROOT, SOURCE_DIR, filename)
+
+
+def read_image_metadata(filename):
+    """
+    {image_width, image_height, image_bytes} del archivo en media/images leyendo
+    sólo la cabecera. Todo None si no hay archivo o no es una imagen válida.
+    """
+    meta = dict.fromkeys(IMAGE_META_FIELDS)
+    if not filename:
+        return meta
+    path = source_path(filename)
+    try:
+        with Image.open(path) as im:
+            meta['image_width'], meta['image_height'] = im.size
+        meta['image_bytes'] = os.path.getsize(path)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        pass
+    return meta
+
+
+def refresh_image_metadata(questions, force=False):
+    """
+    Asigna (sin guardar) los metadatos del archivo a cada pregunta. Sólo se lee
+    el archivo si la pregunta es nueva o cambió de imagen, salvo con `force`
+    (el archivo cambió en disco); cada archivo se lee una vez.
+    """
+    cache = {}
+    for question in questions:
+        filename = image_source(question.__dict__)
+        if not force and hasattr(question, '_loaded_image') and filename == question._loaded_image:
+            continue
+        if filename not in cache:
+            cache[filename] = read_image_metadata(filename)
+        for field, value in cache[filename].items():
+            setattr(question, field, value)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def encode_variants(filename, digest, widths, formats):
+    """
+    Genera las variantes de una imagen (se ejecuta en el pool de procesos).
+    Devuelve (lista de dicts para ImageVariant, None) o ([], mensaje de error).
+    """
+    stem = os.path.splitext(filename)[0].replace('/', '_')
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, VARIANT_DIR), exist_ok=True)
+    variants = []
+    try:
+        with Image.open(source_path(filename)) as im:
+            im.load()
+            if im.mode not in ('RGB', 'RGBA'):
+                im = im.convert('RGBA' if im.mode in ('LA', 'PA') or 'transparency' in im.info else 'RGB')
+
+            for width in sorted({w for w in widths if w < im.width} | {im.width}):
+                height = max(1, round(im.height * width / im.width))
+                resized = im if width == im.width else im.resize((width, height), Image.Resampling.LANCZOS)
+                for fmt in formats:
+                    path = f'{VARIANT_DIR}/{stem}-{digest[:12]}-{width}.{fmt}'
+                    dest = os.path.join(settings.MEDIA_ROOT, path)
+                    if not os.path.exists(dest):
+                        # Escribir aparte y renombrar: nunca se sirve un archivo a medias
+                        tmp = f'{dest}.{os.getpid()}.tmp'
+                        resized.save(tmp, FORMATS[fmt][0], **_save_params(fmt))
+                        os.replace(tmp, dest)
+                    variants.append({
+                        'source_hash': digest, 'format': fmt, 'width': width, 'height': height,
+                        'path': path, 'bytes': os.path.getsize(dest),
+                    })
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        return [], f'{filename}: {e}'
+    return variants, None
+
+
+def find_pending(filenames=None, force=False):
+    """
+    Devuelve [(filename, hash)] de las imágenes sin variantes o cuyo archivo
+    cambió. Sin filenames se recorre toda la carpeta media/images.
+    """
+    if filenames is None:
+        folder = os.path.join(settings.MEDIA_ROOT, SOURCE_DIR)
+        filenames = sorted(
+            name for name in os.listdir(folder)
+            if name.lower().endswith(SOURCE_EXTENSIONS) and os.path.isfile(os.path.join(folder, name))
+        ) if os.path.isdir(folder) else []
+
+    known = dict(ImageVariant.objects.filter(image_filename__in=filenames).values_list('image_filename', 'source_hash'))
+    pending = []
+    for name in filenames:
+        path = source_path(name)
+        if not os.path.isfile(path):
+            continue
+        digest = file_hash(path)
+        if force or known.get(name) != digest:
+            pending.append((name, digest))
+    return pending
+
+
+def record_variants(encoded):
+    """
+    Registra de una vez las variantes de `encoded` ({image_filename: [variantes]}):
+    reemplaza sus filas de ImageVariant, actualiza con bulk_update las dimensiones
+    de las preguntas que usan esas imágenes y sus <source> en el modelo de lectura,
+    sube la versión del banco una sola vez y borra los archivos que quedaron huérfanos.
+    """
+    if not encoded:
+        return
+    names = list(encoded)
+    metas = {name: read_image_metadata(name) for name in names}
+    batch_size = settings.CSV_IMPORT_BATCH_SIZE
+
+    with transaction.atomic():
+        old_paths = set(ImageVariant.objects.filter(image_filename__in=names).values_list('path', flat=True))
+        ImageVariant.objects.filter(image_filename__in=names).delete()
+        ImageVariant.objects.bulk_create(
+            [ImageVariant(image_filename=name, **v) for name, variants in encoded.items() for v in variants],
+            batch_size=batch_size,
+        )
+
+        # Escrituras masivas sin save(): ni una versión del banco ni una sincronización por pregunta
+        for model in QUESTION_MODELS:
+            questions = list(model.objects.filter(image_filename__in=names).only('pk', 'image_filename'))
+            for question in questions:
+                for field, value in metas[question.image_filename].items():
+                    setattr(question, field, value)
+            model.objects.bulk_update(questions, IMAGE_META_FIELDS, batch_size=batch_size)
+
+        sources, now = image_sources(names), timezone.now()
+        rows = list(QuestionReadModel.objects.filter(image_filename__in=names).only('pk', 'image_filename'))
+        for row in rows:
+            row.image_sources, row.updated_at = sources.get(row.image_filename, []), now
+            for field, value in metas[row.image_filename].items():
+                setattr(row, field, value)
+        if rows:
+            QuestionReadModel.objects.bulk_update(rows, ['image_sources', 'updated_at', *IMAGE_META_FIELDS], batch_size=batch_size)
+            bank_version.bump()
+
+    for path in old_paths - {v['path'] for variants in encoded.values() for v in variants}:
+        try:
+            os.remove(os.path.join(settings.MEDIA_ROOT, path))
+        except FileNotFoundError:
+            pass
+
+
+def optimize_images(filenames=None, workers=1, force=False):
+    """
+    Genera y registra las variantes pendientes. La codificación corre en un
+    pool de `workers` procesos; el registro, en una sola transacción al final
+    (si se interrumpe antes, la próxima corrida reutiliza los archivos ya
+    escritos). Devuelve (procesadas, variantes, errores).
+    """
+    pending = find_pending(filenames, force)
+    encode = partial(encode_variants, widths=list(settings.IMAGE_VARIANT_WIDTHS), formats=available_formats())
+    names = [name for name, _ in pending]
+    digests = [digest for _, digest in pending]
+
+    encoded, errors = {}, []
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup) if workers > 1 and len(pending) > 1 else None
+    try:
+        results = pool.map(encode, names, digests) if pool else map(encode, names, digests)
+        for name, (variants, error) in zip(names, results):
+            if error:
+                logger.warning('No se pudo optimizar la imagen %s', error)
+                errors.append(error)
+                continue
+            encoded[name] = variants
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    record_variants(encoded)
+    return len(encoded), sum(len(variants) for variants in encoded.values()), errors
+
+
+def image_sources(filenames):
+    """
+    {image_filename: [{'type': MIME, 'srcset': '... 480w, ... 960w'}]} para
+    los <source> de <picture>, resuelto en una sola consulta.
+    """
+    filenames = {name for name in filenames if name}
+    if not filenames:
+        return {}
+
+    grouped = {}
+    variants = ImageVariant.objects.filter(image_filename__in=filenames).order_by('image_filename', 'width')
+    for variant in variants.only('image_filename', 'format', 'width', 'path'):
+        by_format = grouped.setdefault(variant.image_filename, {})
+        by_format.setdefault(variant.format, []).append(f'{settings.MEDIA_URL}{variant.path} {variant.width}w')
+
+    return {
+        name: [
+            {'type': FORMATS[fmt][1], 'srcset': ', '.join(by_format[fmt])}
+            for fmt in FORMATS if fmt in by_format
+        ]
+        for name, by_format in grouped.items()
+    }
@@ -0,0 +1,461 @@
+"""
+Motor de carga masiva de preguntas desde CSV.
+
+- Lectura: decodifica el archivo por trozos y valida + normaliza cada fila en
+  una sola pasada, con memoria acotada sin importar el tamaño del archivo.
+- Vista previa: normaliza las filas y las compara contra las preguntas
+  existentes, obtenidas con un in_bulk por modelo (no una consulta por fila).
+  Los cambios propuestos quedan en el servidor (ImportBatch/StagedChange) y
+  el navegador sólo recibe el token del lote.
+- Confirmación: agrupa los cambios por question_type y los aplica en una única
+  transacción usando bulk_create (con ON CONFLICT sobre `np`) y bulk_update por
+  lotes, en lugar de un get_or_create + save() por fila.
+"""
+import codecs
+import csv
+import json
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from . import read_model
+from .images import read_image_metadata
+from .models import (
+    SingleChoiceQuestion, MultipleChoiceQuestion, DragAndDropQuestion, ImportBatch, StagedChange, LETTER_BITS,
+    IMAGE_META_FIELDS, compute_content_hash, letters_to_mask, mask_to_answer_text,
+)
+from .signals import bank_changed
+
+logger = logging.getLogger(__name__)
+
+IMPORT_MODELS = {
+    'SINGLE': SingleChoiceQuestion,
+    'MULTI': MultipleChoiceQuestion,
+    'DRAG': DragAndDropQuestion,
+}
+
+# Columnas que se comparan y escriben por tipo (todo salvo la clave `np`).
+# El content_hash es siempre el de model.HASH_FIELDS, igual que en save(): los
+# metadatos de imagen se escriben pero no cuentan (los refresca optimize_images)
+IMPORT_FIELDS = {qtype: list(model.HASH_FIELDS) + list(IMAGE_META_FIELDS) for qtype, model in IMPORT_MODELS.items()}
+
+
+REQUIRED_COLUMNS = ['Question', 'OptionA', 'OptionB', 'OptionC', 'OptionD', 'Answer', 'question_type', 'Image']
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def iter_csv_lines(chunks, encoding='utf-8'):
+    """
+    Decodifica de forma incremental los trozos de bytes de un UploadedFile
+    (csv_file.chunks()) y produce líneas completas para csv.reader.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ''
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def validate_header(fieldnames):
+    """Valida las columnas del CSV; devuelve la lista de errores (vacía si es válida)"""
+    fieldnames = fieldnames or []
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in fieldnames]
+    if missing_columns:
+        return [f"❌ Columnas faltantes: {', '.join(missing_columns)}"]
+
+    # Se necesita ImageFile (nombres personalizados) o NP para derivar el nombre
+    if 'ImageFile' not in fieldnames and 'NP' not in fieldnames:
+        return ["❌ Se requiere al menos una columna 'ImageFile' (nombre del archivo) o 'NP' (número de pregunta)"]
+    return []
+
+
+def validate_row(row, has_imagefile_column, has_np_column):
+    """Valida una fila del CSV; devuelve la lista de errores de esa fila"""
+    row_errors = []
+
+    # Validar que no esté vacía la pregunta
+    if not row['Question'].strip():
+        row_errors.append("Pregunta vacía")
+
+    # Validar question_type
+    question_type = row['question_type'].strip().upper()
+    if question_type not in ['SINGLE', 'MULTI', 'DRAG']:
+        row_errors.append(f"question_type inválido: '{question_type}' (debe ser SINGLE, MULTI o DRAG)")
+
+    # Validar Image (debe ser 0 o 1)
+    image_value = row.get('Image', '').strip()
+    if image_value not in ['0', '1']:
+        row_errors.append(f"Image debe ser 0 o 1, encontrado: '{image_value}'")
+
+    # Si tiene imagen, validar que haya nombre de archivo
+    if image_value == '1':
+        has_filename = False
+        if has_imagefile_column and row.get('ImageFile', '').strip():
+            has_filename = True
+        elif has_np_column and row.get('NP', '').strip():
+            has_filename = True
+
+        if not has_filename:
+            row_errors.append("Si Image=1, debe especificar ImageFile o NP para determinar el archivo")
+
+    # Validar opciones básicas
+    if not row['OptionA'].strip():
+        row_errors.append("OptionA vacía")
+    if not row['OptionB'].strip():
+        row_errors.append("OptionB vacía")
+    if not row['OptionC'].strip():
+        row_errors.append("OptionC vacía")
+    if not row['OptionD'].strip():
+        row_errors.append("OptionD vacía")
+
+    # Validar Answer según el tipo
+    answer = row['Answer'].strip()
+    if question_type == 'SINGLE':
+        if answer not in ['A', 'B', 'C', 'D', 'E']:
+            row_errors.append(f"Answer inválido para SINGLE: '{answer}' (debe ser A, B, C, D o E)")
+
+    elif question_type == 'MULTI':
+        if '-' not in answer:
+            row_errors.append(f"Answer inválido para MULTI: '{answer}' (debe tener formato A-B-C)")
+        else:
+            answer_letters = answer.split('-')
+            for letter in answer_letters:
+                if letter.strip() not in ['A', 'B', 'C', 'D', 'E']:
+                    row_errors.append(f"Letra inválida en MULTI: '{letter}' (debe ser A, B, C, D o E)")
+
+    elif question_type == 'DRAG':
+        try:
+            json.loads(row['OptionA'])
+            json.loads(row['Answer'])
+        except json.JSONDecodeError:
+            row_errors.append("DRAG requiere JSON válido en OptionA y Answer")
+
+    return row_errors
+
+
+def _parse_row(row_number, row, has_imagefile_column, has_np_column, normalize=True):
+    """
+    Valida una fila y, si es válida y `normalize`, la normaliza. Devuelve
+    (fila_normalizada o None, mensaje de error o None).
+    """
+    try:
+        row_errors = validate_row(row, has_imagefile_column, has_np_column)
+        if not row_errors:
+            return ((row_number, *normalize_row(row)) if normalize else None), None
+    except Exception as e:
+        row_errors = [f"fila ilegible ({str(e)})"]
+    return None, f"🔴 Línea {row_number}: {'; '.join(row_errors)}"
+
+
+def parse_row_chunk(numbered_rows, has_imagefile_column, has_np_column):
+    """
+    Valida y normaliza un lote de filas [(número_de_línea, fila), ...] sin tocar
+    la base de datos, de modo que pueda ejecutarse en un pool de procesos.
+    Devuelve (filas_normalizadas, errores).
+    """
+    parsed, errors = [], []
+    for row_number, row in numbered_rows:
+        parsed_row, error = _parse_row(row_number, row, has_imagefile_column, has_np_column)
+        if error:
+            errors.append(error)
+        else:
+            parsed.append(parsed_row)
+    return parsed, errors
+
+
+def parse_csv_rows(lines, errors, max_errors=None):
+    """
+    Lee, valida y normaliza el CSV en una sola pasada.
+
+    Produce (número_de_línea, question_type, np, payload) por cada fila válida
+    y acumula los mensajes de error en `errors`. Tras el primer error deja de
+    producir filas (el archivo no se cargará) y sigue validando sólo hasta
+    reunir `max_errors` mensajes (CSV_MAX_REPORTED_ERRORS por defecto).
+    """
+    max_errors = max_errors or settings.CSV_MAX_REPORTED_ERRORS
+    try:
+        reader = csv.DictReader(lines, quotechar='"')
+        header_errors = validate_header(reader.fieldnames)
+        if header_errors:
+            errors.extend(header_errors)
+            return
+
+        has_imagefile_column = 'ImageFile' in reader.fieldnames
+        has_np_column = 'NP' in reader.fieldnames
+
+        for row_number, row in enumerate(reader, start=2):  # empieza en 2 por cabecera
+            # Tras el primer error ya no se normaliza: sólo se siguen reuniendo errores
+            parsed_row, error = _parse_row(row_number, row, has_imagefile_column, has_np_column, normalize=not errors)
+            if error:
+                if len(errors) == max_errors:
+                    errors.append("... (más errores omitidos)")
+                    return
+                errors.append(error)
+            elif not errors:
+                yield parsed_row
+
+    except Exception as e:
+        errors.append(f"❌ Error leyendo CSV: {str(e)}")
+
+
+def normalize_row(row):
+    """
+    Convierte una fila ya validada del CSV en (question_type, np, payload).
+    Lanza ValueError si el tipo no es válido (validate_row ya lo reporta).
+    """
+    qtype = row['question_type'].strip().upper()
+    answer_raw = row['Answer'].strip()
+    has_image = row.get('Image', '0').strip() == '1'
+    np_code = row.get('NP', '').strip()  # <-- clave
+
+    # Derivar image_filename
+    image_filename = None
+    if has_image:
+        if 'ImageFile' in row and row['ImageFile'].strip():
+            image_filename = row['ImageFile'].strip()
+        elif np_code:
+            image_filename = f"{np_code.replace('Q','')}.png"
+
+    # Normalizar opciones
+    opt = {
+        'A': row['OptionA'],
+        'B': row['OptionB'],
+        'C': row['OptionC'],
+        'D': row['OptionD'],
+        'E': row.get('OptionE', '')
+    }
+
+    options = (opt['A'], opt['B'], opt['C'], opt['D'], opt['E'])
+
+    # Construir payload "new" homogéneo según tipo; `answer` se deriva de la
+    # máscara igual que en save(), para que el content_hash coincida
+    if qtype == 'SINGLE':
+        payload = {
+            'np': np_code,
+            'text': row['Question'],
+            'option_a': opt['A'],
+            'option_b': opt['B'],
+            'option_c': opt['C'],
+            'option_d': opt['D'],
+            'option_e': opt.get('E', ''),
+            'answer': mask_to_answer_text(options, LETTER_BITS[answer_raw]),  # letra -> texto
+            'correct_mask': LETTER_BITS[answer_raw],
+            'has_image': has_image,
+            'image_filename': image_filename
+        }
+
+    elif qtype == 'MULTI':
+        mask = letters_to_mask(x.strip() for x in answer_raw.split('-'))  # exacta aunque las opciones contengan "-"
+        payload = {
+            'np': np_code,
+            'text': row['Question'],
+            'option_a': opt['A'],
+            'option_b': opt['B'],
+            'option_c': opt['C'],
+            'option_d': opt['D'],
+            'option_e': opt.get('E', ''),
+            'answer': mask_to_answer_text(options, mask),
+            'correct_mask': mask,
+            'has_image': has_image,
+            'image_filename': image_filename
+        }
+
+    elif qtype == 'DRAG':
+        payload = {
+            'np': np_code,
+            'text': row['Question'],
+            'options': json.loads(row['OptionA']),
+            'correct_answers': json.loads(row['Answer']),
+            'has_image': has_image,
+            'image_filename': image_filename
+        }
+    else:
+        raise ValueError(f"question_type inválido: '{qtype}'")
+
+    # Dimensiones y tamaño del archivo para reservar el espacio en las páginas
+    payload.update(read_image_metadata(image_filename))
+    return qtype, np_code, payload
+
+
+def diff_model(obj, payload, fields):
+    """Compara obj vs payload y devuelve ('UPDATE', diff) o ('SKIP', {})"""
+    if obj is None:
+        return 'CREATE', payload
+    diff = {}
+    for f in fields:
+        old = getattr(obj, f)
+        new = payload[f]
+        if old != new:
+            diff[f] = {"old": old, "new": new}
+    return ('UPDATE', diff) if diff else ('SKIP', {})
+
+
+def iter_proposed_changes(rows, chunk_size=None):
+    """
+    Recibe filas normalizadas (número_de_línea, question_type, np, payload) y
+    produce los cambios {row, np, question_type, action, diff, new}.
+    Las filas se consumen en lotes de CSV_PREVIEW_CHUNK_SIZE. Por cada lote se
+    comparan primero los content_hash guardados y sólo las preguntas cuyo hash
+    cambió se cargan (in_bulk) para calcular el diff campo a campo.
+    """
+    chunk_size = chunk_size or settings.CSV_PREVIEW_CHUNK_SIZE
+    rows = iter(rows)
+
+    while chunk := list(islice(rows, chunk_size)):
+        existing, unchanged = {}, {}
+        for qtype, model in IMPORT_MODELS.items():
+            hashes = {
+                np_code: compute_content_hash(payload, model.HASH_FIELDS)
+                for _, t, np_code, payload in chunk if t == qtype
+            }
+            existing[qtype], unchanged[qtype] = {}, set()
+            if not hashes:
+                continue
+
+            # Primero sólo los hashes: las filas idénticas se descartan sin cargarlas
+            stored = model.objects.filter(np__in=list(hashes)).values_list('np', 'content_hash')
+            changed = []
+            for np_code, old_hash in stored:
+                if old_hash == hashes[np_code]:
+                    unchanged[qtype].add(np_code)
+                else:
+                    changed.append(np_code)
+            if changed:
+                existing[qtype] = model.objects.in_bulk(changed, field_name='np')
+
+        for idx, qtype, np_code, payload in chunk:
+            if np_code in unchanged[qtype]:
+                continue  # mismo hash: sin cambios
+            obj = existing[qtype].get(np_code)
+            action, diff = diff_model(obj, payload, IMPORT_FIELDS[qtype])
+            if action in ('CREATE', 'UPDATE'):
+                yield {
+                    'row': idx,
+                    'np': np_code,
+                    'question_type': qtype,
+                    'action': action,
+                    'diff': diff,   # en UPDATE: {campo: {"old":..., "new":...}}
+                    'new': payload  # para aplicar si confirman
+                }
+
+
+def stage_changes(rows, chunk_size=None):
+    """
+    Compara las filas contra el banco y guarda los cambios propuestos en un
+    ImportBatch nuevo, por lotes, en lugar de devolverlos al navegador.
+    De paso elimina los lotes caducados.
+    """
+    now = timezone.now()
+    ImportBatch.objects.filter(expires_at__lt=now).delete()
+
+    with transaction.atomic():
+        batch = ImportBatch.objects.create(expires_at=now + timedelta(minutes=settings.CSV_STAGING_TTL_MINUTES))
+        changes = iter_proposed_changes(rows, chunk_size)
+        while chunk := list(islice(changes, settings.CSV_IMPORT_BATCH_SIZE)):
+            StagedChange.objects.bulk_create([
+                StagedChange(
+                    batch=batch,
+                    row=c['row'],
+                    np=c['np'],
+                    question_type=c['question_type'],
+                    action=c['action'],
+                    diff=c['diff'],
+                    payload=c['new'],
+                )
+                for c in chunk
+            ])
+    return batch
+
+
+def get_active_batch(token):
+    """Devuelve el ImportBatch vigente para `token` o None si no existe o caducó"""
+    try:
+        return ImportBatch.objects.get(token=token, expires_at__gte=timezone.now())
+    except (ImportBatch.DoesNotExist, ValidationError):
+        return None
+
+
+def iter_staged_changes(batch):
+    """Recorre los cambios de un lote en orden de línea, con el formato de apply_changes"""
+    staged = batch.changes.order_by('row').values_list('question_type', 'np', 'payload')
+    for qtype, np_code, payload in staged.iterator(chunk_size=settings.CSV_IMPORT_BATCH_SIZE):
+        yield {'question_type': qtype, 'np': np_code, 'new': payload}
+
+
+def apply_changes(proposed, batch_size=None):
+    """
+    Aplica los cambios propuestos (iterable de {question_type, np, new, ...}),
+    de CSV_IMPORT_BATCH_SIZE en CSV_IMPORT_BATCH_SIZE.
+    Todo ocurre dentro de una transacción: si algo falla no queda un banco a medias.
+    Devuelve {'created': int, 'updated': int, 'batches': [{question_type, operation, rows, ms}]}
+    """
+    batch_size = batch_size or settings.CSV_IMPORT_BATCH_SIZE
+    report = {'created': 0, 'updated': 0, 'batches': []}
+
+    def timed(qtype, operation, rows, fn):
+        start = time.perf_counter()
+        fn()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        report['batches'].append({'question_type': qtype, 'operation': operation, 'rows': rows, 'ms': round(elapsed_ms, 1)})
+        logger.info('CSV import %s %s: %d filas en %.1f ms', qtype, operation, rows, elapsed_ms)
+
+    with transaction.atomic():
+        proposed = iter(proposed)
+        while chunk := list(islice(proposed, batch_size)):
+            # Agrupar por tipo; si un NP aparece varias veces gana la última fila
+            grouped = defaultdict(dict)
+            for item in chunk:
+                grouped[item['question_type']][item['np']] = item['new']
+
+            for qtype, payloads in grouped.items():
+                model = IMPORT_MODELS[qtype]
+                fields = IMPORT_FIELDS[qtype]
+
+                # bulk_create/bulk_update no pasan por save(): el hash se calcula aquí
+                for payload in payloads.values():
+                    payload['content_hash'] = compute_content_hash(payload, model.HASH_FIELDS)
+                fields = fields + ['content_hash']
+
+                # Una consulta (troceada según el backend) para saber qué NP ya existen
+                existing = model.objects.in_bulk(list(payloads), field_name='np')
+
+                to_update = []
+                for np_code, obj in existing.items():
+                    for field in fields:
+                        setattr(obj, field, payloads[np_code][field])
+                    to_update.append(obj)
+                to_create = [model(**payload) for np_code, payload in payloads.items() if np_code not in existing]
+
+                # ON CONFLICT (np): si otra carga creó la fila entre medias, se actualiza
+                if to_create:
+                    timed(qtype, 'create', len(to_create), lambda: model.objects.bulk_create(
+                        to_create, update_conflicts=True, unique_fields=['np'], update_fields=fields
+                    ))
+                if to_update:
+                    timed(qtype, 'update', len(to_update), lambda: model.objects.bulk_update(to_update, fields))
+                # Las escrituras masivas no emiten post_save: refrescar el modelo de lectura
+                timed(qtype, 'read_model', len(payloads), lambda: read_model.sync_nps(qtype, payloads))
+
+                report['created'] += len(to_create)
+                report['updated'] += len(to_update)
+
+        # bulk_create/bulk_update no emiten post_save: avisar del cambio explícitamente
+        bank_changed.send(sender=apply_changes)
+
+    return report
@@ -0,0 +1,173 @@
+"""
+Instrumentación por petición: latencia por vista, consultas SQL (cantidad y
+tiempo) y tiempo de render de plantillas.
+
+InstrumentationMiddleware abre un RequestStats por petición en un ContextVar;
+lo alimentan un execute_wrapper instalado en cada conexión (connection_created)
+y el backend de plantillas TimedDjangoTemplates. Como el ContextVar viaja a los
+hilos de sync_to_async, las consultas también se cuentan bajo ASGI.
+Con eso:
+
+- se agrega la cabecera Server-Timing (app, db, tpl) si SERVER_TIMING está activo;
+- se observan histogramas de prometheus_client que expone la vista `metrics`
+  (con PROMETHEUS_MULTIPROC_DIR suman todos los workers de gunicorn, ver
+  gunicorn.conf.py);
+- las peticiones más lentas que SLOW_REQUEST_MS se registran en el logger
+  questions.instrumentation con el SQL capturado.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest, multiprocess
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+REQUEST_SECONDS = Histogram(
+    'ccna_request_duration_seconds', 'Latencia de la petición por vista', ['view', 'method', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram('ccna_request_db_queries', 'Consultas SQL por petición', ['view'], buckets=QUERY_BUCKETS)
+DB_SECONDS = Histogram('ccna_request_db_seconds', 'Tiempo en SQL por petición', ['view'], buckets=LATENCY_BUCKETS)
+TEMPLATE_SECONDS = Histogram(
+    'ccna_request_template_seconds', 'Tiempo de render de plantillas por petición', ['view'], buckets=LATENCY_BUCKETS,
+)
+
+
+class RequestStats:
+    __slots__ = ('db_queries', 'db_seconds', 'template_seconds', 'sql')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.sql = []  # (segundos, sql) hasta SLOW_REQUEST_MAX_SQL, para el log de lentas
+
+
+_current = ContextVar('request_stats', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.db_queries += 1
+        stats.db_seconds += elapsed
+        if len(stats.sql) < settings.SLOW_REQUEST_MAX_SQL:
+            stats.sql.append((elapsed, sql))
+
+
+def _instrument_connection(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_instrument_connection, dispatch_uid='questions.instrumentation')
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Backend DjangoTemplates que suma el tiempo de render a la petición en curso"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class InstrumentationMiddleware:
+    """Va primero en MIDDLEWARE para medir la petición completa"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Conexiones abiertas antes de cargar el middleware (p. ej. en el shell)
+        for connection in connections.all(initialized_only=True):
+            _instrument_connection(None, connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, started = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats, started = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats, time.perf_counter() - started)
+
+    def _finish(self, request, response, stats, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'  # etiqueta acotada: nunca la URL
+
+        REQUEST_SECONDS.labels(view, request.method, response.status_code).observe(elapsed)
+        DB_QUERIES.labels(view).observe(stats.db_queries)
+        DB_SECONDS.labels(view).observe(stats.db_seconds)
+        TEMPLATE_SECONDS.labels(view).observe(stats.template_seconds)
+
+        if settings.SERVER_TIMING:
+            response.headers['Server-Timing'] = (
+                f'app;dur={elapsed * 1000:.1f}, '
+                f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_queries} queries", '
+                f'tpl;dur={stats.template_seconds * 1000:.1f}'
+            )
+
+        if settings.SLOW_REQUEST_MS and elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+            logger.warning(
+                'Petición lenta %s %s (%s): %.0f ms, %d consultas en %.0f ms, plantillas %.0f ms\n%s',
+                request.method, request.get_full_path(), view, elapsed * 1000, stats.db_queries,
+                stats.db_seconds * 1000, stats.template_seconds * 1000,
+                '\n'.join(f'  {seconds * 1000:7.1f} ms  {sql}' for seconds, sql in stats.sql),
+            )
+        return response
+
+
+def render_metrics():
+    """(cuerpo, content type) en formato de texto de Prometheus"""
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):  # sumar los archivos de todos los workers
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,235 @@
+import io
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from questions import attempts
+from questions.bank_generator import CSV_COLUMNS, synthetic_rows
+from questions.exams import build_exam, encode_cursor
+from questions.models import ImportBatch, IssuedExam, QuestionReadModel
+
+# Reparto de cada tamaño de banco entre tipos (como el banco real: casi todo selección)
+MIX = {'single': 0.45, 'multi': 0.45, 'drag': 0.10}
+SEED = 12345
+UPLOAD_ROWS = 200
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark reproducible de todas las URLs de questions/urls.py con el test client sobre una base '
+        'de pruebas llena con generate_bank. Registra percentiles de latencia y consultas SQL, y falla si '
+        'empeoran respecto del baseline guardado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000', help='Tamaños del banco separados por coma')
+        parser.add_argument('--iterations', type=int, default=20, help='Mediciones por URL y tamaño')
+        parser.add_argument('--warmup', type=int, default=2, help='Peticiones previas no medidas (cachés calientes)')
+        parser.add_argument('--baseline', default=os.path.join('benchmarks', 'baseline.json'), help='Archivo de baseline')
+        parser.add_argument('--save-baseline', action='store_true', help='Guarda estos resultados como baseline')
+        parser.add_argument('--output', help='Guarda también los resultados en este JSON')
+        # El conteo de SQL se compara exacto; los tiempos llevan margen porque varían entre corridas de la misma máquina
+        parser.add_argument('--tolerance', type=float, default=1.0, help='Empeoramiento relativo tolerado del p50')
+        parser.add_argument('--min-delta-ms', type=float, default=5.0, help='Diferencia mínima del p50 para contar como regresión')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options['sizes'].split(',') if size.strip()})
+        except ValueError:
+            raise CommandError('--sizes debe ser una lista de enteros, p. ej. 1000,10000')
+        if not sizes or sizes[0] < 1 or options['iterations'] < 2 or options['warmup'] < 0:
+            raise CommandError('Se necesitan tamaños positivos, --iterations >= 2 y --warmup >= 0')
+        # Antes de medir: sin baseline sólo se puede correr para crearlo
+        baseline = self.load_baseline(options['baseline'], required=not options['save_baseline'])
+
+        # Base de pruebas propia y caché/medios aislados: nunca se toca el banco real
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, override_settings(
+                DEBUG=False, MEDIA_ROOT=media_root, SLOW_REQUEST_MS=0,
+                # Un solo proceso: la versión del banco no necesita releerse y el conteo de SQL no varía con el reloj
+                BANK_VERSION_TTL=24 * 60 * 60,
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}},
+            ):
+                results = {}
+                for size in sizes:
+                    # Los tamaños crecen sobre el mismo banco (mismo prefijo de NP): sólo se agrega lo que falta
+                    counts = {key: round(size * share) for key, share in MIX.items()}
+                    started = time.perf_counter()
+                    call_command('generate_bank', **counts, images=0.2, seed=SEED, stdout=io.StringIO())
+                    with connection.cursor() as cursor:
+                        cursor.execute('ANALYZE')  # Estadísticas al día, como en un banco estable (y sin autovacuum a mitad)
+                    self.stdout.write(f'Banco de {size} preguntas generado en {time.perf_counter() - started:.1f} s')
+                    caches['default'].clear()
+                    IssuedExam.objects.all().delete()  # Cada tamaño muestrea sus propios exámenes
+                    results[str(size)] = self.run_size(options['iterations'], options['warmup'])
+        finally:
+            attempts.flush()  # Lo que quede en el búfer va a la base de pruebas, no después
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'python': platform.python_version(), 'django': django.get_version(), 'database': connection.vendor,
+                'iterations': options['iterations'],
+            },
+            'results': results,
+        }
+        regressions = self.print_report(results, baseline, options['tolerance'], options['min_delta_ms'])
+
+        if options['output']:
+            self.write_json(options['output'], report)
+        if options['save_baseline']:
+            self.write_json(options['baseline'], report)
+            self.stdout.write(self.style.SUCCESS(f"Baseline guardado en {options['baseline']}"))
+        elif regressions:
+            raise CommandError(f'{len(regressions)} regresiones respecto de {options["baseline"]}:\n' + '\n'.join(regressions))
+
+    def scenarios(self, client):
+        """[(nombre, preparar(i) -> args, petición(args) -> response)] para cada URL de questions/urls.py"""
+        seed = SEED
+        exam = build_exam('selection', seed)
+        submission = {'seed': seed}
+        for i, q in enumerate(exam):
+            letters = [letter for letter, _ in q.options]
+            submission[f'question_{q.question_type}_{q.question_id}'] = letters[i % len(letters)]
+        single = QuestionReadModel.objects.filter(question_type='SINGLE').first()
+        checks = [
+            {'question_id': q.question_id, 'question_type': q.question_type, 'answer': q.correct_letters}
+            for q in QuestionReadModel.objects.filter(question_type__in=('SINGLE', 'MULTI'))[:10]
+        ]
+        page = {'seed': seed, 'cursor': encode_cursor(settings.QUESTIONS_API_PAGE_SIZE)}
+
+        def csv_upload(i):
+            out = io.StringIO()
+            out.write(','.join(CSV_COLUMNS) + '\n')
+            for row in synthetic_rows(single=UPLOAD_ROWS // 2, multi=UPLOAD_ROWS // 2, seed=i, prefix='BENCH'):
+                out.write(','.join(json.dumps(row[col], ensure_ascii=False) for col in CSV_COLUMNS) + '\n')
+            return SimpleUploadedFile('bench.csv', out.getvalue().encode(), content_type='text/csv')
+
+        def staged_token(i):
+            client.post(reverse('upload_csv'), {'csv_file': csv_upload(i)})
+            return ImportBatch.objects.latest('created_at').token
+
+        return [
+            ('examen GET', None, lambda _: client.get(reverse('examen'))),
+            ('selection_exam GET', None, lambda _: client.get(reverse('selection_exam'), {'seed': seed})),
+            ('selection_exam POST', None, lambda _: client.post(reverse('selection_exam'), submission)),
+            ('drag_exam GET', None, lambda _: client.get(reverse('drag_exam'))),
+            ('drag_exam POST', None, lambda _: client.post(reverse('drag_exam'), {})),
+            ('study_mode GET', None, lambda _: client.get(reverse('study_mode'), {'seed': seed})),
+            ('practice_exam GET', None, lambda _: client.get(reverse('practice_exam'), {'seed': seed})),
+            ('review_mode GET', None, lambda _: client.get(reverse('review_mode'))),
+            ('questions_api GET', None, lambda _: client.get(reverse('questions_api'), page)),
+            ('answer_digests_api GET', None, lambda _: client.get(reverse('answer_digests_api'), page)),
+            ('search_api GET', None, lambda _: client.get(reverse('search_api'), {'q': 'ospf vlan'})),
+            ('check_answer_api POST', None, lambda _: client.post(reverse('check_answer_api'), {
+                'question_id': single.question_id, 'question_type': 'SINGLE', 'answer': single.correct_letters[0],
+            })),
+            ('check_answers_api POST', None, lambda _: client.post(
+                reverse('check_answers_api'), json.dumps({'items': checks}), content_type='application/json',
+            )),
+            ('upload_csv GET', None, lambda _: client.get(reverse('upload_csv'))),
+            ('upload_csv preview POST', csv_upload, lambda f: client.post(reverse('upload_csv'), {'csv_file': f})),
+            ('upload_csv confirm GET', staged_token, lambda token: client.get(reverse('upload_csv'), {'token': token})),
+            ('upload_csv confirm POST', staged_token, lambda token: client.post(reverse('upload_csv'), {'confirm': '1', 'token': token})),
+            ('question_stats_api GET', None, lambda _: client.get(reverse('question_stats_api'))),
+            ('metrics GET', None, lambda _: client.get(reverse('metrics'))),
+        ]
+
+    def run_size(self, iterations, warmup):
+        client = Client()
+        client.get(reverse('practice_exam'), {'seed': SEED})  # sesión con sal para answer_digests_api
+        results = {}
+        for name, prepare, request in self.scenarios(client):
+            timings, queries = [], []
+            for i in range(warmup + iterations):
+                args = prepare(i) if prepare else None
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = request(args)
+                    elapsed = time.perf_counter() - started
+                if response.status_code >= 400:
+                    raise CommandError(f'{name}: HTTP {response.status_code}')
+                if i >= warmup:
+                    timings.append(elapsed * 1000)
+                    queries.append(len(captured))
+            cuts = statistics.quantiles(timings, n=100, method='inclusive')
+            results[name] = {
+                'p50_ms': round(cuts[49], 2), 'p95_ms': round(cuts[94], 2), 'p99_ms': round(cuts[98], 2),
+                'queries': max(queries),
+            }
+        return results
+
+    def load_baseline(self, path, required):
+        try:
+            with open(path, encoding='utf-8') as fh:
+                data = json.load(fh)
+            results, database = data['results'], data['meta']['database']
+        except FileNotFoundError:
+            if required:
+                raise CommandError(f'Sin baseline en {path}: créalo con --save-baseline')
+            return {}
+        except (ValueError, KeyError) as e:
+            raise CommandError(f'Baseline inválido ({path}): {e}')
+        if required and database != connection.vendor:
+            raise CommandError(f'El baseline de {path} se midió con {database}, no con {connection.vendor}')
+        return results
+
+    def print_report(self, results, baseline, tolerance, min_delta_ms):
+        # La máquina entera puede andar más rápida o más lenta que cuando se grabó el baseline:
+        # cada p50 se compara con el del baseline escalado por la mediana de esos cocientes
+        ratios = [
+            current['p50_ms'] / previous['p50_ms']
+            for size, scenarios in results.items() for name, current in scenarios.items()
+            if (previous := baseline.get(size, {}).get(name)) and previous['p50_ms'] > 0
+        ]
+        drift = statistics.median(ratios) if ratios else 1.0
+        if ratios:
+            self.stdout.write(f'Velocidad respecto del baseline (mediana de p50): x{drift:.2f}')
+
+        regressions = []
+        self.stdout.write(f"{'banco':>7}  {'URL':<26} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'SQL':>4}")
+        for size, scenarios in results.items():
+            if baseline and size not in baseline:
+                self.stdout.write(self.style.WARNING(f'El baseline no tiene el tamaño {size}: no se compara'))
+            for name, current in scenarios.items():
+                line = (
+                    f"{size:>7}  {name:<26} {current['p50_ms']:8.1f} {current['p95_ms']:8.1f} "
+                    f"{current['p99_ms']:8.1f} {current['queries']:4d}"
+                )
+                previous = baseline.get(size, {}).get(name)
+                problems = []
+                if previous:
+                    expected = previous['p50_ms'] * drift
+                    if current['p50_ms'] - expected > min_delta_ms and current['p50_ms'] > expected * (1 + tolerance):
+                        problems.append(f"p50 {previous['p50_ms']:.1f} (x{drift:.2f} = {expected:.1f}) -> {current['p50_ms']:.1f} ms")
+                    if current['queries'] > previous['queries']:
+                        problems.append(f"SQL {previous['queries']} -> {current['queries']}")
+                if problems:
+                    regressions.append(f"  {size} {name}: {'; '.join(problems)}")
+                    self.stdout.write(self.style.ERROR(f"{line}  ⚠ {'; '.join(problems)}"))
+                else:
+                    self.stdout.write(line)
+        return regressions
+
+    def write_json(self, path, data):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(data, fh, indent=2, ensure_ascii=False)
+            fh.write('\n')
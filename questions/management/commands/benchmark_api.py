@@ -0,0 +1,128 @@
+import json
+import os
+import platform
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urljoin
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+ENDPOINTS = ('check-answer', 'questions')
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide peticiones/s de los endpoints JSON contra un servidor en marcha. Correrlo con el mismo '
+        'servidor bajo WSGI y bajo ASGI (ver ccna_exam/asgi.py) para comparar. Con --save se guarda '
+        'el resultado con una etiqueta en benchmarks/api.json, junto a las mediciones anteriores.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help='Ej.: http://localhost:8000')
+        parser.add_argument('--endpoint', choices=ENDPOINTS, action='append', help='Por defecto todos')
+        parser.add_argument('--requests', type=int, default=2000, help='Peticiones por endpoint')
+        parser.add_argument('--concurrency', type=int, default=32, help='Peticiones simultáneas')
+        parser.add_argument('--save', metavar='ETIQUETA', help='Guarda los resultados con esta etiqueta (p. ej. "wsgi-sync")')
+        parser.add_argument('--output', default=os.path.join('benchmarks', 'api.json'), help='Archivo para --save')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests y --concurrency deben ser mayores que 0')
+        base = options['base_url'].rstrip('/') + '/'
+
+        # Un examen de práctica real: da la cookie CSRF, la semilla y preguntas existentes
+        jar = CookieJar()
+        opener = build_opener(HTTPCookieProcessor(jar))
+        try:
+            page = opener.open(urljoin(base, 'practica/'))
+            seed = page.url.rsplit('seed=', 1)[-1]
+            api = json.load(opener.open(urljoin(base, f'api/questions/?seed={seed}&limit=100')))
+        except (HTTPError, URLError, ValueError) as e:
+            raise CommandError(f'No se pudo preparar el benchmark: {e}')
+        csrf = next((c.value for c in jar if c.name == 'csrftoken'), '')
+        questions = [q for q in api['questions'] if q['question_type'] in ('SINGLE', 'MULTI')]
+        if not questions:
+            raise CommandError('El banco no tiene preguntas SINGLE/MULTI')
+
+        def check_answer(i):
+            q = questions[i % len(questions)]
+            body = urlencode({'question_id': q['id'], 'question_type': q['question_type'], 'answer': 'A'})
+            return Request(
+                urljoin(base, 'api/check-answer/'), data=body.encode(), method='POST',
+                headers={'X-CSRFToken': csrf, 'Cookie': f'csrftoken={csrf}', 'Referer': base},
+            )
+
+        def questions_page(i):
+            return Request(urljoin(base, f'api/questions/?seed={seed}&limit=20'))
+
+        builders = {'check-answer': check_answer, 'questions': questions_page}
+        results = {
+            name: self.report(name, *self.run(builders[name], options['requests'], options['concurrency']))
+            for name in options['endpoint'] or ENDPOINTS
+        }
+        if options['save']:
+            self.save(options['output'], options['save'], results, options)
+
+    def run(self, build_request, total, concurrency):
+        """Lanza `total` peticiones con `concurrency` hilos; devuelve (latencias en s, errores, duración)"""
+        opener = build_opener()
+
+        def one(i):
+            started = time.perf_counter()
+            try:
+                with opener.open(build_request(i)) as response:
+                    response.read()
+                return time.perf_counter() - started, None
+            except (HTTPError, URLError, OSError) as e:
+                return time.perf_counter() - started, str(e)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(total)))
+        elapsed = time.perf_counter() - started
+        return [t for t, error in results if error is None], [e for _, e in results if e], elapsed
+
+    def report(self, name, latencies, errors, elapsed):
+        if not latencies:
+            raise CommandError(f'{name}: todas las peticiones fallaron ({errors[0]})')
+        cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        result = {
+            'req_s': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(cuts[49] * 1000, 1),
+            'p95_ms': round(cuts[94] * 1000, 1),
+            'errors': len(errors),
+        }
+        self.stdout.write(
+            f"{name:<13} {result['req_s']:8.1f} req/s   "
+            f"p50 {result['p50_ms']:6.1f} ms   p95 {result['p95_ms']:6.1f} ms   errores {result['errors']}"
+        )
+        if errors:
+            self.stderr.write(self.style.WARNING(f'  primer error: {errors[0]}'))
+        return result
+
+    def save(self, path, label, results, options):
+        """Agrega (o reemplaza) la medición `label` en `path` sin tocar las demás"""
+        try:
+            with open(path, encoding='utf-8') as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            data = {}
+        data[label] = {
+            'meta': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+            },
+            'results': results,
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(data, fh, indent=2, ensure_ascii=False)
+            fh.write('\n')
+        self.stdout.write(self.style.SUCCESS(f'Resultados guardados como {label!r} en {path}'))
@@ -0,0 +1,131 @@
+import csv
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.importer import IMPORT_MODELS, apply_changes, iter_proposed_changes, parse_row_chunk, validate_header
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa preguntas desde un CSV con las mismas reglas que cargar-csv/, '
+        'validando en paralelo y escribiendo con upserts por lotes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='Ruta del archivo CSV')
+        parser.add_argument('--dry-run', action='store_true', help='Valida y muestra el resumen de cambios sin escribir')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos para validar/normalizar filas')
+        parser.add_argument('--batch-size', type=int, default=settings.CSV_IMPORT_BATCH_SIZE, help='Filas por lote de validación y escritura')
+        parser.add_argument('--encoding', default='utf-8', help='Codificación del archivo (por defecto utf-8)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1 or options['workers'] < 1:
+            raise CommandError('--workers y --batch-size deben ser mayores que 0')
+
+        self.rows_read = 0
+        summary = Counter()
+        started = time.perf_counter()
+
+        try:
+            fh = open(options['csv_path'], newline='', encoding=options['encoding'])
+        except OSError as e:
+            raise CommandError(f'No se pudo abrir el CSV: {e}')
+
+        with fh:
+            reader = csv.DictReader(fh, quotechar='"')
+            header_errors = validate_header(reader.fieldnames)
+            if header_errors:
+                raise CommandError('\n'.join(header_errors))
+            flags = ('ImageFile' in reader.fieldnames, 'NP' in reader.fieldnames)
+
+            rows = self._parse_rows(reader, flags, options['workers'], batch_size)
+            changes = self._track(iter_proposed_changes(rows, batch_size), summary, options['verbosity'])
+
+            # Si aparece un error de validación a mitad del archivo, la excepción
+            # revierte la transacción de apply_changes y no se escribe nada.
+            if options['dry_run']:
+                for _ in changes:
+                    pass
+                report = None
+            else:
+                report = apply_changes(changes, batch_size)
+
+        elapsed = time.perf_counter() - started
+        self._print_summary(summary, report, elapsed, options['dry_run'])
+
+    def _parse_rows(self, reader, flags, workers, batch_size):
+        """Valida y normaliza en lotes (en paralelo si workers > 1) manteniendo el orden del archivo"""
+        numbered = enumerate(reader, start=2)  # empieza en 2 por cabecera
+        chunks = iter(lambda: list(islice(numbered, batch_size)), [])
+        max_errors = settings.CSV_MAX_REPORTED_ERRORS
+        errors = []
+
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup) if workers > 1 else None
+        try:
+            results = self._ordered_results(pool, chunks, flags, workers) if pool else (
+                parse_row_chunk(chunk, *flags) for chunk in chunks
+            )
+            for parsed, chunk_errors in results:
+                self.rows_read += len(parsed) + len(chunk_errors)
+                errors.extend(chunk_errors)
+                if len(errors) >= max_errors:
+                    break
+                if not errors:
+                    yield from parsed
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+        if errors:
+            if len(errors) > max_errors:
+                errors = errors[:max_errors] + ["... (más errores omitidos)"]
+            raise CommandError('El CSV tiene errores de validación:\n' + '\n'.join(errors))
+
+    def _ordered_results(self, pool, chunks, flags, workers):
+        # Ventana acotada de lotes en vuelo: memoria constante aunque el archivo sea enorme
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(parse_row_chunk, chunk, *flags))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def _track(self, changes, summary, verbosity):
+        for change in changes:
+            summary[(change['question_type'], change['action'])] += 1
+            if verbosity >= 2:
+                fields = ', '.join(change['diff']) if change['action'] == 'UPDATE' else 'nueva'
+                self.stdout.write(f"  línea {change['row']}: {change['np']} ({change['question_type']}) {change['action']} [{fields}]")
+            yield change
+
+    def _print_summary(self, summary, report, elapsed, dry_run):
+        rate = self.rows_read / elapsed if elapsed else 0
+        self.stdout.write(f'Filas procesadas: {self.rows_read} en {elapsed:.2f} s ({rate:,.0f} filas/s)')
+
+        changed = 0
+        for qtype in IMPORT_MODELS:
+            creates = summary[(qtype, 'CREATE')]
+            updates = summary[(qtype, 'UPDATE')]
+            changed += creates + updates
+            if creates or updates:
+                self.stdout.write(f'  {qtype}: {creates} a crear, {updates} a actualizar')
+        self.stdout.write(f'  Sin cambios: {self.rows_read - changed}')
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('--dry-run: no se aplicó ningún cambio'))
+            return
+
+        batch_ms = sum(b['ms'] for b in report['batches'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Cambios aplicados: {report['created']} creadas, {report['updated']} actualizadas "
+            f"({len(report['batches'])} lotes en {batch_ms:.0f} ms)"
+        ))
@@ -0,0 +1,37 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.images import available_formats, optimize_images
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera variantes AVIF/WebP redimensionadas de media/images para <picture>/srcset. '
+        'Es incremental: sólo procesa imágenes nuevas o modificadas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('filenames', nargs='*', help='Archivos de media/images a procesar (por defecto todos)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos para codificar imágenes')
+        parser.add_argument('--force', action='store_true', help='Recodifica aunque el original no haya cambiado')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers debe ser mayor que 0')
+        formats = available_formats()
+        if not formats:
+            raise CommandError('Pillow no tiene soporte para AVIF ni WebP')
+
+        started = time.perf_counter()
+        processed, created, errors = optimize_images(
+            options['filenames'] or None, workers=options['workers'], force=options['force']
+        )
+        elapsed = time.perf_counter() - started
+
+        for error in errors:
+            self.stderr.write(self.style.ERROR(f'  {error}'))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {processed} imágenes optimizadas ({created} variantes {'/'.join(formats)}) en {elapsed:.1f} s"
+        ))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from questions.read_model import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye QuestionReadModel a partir de las tablas de preguntas (normalmente se mantiene sola).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Preguntas por upsert')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Modelo de lectura reconstruido: {total} preguntas en {time.perf_counter() - started:.1f} s'
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from questions.question_stats import rollup
+
+
+class Command(BaseCommand):
+    help = (
+        'Suma a QuestionStats los intentos registrados desde la última ejecución (marca de agua). '
+        'Pensado para correr periódicamente: con --every queda en bucle.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50000, help='Intentos por transacción')
+        parser.add_argument('--every', type=int, default=0, help='Repetir cada N segundos (0: una sola vez)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['every'] < 0:
+            raise CommandError('--batch-size debe ser positivo y --every no negativo')
+        while True:
+            started = time.perf_counter()
+            processed, touched = rollup(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Rollup: {processed} intentos nuevos en {touched} preguntas '
+                f'({time.perf_counter() - started:.1f} s)'
+            ))
+            if not options['every']:
+                return
+            close_old_connections()  # Proceso de larga vida: respeta CONN_MAX_AGE como una petición
+            time.sleep(options['every'])
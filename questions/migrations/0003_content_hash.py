@@ -0,0 +1,57 @@
+import hashlib
+import json
+
+from django.db import migrations, models
+
+HASH_FIELDS = {
+    'SingleChoiceQuestion': ('text', 'option_a', 'option_b', 'option_c', 'option_d', 'option_e', 'answer', 'has_image', 'image_filename'),
+    'MultipleChoiceQuestion': ('text', 'option_a', 'option_b', 'option_c', 'option_d', 'option_e', 'answer', 'has_image', 'image_filename'),
+    'DragAndDropQuestion': ('text', 'options', 'correct_answers', 'has_image', 'image_filename'),
+}
+
+
+def compute_content_hash(values, fields):
+    # Copia congelada de questions.models.compute_content_hash
+    data = [values.get(f) if values.get(f) is not None else '' for f in fields]
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def backfill_content_hash(apps, schema_editor):
+    for model_name, fields in HASH_FIELDS.items():
+        model = apps.get_model('questions', model_name)
+        batch = []
+        for obj in model.objects.only(*fields).iterator(chunk_size=500):
+            obj.content_hash = compute_content_hash(obj.__dict__, fields)
+            batch.append(obj)
+            if len(batch) >= 500:
+                model.objects.bulk_update(batch, ['content_hash'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_import_staging'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='draganddropquestion',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='multiplechoicequestion',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='singlechoicequestion',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+import hashlib
+import json
+
+from django.db import migrations, models
+
+LETTERS = ('A', 'B', 'C', 'D', 'E')
+LETTER_BITS = {letter: 1 << i for i, letter in enumerate(LETTERS)}
+QUESTION_TYPES = {'SingleChoiceQuestion': 'SINGLE', 'MultipleChoiceQuestion': 'MULTI'}
+HASH_FIELDS = ('text', 'option_a', 'option_b', 'option_c', 'option_d', 'option_e', 'answer', 'correct_mask', 'has_image', 'image_filename')
+
+
+def mask_to_answer_text(options, mask):
+    # Copia congelada de questions.models.mask_to_answer_text
+    return '-'.join(text for letter, text in zip(LETTERS, options) if mask & LETTER_BITS[letter] and text)
+
+
+def answer_text_to_mask(question_type, options, answer):
+    # Copia congelada de questions.models.answer_text_to_mask: compara opciones
+    # completas, así que una opción que contiene "-" no se parte en dos
+    texts = [(LETTER_BITS[letter], text.strip()) for letter, text in zip(LETTERS, options) if text and text.strip()]
+    answer = (answer or '').strip()
+    if question_type == 'SINGLE':
+        return next((bit for bit, text in texts if text == answer), 0)
+
+    def match(pos, mask):
+        for bit, text in texts:
+            if mask & bit or not answer.startswith(text, pos):
+                continue
+            rest = answer[pos + len(text):].lstrip()
+            if not rest:
+                return mask | bit
+            if rest[0] == '-':
+                found = match(len(answer) - len(rest[1:].lstrip()), mask | bit)
+                if found:
+                    return found
+        return 0
+
+    return match(0, 0) if answer else 0
+
+
+def compute_content_hash(values, fields):
+    # Copia congelada de questions.models.compute_content_hash
+    data = [values.get(f) if values.get(f) is not None else '' for f in fields]
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def backfill_correct_mask(apps, schema_editor):
+    # La máscara pasa a ser la fuente de verdad: `answer` se reescribe a partir de
+    # ella (como en save()) y se recalcula content_hash, que ahora incluye ambas
+    for model_name, question_type in QUESTION_TYPES.items():
+        model = apps.get_model('questions', model_name)
+        batch = []
+        for obj in model.objects.iterator(chunk_size=500):
+            options = (obj.option_a, obj.option_b, obj.option_c, obj.option_d, obj.option_e)
+            obj.correct_mask = answer_text_to_mask(question_type, options, obj.answer)
+            if obj.correct_mask:
+                obj.answer = mask_to_answer_text(options, obj.correct_mask)
+            obj.content_hash = compute_content_hash(obj.__dict__, HASH_FIELDS)
+            batch.append(obj)
+            if len(batch) >= 500:
+                model.objects.bulk_update(batch, ['correct_mask', 'answer', 'content_hash'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['correct_mask', 'answer', 'content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0003_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='multiplechoicequestion',
+            name='correct_mask',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='singlechoicequestion',
+            name='correct_mask',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_correct_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+from PIL import Image
+
+
+def read_image_metadata(filename):
+    # Copia congelada de questions.images.read_image_metadata
+    meta = {'image_width': None, 'image_height': None, 'image_bytes': None}
+    path = os.path.join(settings.MEDIA_ROOT, 'images', filename)
+    try:
+        with Image.open(path) as im:
+            meta['image_width'], meta['image_height'] = im.size
+        meta['image_bytes'] = os.path.getsize(path)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        pass
+    return meta
+
+
+def backfill_image_metadata(apps, schema_editor):
+    fields = ['image_width', 'image_height', 'image_bytes']
+    for model_name in ('SingleChoiceQuestion', 'MultipleChoiceQuestion', 'DragAndDropQuestion'):
+        model = apps.get_model('questions', model_name)
+        queryset = model.objects.filter(has_image=True).exclude(image_filename__isnull=True).exclude(image_filename='')
+        cache = {}
+        batch = []
+        for obj in queryset.only('id', 'image_filename').iterator(chunk_size=500):
+            if obj.image_filename not in cache:
+                cache[obj.image_filename] = read_image_metadata(obj.image_filename)
+            for field, value in cache[obj.image_filename].items():
+                setattr(obj, field, value)
+            batch.append(obj)
+            if len(batch) >= 500:
+                model.objects.bulk_update(batch, fields)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0005_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='draganddropquestion',
+            name='image_bytes',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='draganddropquestion',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='draganddropquestion',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='multiplechoicequestion',
+            name='image_bytes',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='multiplechoicequestion',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='multiplechoicequestion',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='singlechoicequestion',
+            name='image_bytes',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='singlechoicequestion',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='singlechoicequestion',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_image_metadata, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db import migrations, models
+
+LETTERS = ('A', 'B', 'C', 'D', 'E')
+IMAGE_FORMATS = (('avif', 'image/avif'), ('webp', 'image/webp'))
+
+
+def backfill_read_model(apps, schema_editor):
+    # Copia congelada de questions.read_model.rebuild
+    QuestionReadModel = apps.get_model('questions', 'QuestionReadModel')
+    ImageVariant = apps.get_model('questions', 'ImageVariant')
+
+    sources = {}
+    for variant in ImageVariant.objects.order_by('image_filename', 'width'):
+        by_format = sources.setdefault(variant.image_filename, {})
+        by_format.setdefault(variant.format, []).append(f'{settings.MEDIA_URL}{variant.path} {variant.width}w')
+    sources = {
+        name: [{'type': mime, 'srcset': ', '.join(by_format[fmt])} for fmt, mime in IMAGE_FORMATS if fmt in by_format]
+        for name, by_format in sources.items()
+    }
+
+    for qtype, model_name in (('SINGLE', 'SingleChoiceQuestion'), ('MULTI', 'MultipleChoiceQuestion'), ('DRAG', 'DragAndDropQuestion')):
+        model = apps.get_model('questions', model_name)
+        batch = []
+        for q in model.objects.iterator(chunk_size=500):
+            if qtype == 'DRAG':
+                options, mask, letters, answers = q.options, 0, [], q.correct_answers
+            else:
+                values = (q.option_a, q.option_b, q.option_c, q.option_d, q.option_e)
+                options = [[letter, text] for letter, text in zip(LETTERS, values) if text]
+                mask = q.correct_mask
+                letters, answers = [l for i, l in enumerate(LETTERS) if mask & (1 << i)], []
+            batch.append(QuestionReadModel(
+                question_type=qtype, question_id=q.pk, np=q.np, text=q.text, options=options,
+                correct_mask=mask, correct_letters=letters, correct_answers=answers,
+                has_image=q.has_image, image_filename=q.image_filename, image_width=q.image_width,
+                image_height=q.image_height, image_bytes=q.image_bytes,
+                image_sources=sources.get(q.image_filename, []) if q.has_image else [],
+                content_hash=q.content_hash,
+            ))
+            if len(batch) >= 500:
+                QuestionReadModel.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            QuestionReadModel.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0006_image_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionReadModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_type', models.CharField(max_length=10)),
+                ('question_id', models.PositiveIntegerField()),
+                ('np', models.CharField(max_length=20)),
+                ('text', models.TextField()),
+                ('options', models.JSONField(default=list)),
+                ('correct_mask', models.PositiveSmallIntegerField(default=0)),
+                ('correct_letters', models.JSONField(default=list)),
+                ('correct_answers', models.JSONField(default=list)),
+                ('has_image', models.BooleanField(default=False)),
+                ('image_filename', models.CharField(blank=True, db_index=True, max_length=100, null=True)),
+                ('image_width', models.PositiveIntegerField(blank=True, null=True)),
+                ('image_height', models.PositiveIntegerField(blank=True, null=True)),
+                ('image_bytes', models.PositiveIntegerField(blank=True, null=True)),
+                ('image_sources', models.JSONField(default=list)),
+                ('content_hash', models.CharField(blank=True, max_length=64)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('question_type', 'question_id'), name='unique_read_model_question')],
+            },
+        ),
+        migrations.RunPython(backfill_read_model, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+"""
+Índice de texto completo sobre QuestionReadModel (texto y opciones).
+
+PostgreSQL: columna generada search_vector (tsvector en español e inglés,
+texto con peso A y opciones con peso B) con índice GIN; la base la mantiene
+sola en cada INSERT/UPDATE. SQLite (desarrollo): tabla FTS5 espejo
+mantenida con triggers. Con otros motores no se crea nada y search.py cae a
+una búsqueda simple. La columna no está en el modelo a propósito: el ORM
+nunca la lee ni la escribe.
+"""
+from django.db import migrations
+
+TABLE = 'questions_questionreadmodel'
+FTS_TABLE = 'questions_search_fts'
+
+POSTGRES_FORWARD = [
+    f"""
+    ALTER TABLE {TABLE} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', text), 'A') || setweight(to_tsvector('english', text), 'A')
+        || setweight(to_tsvector('spanish', options), 'B') || setweight(to_tsvector('english', options), 'B')
+    ) STORED
+    """,
+    f'CREATE INDEX questions_readmodel_search_idx ON {TABLE} USING GIN (search_vector)',
+]
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS questions_readmodel_search_idx',
+    f'ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector',
+]
+
+# Texto de las opciones: [[letra, texto], ...] en SINGLE/MULTI, lista de textos en DRAG
+SQLITE_OPTIONS = (
+    "(SELECT group_concat(CASE WHEN type = 'array' THEN json_extract(value, '$[1]') ELSE value END, ' ') "
+    "FROM json_each({row}.options))"
+)
+SQLITE_FORWARD = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(text, options, tokenize = 'unicode61 remove_diacritics 2')",
+    f"INSERT INTO {FTS_TABLE} (rowid, text, options) SELECT id, text, {SQLITE_OPTIONS.format(row=TABLE)} FROM {TABLE}",
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, text, options) VALUES (new.id, new.text, {SQLITE_OPTIONS.format(row='new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF text, options ON {TABLE} BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} (rowid, text, options) VALUES (new.id, new.text, {SQLITE_OPTIONS.format(row='new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+]
+SQLITE_BACKWARD = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def _run(schema_editor, direction):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements:
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+
+
+def forwards(apps, schema_editor):
+    _run(schema_editor, 0)
+
+
+def backwards(apps, schema_editor):
+    _run(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0009_bank_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
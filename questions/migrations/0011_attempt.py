@@ -0,0 +1,28 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0010_question_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Attempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_type', models.CharField(max_length=10)),
+                ('question_id', models.PositiveIntegerField()),
+                ('chosen_mask', models.PositiveSmallIntegerField(default=0)),
+                ('correct', models.BooleanField()),
+                ('source', models.CharField(choices=[('CHECK', 'Verificación'), ('EXAM', 'Examen')], max_length=10)),
+                ('session_key', models.CharField(blank=True, max_length=40)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['question_type', 'question_id'], name='questions_a_questio_b970a6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0011_attempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='recorded_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='StatsWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_attempt_id', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_type', models.CharField(max_length=10)),
+                ('question_id', models.PositiveIntegerField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('correct_count', models.PositiveIntegerField(default=0)),
+                ('correct_rate', models.FloatField(db_index=True, default=0)),
+                ('pick_a', models.PositiveIntegerField(default=0)),
+                ('pick_b', models.PositiveIntegerField(default=0)),
+                ('pick_c', models.PositiveIntegerField(default=0)),
+                ('pick_d', models.PositiveIntegerField(default=0)),
+                ('pick_e', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('question_type', 'question_id'), name='unique_question_stats')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0012_question_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('learner_key', models.CharField(max_length=40)),
+                ('question_type', models.CharField(max_length=10)),
+                ('question_id', models.PositiveIntegerField()),
+                ('repetitions', models.PositiveIntegerField(default=0)),
+                ('interval_days', models.PositiveIntegerField(default=0)),
+                ('ease', models.FloatField(default=2.5)),
+                ('due_at', models.DateTimeField()),
+                ('last_reviewed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['learner_key', 'due_at'], name='questions_r_learner_0ceda8_idx')],
+                'constraints': [models.UniqueConstraint(fields=('learner_key', 'question_type', 'question_id'), name='unique_review_item')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0013_review_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssuedExam',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(max_length=20)),
+                ('seed', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField()),
+                ('question_ids', models.JSONField()),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('mode', 'seed', 'size'), name='unique_issued_exam')],
+            },
+        ),
+    ]
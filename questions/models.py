@@ -1,4 +1,82 @@
+import hashlib
+import json
+import uuid
+
 from django.db import models
+from django.utils import timezone
+
+
+LETTERS = ('A', 'B', 'C', 'D', 'E')
+LETTER_BITS = {letter: 1 << i for i, letter in enumerate(LETTERS)}  # A=1, B=2, C=4, D=8, E=16
+
+
+def letters_to_mask(letters):
+    """Convierte letras ('A', 'C', ...) en la máscara de bits; ignora letras inválidas"""
+    mask = 0
+    for letter in letters:
+        mask |= LETTER_BITS.get(letter, 0)
+    return mask
+
+
+def mask_to_letters(mask):
+    """Convierte la máscara de bits en la lista ordenada de letras"""
+    return [letter for letter in LETTERS if mask & LETTER_BITS[letter]]
+
+
+def mask_to_answer_text(options, mask):
+    """Texto de `answer` derivado de la máscara: textos de las opciones correctas unidos por guiones"""
+    return '-'.join(text for letter, text in zip(LETTERS, options) if mask & LETTER_BITS[letter] and text)
+
+
+def answer_text_to_mask(question_type, options, answer):
+    """
+    Deriva la máscara del texto histórico de `answer` (el texto de la opción
+    correcta o, en MULTI, los textos de las correctas unidos por "-"). Se
+    comparan opciones completas, que pueden contener "-"; 0 si no coincide.
+    Sólo se usa cuando falta correct_mask.
+    """
+    texts = [(LETTER_BITS[letter], text.strip()) for letter, text in zip(LETTERS, options) if text and text.strip()]
+    answer = (answer or '').strip()
+    if question_type == 'SINGLE':
+        return next((bit for bit, text in texts if text == answer), 0)
+
+    def match(pos, mask):
+        # Consume opciones enteras separadas por "-" desde `pos`; devuelve la máscara o 0
+        for bit, text in texts:
+            if mask & bit or not answer.startswith(text, pos):
+                continue
+            rest = answer[pos + len(text):].lstrip()
+            if not rest:
+                return mask | bit
+            if rest[0] == '-':
+                found = match(len(answer) - len(rest[1:].lstrip()), mask | bit)
+                if found:
+                    return found
+        return 0
+
+    return match(0, 0) if answer else 0
+
+
+# Metadatos del archivo de imagen (ver images.read_image_metadata); no forman
+# parte del hash: los refresca optimize_images cuando cambia el archivo
+IMAGE_META_FIELDS = ('image_width', 'image_height', 'image_bytes')
+
+
+def image_source(values):
+    """Archivo de imagen que usa una pregunta según sus valores (None si no tiene)"""
+    return values.get('image_filename') if values.get('has_image') else None
+
+
+def compute_content_hash(values, fields):
+    """
+    SHA-256 del contenido normalizado de una pregunta (campos en orden fijo,
+    JSON canónico, None equivalente a cadena vacía). Sirve para detectar en
+    una re-carga del CSV qué filas no cambiaron sin comparar campo a campo.
+    """
+    data = [values.get(f) if values.get(f) is not None else '' for f in fields]
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
 
 class SingleChoiceQuestion(models.Model):
     np = models.CharField(max_length=20, unique=True)
@@ -8,13 +86,45 @@ class SingleChoiceQuestion(models.Model):
     option_c = models.TextField()
     option_d = models.TextField()
     option_e = models.TextField(blank=True, null=True)
-    answer = models.TextField()  # Respuesta correcta como texto
+    answer = models.TextField()  # Texto de la opción correcta (derivado de correct_mask)
+    correct_mask = models.PositiveSmallIntegerField(default=0, db_index=True)  # Letras correctas como bits (A=1 ... E=16)
     has_image = models.BooleanField(default=False)  # ¿Tiene imagen?
     image_filename = models.CharField(max_length=100, blank=True, null=True)  # Nombre del archivo (ej: "1.png", "uid123.png")
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)  # Dimensiones leídas del archivo
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_bytes = models.PositiveIntegerField(blank=True, null=True, editable=False)  # Tamaño del original
+    content_hash = models.CharField(max_length=64, blank=True, editable=False, db_index=True)  # Hash del contenido normalizado
+
+    HASH_FIELDS = ('text', 'option_a', 'option_b', 'option_c', 'option_d', 'option_e', 'answer', 'correct_mask', 'has_image', 'image_filename')
 
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = image_source(instance.__dict__)
+        return instance
+
+    def save(self, *args, **kwargs):
+        # correct_mask es la fuente de verdad y `answer` se deriva de ella; sólo sin
+        # máscara (filas antiguas, altas desde el shell) se interpreta el texto
+        if not self.correct_mask:
+            self.correct_mask = answer_text_to_mask(self.question_type, self.options, self.answer)
+        if self.correct_mask:
+            self.answer = mask_to_answer_text(self.options, self.correct_mask)
+        self.content_hash = compute_content_hash(self.__dict__, self.HASH_FIELDS)
+        super().save(*args, **kwargs)
+        self._loaded_image = image_source(self.__dict__)
+
+    @property
+    def options(self):
+        return (self.option_a, self.option_b, self.option_c, self.option_d, self.option_e)
+
+    @property
+    def correct_letters(self):
+        return mask_to_letters(self.correct_mask)
+
     @property
     def question_type(self):
         return 'SINGLE'
@@ -35,13 +145,45 @@ class MultipleChoiceQuestion(models.Model):
     option_c = models.TextField()
     option_d = models.TextField()
     option_e = models.TextField(blank=True, null=True)
-    answer = models.TextField()  # Puede ser "A-B" para varias respuestas correctas
+    answer = models.TextField()  # Textos de las opciones correctas unidos por "-" (derivado de correct_mask)
+    correct_mask = models.PositiveSmallIntegerField(default=0, db_index=True)  # Letras correctas como bits (A=1 ... E=16)
     has_image = models.BooleanField(default=False)  # ¿Tiene imagen?
     image_filename = models.CharField(max_length=100, blank=True, null=True)  # Nombre del archivo
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)  # Dimensiones leídas del archivo
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_bytes = models.PositiveIntegerField(blank=True, null=True, editable=False)  # Tamaño del original
+    content_hash = models.CharField(max_length=64, blank=True, editable=False, db_index=True)  # Hash del contenido normalizado
+
+    HASH_FIELDS = ('text', 'option_a', 'option_b', 'option_c', 'option_d', 'option_e', 'answer', 'correct_mask', 'has_image', 'image_filename')
 
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = image_source(instance.__dict__)
+        return instance
+
+    def save(self, *args, **kwargs):
+        # correct_mask es la fuente de verdad y `answer` se deriva de ella; sólo sin
+        # máscara (filas antiguas, altas desde el shell) se interpreta el texto
+        if not self.correct_mask:
+            self.correct_mask = answer_text_to_mask(self.question_type, self.options, self.answer)
+        if self.correct_mask:
+            self.answer = mask_to_answer_text(self.options, self.correct_mask)
+        self.content_hash = compute_content_hash(self.__dict__, self.HASH_FIELDS)
+        super().save(*args, **kwargs)
+        self._loaded_image = image_source(self.__dict__)
+
+    @property
+    def options(self):
+        return (self.option_a, self.option_b, self.option_c, self.option_d, self.option_e)
+
+    @property
+    def correct_letters(self):
+        return mask_to_letters(self.correct_mask)
+
     @property
     def question_type(self):
         return 'MULTI'
@@ -61,10 +203,27 @@ class DragAndDropQuestion(models.Model):
     correct_answers = models.JSONField()  # Respuestas correctas asociadas a cada opción
     has_image = models.BooleanField(default=False)  # ¿Tiene imagen?
     image_filename = models.CharField(max_length=100, blank=True, null=True)  # Nombre del archivo
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)  # Dimensiones leídas del archivo
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_bytes = models.PositiveIntegerField(blank=True, null=True, editable=False)  # Tamaño del original
+    content_hash = models.CharField(max_length=64, blank=True, editable=False, db_index=True)  # Hash del contenido normalizado
+
+    HASH_FIELDS = ('text', 'options', 'correct_answers', 'has_image', 'image_filename')
 
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = image_source(instance.__dict__)
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.content_hash = compute_content_hash(self.__dict__, self.HASH_FIELDS)
+        super().save(*args, **kwargs)
+        self._loaded_image = image_source(self.__dict__)
+
     @property
     def question_type(self):
         return 'DRAG'
@@ -74,4 +233,208 @@ class DragAndDropQuestion(models.Model):
         """Retorna la ruta completa de la imagen si existe"""
         if self.has_image and self.image_filename:
             return f'images/{self.image_filename}'
-        return None
\ No newline at end of file
+        return None
+
+class ImportBatch(models.Model):
+    """Carga CSV validada pendiente de confirmación (se identifica por token)"""
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)  # Pasada esta fecha se descarta
+
+    def __str__(self):
+        return str(self.token)
+
+
+class StagedChange(models.Model):
+    """Cambio propuesto (CREATE/UPDATE) de una fila del CSV, guardado en el servidor"""
+    batch = models.ForeignKey(ImportBatch, on_delete=models.CASCADE, related_name='changes')
+    row = models.PositiveIntegerField()  # Línea del CSV
+    np = models.CharField(max_length=20)
+    question_type = models.CharField(max_length=10)
+    action = models.CharField(max_length=10)  # 'CREATE' | 'UPDATE'
+    diff = models.JSONField()  # en UPDATE: {campo: {"old":..., "new":...}}
+    payload = models.JSONField()  # datos normalizados a aplicar
+
+    class Meta:
+        indexes = [models.Index(fields=['batch', 'row'])]
+
+    def __str__(self):
+        return f'{self.np} ({self.action})'
+
+
+class ImageVariant(models.Model):
+    """Versión comprimida/redimensionada de una imagen de media/images (ver images.py)"""
+    image_filename = models.CharField(max_length=100, db_index=True)  # Igual que en las preguntas
+    source_hash = models.CharField(max_length=64)  # SHA-256 del archivo original
+    format = models.CharField(max_length=10)  # 'avif' | 'webp'
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    path = models.CharField(max_length=255)  # Relativa a MEDIA_ROOT
+    bytes = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image_filename', 'format', 'width'], name='unique_image_variant'),
+        ]
+
+    def __str__(self):
+        return self.path
+
+
+class QuestionReadModel(models.Model):
+    """
+    Fila desnormalizada por pregunta (de cualquier tipo) para las lecturas:
+    exámenes, estudio, práctica y claves de respuesta. Se mantiene en
+    sincronía desde read_model.py; no se edita directamente.
+    """
+    question_type = models.CharField(max_length=10)  # 'SINGLE' | 'MULTI' | 'DRAG'
+    question_id = models.PositiveIntegerField()  # id en la tabla de su tipo
+    np = models.CharField(max_length=20)
+    text = models.TextField()
+    options = models.JSONField(default=list)  # SINGLE/MULTI: [[letra, texto], ...] sin vacías; DRAG: lista de opciones
+    correct_mask = models.PositiveSmallIntegerField(default=0)
+    correct_letters = models.JSONField(default=list)  # ['A', 'C']
+    correct_answers = models.JSONField(default=list)  # Sólo DRAG
+    has_image = models.BooleanField(default=False)
+    image_filename = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+    image_width = models.PositiveIntegerField(blank=True, null=True)
+    image_height = models.PositiveIntegerField(blank=True, null=True)
+    image_bytes = models.PositiveIntegerField(blank=True, null=True)
+    image_sources = models.JSONField(default=list)  # <source> de <picture> (ver images.image_sources)
+    content_hash = models.CharField(max_length=64, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)  # Versión de la fila (clave de los fragmentos cacheados)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question_type', 'question_id'], name='unique_read_model_question'),
+        ]
+
+    def __str__(self):
+        return f'{self.question_type}:{self.question_id}'
+
+    @property
+    def image_path(self):
+        """Retorna la ruta completa de la imagen si existe"""
+        if self.has_image and self.image_filename:
+            return f'images/{self.image_filename}'
+        return None
+
+
+class BankVersion(models.Model):
+    """Contador global del banco de preguntas (fila única): sube con cada cambio, ver bank_version.py"""
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'v{self.version}'
+
+
+class IssuedExam(models.Model):
+    """
+    Preguntas de un examen (modo + semilla) fijadas la primera vez que se
+    muestrea: reabrirlo o corregirlo usa esta lista aunque el banco cambie.
+    """
+    mode = models.CharField(max_length=20)  # 'selection' | 'study' | 'practice'
+    seed = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()  # EXAM_SIZES del modo al emitirlo (0 = todo el banco)
+    question_ids = models.JSONField()  # ids de QuestionReadModel, en el orden del examen
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)  # Para descartarlo pasado EXAM_RETENTION_DAYS
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['mode', 'seed', 'size'], name='unique_issued_exam'),
+        ]
+
+    def __str__(self):
+        return f'{self.mode} #{self.seed}'
+
+
+class Attempt(models.Model):
+    """
+    Respuesta de un estudiante a una pregunta (verificación en la práctica o
+    examen corregido). Sólo se agregan filas, en lotes, desde attempts.py.
+    """
+    SOURCES = [('CHECK', 'Verificación'), ('EXAM', 'Examen')]
+
+    question_type = models.CharField(max_length=10)  # 'SINGLE' | 'MULTI'
+    question_id = models.PositiveIntegerField()  # id en la tabla de su tipo
+    chosen_mask = models.PositiveSmallIntegerField(default=0)  # Letras elegidas como bits (0: sin responder)
+    correct = models.BooleanField()
+    source = models.CharField(max_length=10, choices=SOURCES)
+    session_key = models.CharField(max_length=40, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)  # Momento de la respuesta, no de la escritura
+    recorded_at = models.DateTimeField(default=timezone.now)  # Momento de la escritura (attempts.flush); ver question_stats.rollup
+
+    class Meta:
+        indexes = [models.Index(fields=['question_type', 'question_id'])]
+
+    def __str__(self):
+        return f'{self.question_type}:{self.question_id} {"✓" if self.correct else "✗"}'
+
+    @property
+    def chosen_letters(self):
+        return mask_to_letters(self.chosen_mask)
+
+
+class QuestionStats(models.Model):
+    """
+    Acumulado de intentos por pregunta (dificultad). Lo mantiene
+    question_stats.rollup() de forma incremental; no se edita directamente.
+    """
+    question_type = models.CharField(max_length=10)  # 'SINGLE' | 'MULTI'
+    question_id = models.PositiveIntegerField()  # id en la tabla de su tipo
+    attempts = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    correct_rate = models.FloatField(default=0, db_index=True)  # correct_count / attempts, para ordenar
+    pick_a = models.PositiveIntegerField(default=0)  # Veces que se eligió cada opción
+    pick_b = models.PositiveIntegerField(default=0)
+    pick_c = models.PositiveIntegerField(default=0)
+    pick_d = models.PositiveIntegerField(default=0)
+    pick_e = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question_type', 'question_id'], name='unique_question_stats'),
+        ]
+
+    def __str__(self):
+        return f'{self.question_type}:{self.question_id} {self.correct_count}/{self.attempts}'
+
+    @property
+    def picks(self):
+        """{letra: veces elegida}"""
+        return {letter: getattr(self, f'pick_{letter.lower()}') for letter in LETTERS}
+
+
+class StatsWatermark(models.Model):
+    """Último Attempt ya sumado en QuestionStats (fila única, ver question_stats.py)"""
+    last_attempt_id = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'#{self.last_attempt_id}'
+
+
+class ReviewItem(models.Model):
+    """
+    Estado de repetición espaciada (SM-2) de una pregunta para un estudiante
+    (su sesión). Lo actualiza reviews.schedule() en lote con cada intento.
+    """
+    learner_key = models.CharField(max_length=40)  # session_key del estudiante
+    question_type = models.CharField(max_length=10)  # 'SINGLE' | 'MULTI'
+    question_id = models.PositiveIntegerField()  # id en la tabla de su tipo
+    repetitions = models.PositiveIntegerField(default=0)  # Aciertos seguidos en su fecha
+    interval_days = models.PositiveIntegerField(default=0)
+    ease = models.FloatField(default=2.5)  # Factor de facilidad de SM-2 (mínimo 1.3)
+    due_at = models.DateTimeField()
+    last_reviewed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['learner_key', 'question_type', 'question_id'], name='unique_review_item'),
+        ]
+        indexes = [models.Index(fields=['learner_key', 'due_at'])]  # "qué toca ahora": un rango por estudiante
+
+    def __str__(self):
+        return f'{self.learner_key[:8]} {self.question_type}:{self.question_id} → {self.due_at:%Y-%m-%d}'
@@ -0,0 +1,104 @@
+"""
+Dificultad por pregunta: acumulados incrementales de Attempt en QuestionStats.
+
+rollup() suma sólo los intentos posteriores a la marca de agua
+(StatsWatermark.last_attempt_id), en tramos de `batch_size` ids: un GROUP BY
+sobre el tramo, una lectura de los acumulados que toca y un upsert. Cada tramo
+se confirma en la misma transacción que la nueva marca, así que un corte a
+mitad no cuenta nada dos veces, y dos ejecuciones simultáneas se serializan
+con el bloqueo de la marca. El costo depende de los intentos nuevos, no del
+historial completo.
+
+La marca es el id de Attempt, y los ids no se confirman en orden: un lote de
+attempts.py puede confirmarse después de otro con ids mayores. Por eso cada
+tramo termina antes del primer intento escrito (recorded_at) hace menos de
+ROLLUP_SAFETY_SECONDS; esos quedan para la próxima ejecución. Un id menor que
+aún no se confirmó tendría que llevar abierta su transacción todo ese margen,
+y cada lote es un único INSERT de milisegundos.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+from .models import LETTER_BITS, LETTERS, Attempt, QuestionStats, StatsWatermark
+
+SINGLETON_PK = 1
+PICK_FIELDS = [f'pick_{letter.lower()}' for letter in LETTERS]
+
+
+def _deltas(after_id, last_id):
+    """Intentos, aciertos y elecciones por opción de cada pregunta con id en (after_id, last_id]"""
+    picks = {
+        field: Count('id', filter=Exact(F('chosen_mask').bitand(LETTER_BITS[letter]), LETTER_BITS[letter]))
+        for field, letter in zip(PICK_FIELDS, LETTERS)
+    }
+    return (
+        Attempt.objects.filter(id__gt=after_id, id__lte=last_id)
+        .values('question_type', 'question_id')
+        .annotate(attempts=Count('id'), correct_count=Count('id', filter=Q(correct=True)), **picks)
+        .order_by()
+    )
+
+
+def _apply(deltas, now):
+    keys = [(d['question_type'], d['question_id']) for d in deltas]
+    existing = {
+        (s.question_type, s.question_id): s
+        for s in QuestionStats.objects.filter(
+            question_type__in={qtype for qtype, _ in keys}, question_id__in={qid for _, qid in keys},
+        )
+    }
+    rows = []
+    for delta in deltas:
+        stats = existing.get((delta['question_type'], delta['question_id'])) or QuestionStats(
+            question_type=delta['question_type'], question_id=delta['question_id'],
+        )
+        for field in ('attempts', 'correct_count', *PICK_FIELDS):
+            setattr(stats, field, getattr(stats, field) + delta[field])
+        stats.correct_rate = stats.correct_count / stats.attempts
+        stats.updated_at = now
+        rows.append(stats)
+    QuestionStats.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['question_type', 'question_id'],
+        update_fields=['attempts', 'correct_count', 'correct_rate', *PICK_FIELDS, 'updated_at'],
+    )
+    return len(rows)
+
+
+def rollup(batch_size=50000):
+    """Suma los intentos nuevos; devuelve (intentos procesados, preguntas actualizadas)"""
+    processed = touched = 0
+    while True:
+        with transaction.atomic():
+            StatsWatermark.objects.get_or_create(pk=SINGLETON_PK)
+            mark = StatsWatermark.objects.select_for_update().get(pk=SINGLETON_PK)
+            pending = Attempt.objects.filter(id__gt=mark.last_attempt_id)
+            # Desde el primer intento escrito dentro del margen, todo espera a la próxima vez
+            cutoff = timezone.now() - timedelta(seconds=settings.ROLLUP_SAFETY_SECONDS)
+            first_recent = pending.filter(recorded_at__gte=cutoff).aggregate(first=Min('id'))['first']
+            if first_recent is not None:
+                pending = pending.filter(id__lt=first_recent)
+            # Fin del tramo: el id número `batch_size` pendiente, o el último si hay menos
+            last_id = pending.order_by('id').values_list('id', flat=True)[batch_size - 1:batch_size].first()
+            if last_id is None:
+                last_id = pending.aggregate(last=Max('id'))['last']
+            if last_id is None:
+                return processed, touched
+
+            now = timezone.now()
+            deltas = list(_deltas(mark.last_attempt_id, last_id))
+            touched += _apply(deltas, now)
+            processed += sum(d['attempts'] for d in deltas)
+            mark.last_attempt_id = last_id
+            mark.updated_at = now
+            mark.save(update_fields=['last_attempt_id', 'updated_at'])
+
+
+def watermark():
+    """(último intento sumado, fecha del último rollup) o (0, None) si nunca corrió"""
+    mark = StatsWatermark.objects.filter(pk=SINGLETON_PK).first()
+    return (mark.last_attempt_id, mark.updated_at) if mark else (0, None)
@@ -0,0 +1,100 @@
+"""
+Modelo de lectura desnormalizado (QuestionReadModel).
+
+Una fila por pregunta de cualquier tipo con todo lo que necesitan las páginas
+y la verificación: opciones ya filtradas, letras correctas, metadatos y
+variantes de imagen. Así cada lectura es una sola consulta indexada sobre una
+tabla, sin unir listas de tres modelos ni reformatear filas en Python.
+
+Se sincroniza desde signals.py (save/delete de cada pregunta), desde
+importer.apply_changes (escrituras masivas) y desde images.record_variants.
+`manage.py rebuild_read_model` la reconstruye entera.
+"""
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import bank_version
+from .images import image_sources
+from .models import (
+    SingleChoiceQuestion, MultipleChoiceQuestion, DragAndDropQuestion, QuestionReadModel, LETTERS, mask_to_letters,
+)
+
+SOURCE_MODELS = {
+    'SINGLE': SingleChoiceQuestion,
+    'MULTI': MultipleChoiceQuestion,
+    'DRAG': DragAndDropQuestion,
+}
+QUESTION_TYPES = {model: qtype for qtype, model in SOURCE_MODELS.items()}
+
+UPDATE_FIELDS = [
+    'np', 'text', 'options', 'correct_mask', 'correct_letters', 'correct_answers', 'has_image', 'image_filename',
+    'image_width', 'image_height', 'image_bytes', 'image_sources', 'content_hash', 'updated_at',
+]
+
+
+def build_row(qtype, question, sources=()):
+    """QuestionReadModel (sin guardar) para una pregunta de SOURCE_MODELS[qtype]"""
+    if qtype == 'DRAG':
+        options, correct_letters, correct_answers = question.options, [], question.correct_answers
+        correct_mask = 0
+    else:
+        options = [[letter, text] for letter, text in zip(LETTERS, question.options) if text]
+        correct_mask = question.correct_mask
+        correct_letters, correct_answers = mask_to_letters(correct_mask), []
+
+    return QuestionReadModel(
+        question_type=qtype,
+        question_id=question.pk,
+        np=question.np,
+        text=question.text,
+        options=options,
+        correct_mask=correct_mask,
+        correct_letters=correct_letters,
+        correct_answers=correct_answers,
+        has_image=question.has_image,
+        image_filename=question.image_filename,
+        image_width=question.image_width,
+        image_height=question.image_height,
+        image_bytes=question.image_bytes,
+        image_sources=list(sources),
+        content_hash=question.content_hash,
+        updated_at=timezone.now(),
+    )
+
+
+def sync(qtype, questions):
+    """Inserta o actualiza (un upsert) las filas de lectura de `questions`"""
+    questions = list(questions)
+    if not questions:
+        return
+    sources = image_sources(q.image_filename for q in questions if q.has_image)
+    rows = [build_row(qtype, q, sources.get(q.image_filename, ())) for q in questions]
+    QuestionReadModel.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['question_type', 'question_id'], update_fields=UPDATE_FIELDS
+    )
+
+
+def sync_nps(qtype, nps):
+    """Resincroniza por NP (después de un bulk_create/bulk_update del importador)"""
+    sync(qtype, SOURCE_MODELS[qtype].objects.filter(np__in=list(nps)))
+
+
+def remove(qtype, question_ids):
+    QuestionReadModel.objects.filter(question_type=qtype, question_id__in=list(question_ids)).delete()
+
+
+def rebuild(batch_size=500):
+    """Reconstruye todas las filas y borra las de preguntas que ya no existen. Devuelve el total"""
+    total = 0
+    with transaction.atomic():
+        for qtype, model in SOURCE_MODELS.items():
+            questions = model.objects.order_by('pk').iterator(chunk_size=batch_size)
+            while chunk := list(islice(questions, batch_size)):
+                sync(qtype, chunk)
+                total += len(chunk)
+            existing = model.objects.values('pk')
+            QuestionReadModel.objects.filter(question_type=qtype).exclude(question_id__in=existing).delete()
+        bank_version.bump()
+    return total
@@ -0,0 +1,110 @@
+"""
+Repaso espaciado (SM-2) por estudiante, identificado por su sesión.
+
+Cada intento que registra attempts.py (práctica, repaso o examen) se aplica
+aquí cuando el escritor de fondo vacía su búfer: schedule() lee los
+ReviewItem de las preguntas respondidas con una consulta y los guarda con un
+solo upsert, así la verificación de respuestas no espera a la base.
+
+Como sólo hay dos calificaciones (correcta o no), un acierto cuenta como
+calidad 4 y un error como 1. Un acierto antes de la fecha de repaso no
+alarga el intervalo (la pregunta sigue fresca); un error siempre la reinicia.
+El modo repaso pide las que vencen con due_questions(): un rango sobre el
+índice (learner_key, due_at).
+
+Todo depende de attempts.py: con ATTEMPT_LOG=False no se registran intentos,
+nada se programa y el modo repaso no está disponible. El estudiante es la
+session_key; learner_key() la crea (con su cookie) si la sesión todavía no
+existe, p. ej. en un examen de selección o con PRACTICE_CLIENT_VERIFY=False.
+"""
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import QuestionReadModel, ReviewItem
+
+QUALITY_CORRECT = 4
+QUALITY_WRONG = 1
+MIN_EASE = 1.3
+
+
+def learner_key(session):
+    """session_key del estudiante; si la sesión aún no existe la guarda para que tenga una"""
+    if session.session_key is None:
+        session.save()
+        session.modified = True  # Sin esto SessionMiddleware no envía la cookie de una sesión vacía
+    return session.session_key
+
+
+def review(item, quality, when):
+    """Aplica una respuesta de calidad `quality` (0-5) al ReviewItem, según SM-2"""
+    if quality >= 3:
+        if item.repetitions and when < item.due_at:
+            item.last_reviewed_at = when
+            return
+        item.interval_days = {0: 1, 1: 6}.get(item.repetitions) or round(item.interval_days * item.ease)
+        item.repetitions += 1
+    else:
+        item.repetitions = 0
+        item.interval_days = 1
+    item.ease = max(MIN_EASE, item.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    item.due_at = when + timedelta(days=item.interval_days)
+    item.last_reviewed_at = when
+
+
+def schedule(attempts):
+    """Actualiza en lote el repaso de los Attempt dados; devuelve cuántos ReviewItem cambiaron"""
+    answered = sorted((a for a in attempts if a.session_key), key=lambda a: a.created_at)
+    if not answered:
+        return 0
+    existing = {
+        (r.learner_key, r.question_type, r.question_id): r
+        for r in ReviewItem.objects.filter(
+            learner_key__in={a.session_key for a in answered},
+            question_type__in={a.question_type for a in answered},
+            question_id__in={a.question_id for a in answered},
+        )
+    }
+    touched = {}
+    for attempt in answered:
+        key = (attempt.session_key, attempt.question_type, attempt.question_id)
+        item = touched.get(key) or existing.get(key) or ReviewItem(
+            learner_key=attempt.session_key, question_type=attempt.question_type,
+            question_id=attempt.question_id, due_at=attempt.created_at,
+        )
+        review(item, QUALITY_CORRECT if attempt.correct else QUALITY_WRONG, attempt.created_at)
+        touched[key] = item
+
+    ReviewItem.objects.bulk_create(
+        touched.values(), update_conflicts=True, unique_fields=['learner_key', 'question_type', 'question_id'],
+        update_fields=['repetitions', 'interval_days', 'ease', 'due_at', 'last_reviewed_at'],
+    )
+    return len(touched)
+
+
+def due_questions(learner_key, limit):
+    """Las `limit` preguntas (QuestionReadModel) que le tocan ahora, la más atrasada primero"""
+    if not learner_key:
+        return []
+    due = list(
+        ReviewItem.objects.filter(learner_key=learner_key, due_at__lte=timezone.now())
+        .order_by('due_at').values_list('question_type', 'question_id')[:limit]
+    )
+    if not due:
+        return []
+    match = Q()
+    for qtype, qid in due:
+        match |= Q(question_type=qtype, question_id=qid)
+    rows = {(q.question_type, q.question_id): q for q in QuestionReadModel.objects.filter(match)}
+    return [rows[key] for key in due if key in rows]  # Las borradas del banco se saltan
+
+
+def next_due(learner_key):
+    """Fecha del próximo repaso pendiente (o None)"""
+    if not learner_key:
+        return None
+    return (
+        ReviewItem.objects.filter(learner_key=learner_key)
+        .order_by('due_at').values_list('due_at', flat=True).first()
+    )
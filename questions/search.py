@@ -0,0 +1,62 @@
+"""
+Búsqueda de texto completo sobre el banco (texto y opciones de cada pregunta).
+
+Usa el índice que crea la migración 0010 sobre QuestionReadModel:
+search_vector + GIN en PostgreSQL (consultas en español e inglés) y la tabla
+FTS5 questions_search_fts en SQLite. Con otros motores cae a icontains sobre
+el texto. Devuelve siempre un QuerySet ordenado por relevancia, así que sirve
+igual para el admin y para las vistas.
+"""
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Func, Value
+from django.db.models.expressions import RawSQL
+
+from .models import QuestionReadModel
+
+FTS_TABLE = 'questions_search_fts'
+
+PG_QUERY = "(websearch_to_tsquery('spanish', %s) || websearch_to_tsquery('english', %s))"
+
+
+def _fts5_query(query):
+    """
+    Términos entre comillas para que la entrada del usuario no se interprete como
+    sintaxis FTS5; el último busca por prefijo (búsqueda mientras se escribe).
+    """
+    terms = ['"{}"'.format(term.replace('"', '""')) for term in query.split()]
+    if terms:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_questions(query, question_types=None):
+    """QuerySet de QuestionReadModel que coincide con `query`, el más relevante primero"""
+    query = (query or '').strip()
+    questions = QuestionReadModel.objects.all()
+    if question_types:
+        questions = questions.filter(question_type__in=question_types)
+    if not query:
+        return questions.none()
+
+    # Las columnas van sin tabla: el QuerySet puede usarse como subconsulta (con alias)
+    if connection.vendor == 'postgresql':
+        params = (query, query)
+        return questions.filter(
+            RawSQL(f'search_vector @@ {PG_QUERY}', params, output_field=BooleanField())
+        ).annotate(
+            rank=RawSQL(f'ts_rank(search_vector, {PG_QUERY})', params, output_field=FloatField())
+        ).order_by('-rank', 'pk')
+
+    if connection.vendor == 'sqlite':
+        match = _fts5_query(query)
+        return questions.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,))
+        ).annotate(
+            # rank de FTS5 (bm25) de la fila: menor es más relevante
+            rank=Func(
+                Value(match), F('pk'), template=f'(SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %(expressions)s)',
+                arg_joiner=' AND rowid = ', output_field=FloatField(),
+            )
+        ).order_by('rank', 'pk')
+
+    return questions.filter(text__icontains=query).order_by('pk')
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from . import bank_version, read_model
+from .images import refresh_image_metadata
+from .models import SingleChoiceQuestion, MultipleChoiceQuestion, DragAndDropQuestion
+
+# Se emite cuando el banco cambia sin pasar por save()/delete() de cada
+# pregunta (por ejemplo, al aplicar una carga CSV completa).
+bank_changed = Signal()
+
+QUESTION_MODELS = (SingleChoiceQuestion, MultipleChoiceQuestion, DragAndDropQuestion)
+
+
+@receiver(bank_changed)
+def _on_question_changed(sender, **kwargs):
+    # Sube la versión del banco en la misma transacción; las claves de respuesta,
+    # los ETag y la caché la ven recién al confirmar (ver bank_version.py)
+    bank_version.bump()
+
+
+def _fill_image_metadata(sender, instance, **kwargs):
+    # Ediciones desde el admin/shell: las cargas CSV ya traen estos campos. Sólo
+    # se lee el archivo si cambió la imagen de la pregunta
+    refresh_image_metadata([instance])
+
+
+def _sync_read_model(sender, instance, **kwargs):
+    # En la misma transacción que el save(): la fila de lectura nunca queda atrás
+    read_model.sync(read_model.QUESTION_TYPES[sender], [instance])
+
+
+def _remove_read_model(sender, instance, **kwargs):
+    read_model.remove(read_model.QUESTION_TYPES[sender], [instance.pk])
+
+
+for _model in QUESTION_MODELS:
+    pre_save.connect(_fill_image_metadata, sender=_model, dispatch_uid=f'question_image_meta_{_model.__name__}')
+    post_save.connect(_on_question_changed, sender=_model, dispatch_uid=f'question_saved_{_model.__name__}')
+    post_delete.connect(_on_question_changed, sender=_model, dispatch_uid=f'question_deleted_{_model.__name__}')
+    post_save.connect(_sync_read_model, sender=_model, dispatch_uid=f'question_read_model_saved_{_model.__name__}')
+    post_delete.connect(_remove_read_model, sender=_model, dispatch_uid=f'question_read_model_deleted_{_model.__name__}')
@@ -10,19 +10,27 @@ document.addEventListener('DOMContentLoaded', () => {
   const progressEl  = document.getElementById('pageProgress');
   const csrfToken   = document.getElementById('csrfToken')?.value;
 
+  const meta        = document.getElementById('examMeta');
+  const nav         = document.querySelector('.wizard-nav');
+
   let current = 0;
-  const total = questions.length;
+  // El HTML trae sólo la primera página; el total real viene del servidor
+  const total = Number(meta?.dataset.total) || questions.length;
+  const PREFETCH_AHEAD = 5;  // pedir la página siguiente cuando quedan estas preguntas cargadas
 
-  // Estado por pregunta: qid -> { attempted, correct, pending, lastReqId, abortCtl }
+  // Estado por pregunta: "TIPO:id" -> { attempted, correct, pending, lastReqId }
+  // (los ids se repiten entre SINGLE y MULTI: la clave lleva siempre el tipo)
   const qState = new Map();
 
   const getQid = (fieldset) => fieldset?.dataset?.qid;
+  const questionKey = (qtype, qid) => `${qtype}:${qid}`;
+  const getKey = (fieldset) => questionKey(fieldset?.dataset?.qtype, getQid(fieldset));
 
-  const ensureState = (qid) => {
-    if (!qState.has(qid)) {
-      qState.set(qid, { attempted:false, correct:false, pending:false, lastReqId:0, abortCtl:null });
+  const ensureState = (key) => {
+    if (!qState.has(key)) {
+      qState.set(key, { attempted:false, correct:false, pending:false, lastReqId:0 });
     }
-    return qState.get(qid);
+    return qState.get(key);
   };
 
   // --- UI helpers ---
@@ -43,12 +51,167 @@ document.addEventListener('DOMContentLoaded', () => {
     prevBtn.disabled = current === 0;
 
     const fs = questions[current];
-    const qid = getQid(fs);
-    const st  = ensureState(qid);
+    const st  = ensureState(getKey(fs));
     // “Siguiente” habilitado solo si la actual fue validada y no está pendiente
     nextBtn.disabled = !(st.attempted && !st.pending);
   };
 
+  // Imágenes bajo demanda: el HTML sólo trae data-src/data-srcset y el
+  // contenedor ya reserva su espacio; se cargan la actual y la siguiente
+  const loadImage = (idx) => {
+    const container = questions[idx]?.querySelector('.question-image');
+    const img = container?.querySelector('img[data-src]');
+    if (!img) return;
+
+    container.classList.add('loading');
+    img.onload  = () => container.classList.remove('loading');
+    img.onerror = () => { container.style.display = 'none'; };
+    container.querySelectorAll('source[data-srcset]').forEach((source) => {
+      source.srcset = source.dataset.srcset;
+      source.removeAttribute('data-srcset');
+    });
+    img.src = img.dataset.src;
+    img.removeAttribute('data-src');
+  };
+
+  // --- Páginas siguientes (api/questions/) ---
+  const appendLines = (el, text) => {
+    // Equivalente a |linebreaksbr sin interpretar HTML
+    (text || '').split('\n').forEach((line, i) => {
+      if (i) el.appendChild(document.createElement('br'));
+      el.appendChild(document.createTextNode(line));
+    });
+  };
+
+  const buildImage = (q) => {
+    const container = document.createElement('div');
+    container.className = 'question-image lazy-image';
+    if (q.image_width && q.image_height) {
+      container.style.aspectRatio = `${q.image_width} / ${q.image_height}`;
+      container.style.maxWidth = `${q.image_width}px`;
+    }
+    const picture = document.createElement('picture');
+    (q.image_sources || []).forEach((s) => {
+      const source = document.createElement('source');
+      source.type = s.type;
+      source.dataset.srcset = s.srcset;
+      source.sizes = '(max-width: 900px) 100vw, 900px';
+      picture.appendChild(source);
+    });
+    const img = document.createElement('img');
+    img.dataset.src = `/media/${q.image_path}`;
+    img.alt = 'Imagen de la pregunta';
+    img.decoding = 'async';
+    if (q.image_width && q.image_height) { img.width = q.image_width; img.height = q.image_height; }
+    picture.appendChild(img);
+    container.appendChild(picture);
+    return container;
+  };
+
+  // Mismo markup que exam/_practice_question.html
+  const buildQuestion = (q) => {
+    const fs = document.createElement('fieldset');
+    fs.className = 'question hidden';
+    fs.dataset.qid = q.id;
+    fs.dataset.qtype = q.question_type;
+
+    if (q.image_path) fs.appendChild(buildImage(q));
+
+    const title = document.createElement('h2');
+    title.className = 'question-text';
+    appendLines(title, q.text);
+    fs.appendChild(title);
+
+    q.options.forEach(([letter, content]) => {
+      const option = document.createElement('div');
+      option.className = 'option';
+      const label = document.createElement('label');
+      const input = document.createElement('input');
+      input.type = q.question_type === 'SINGLE' ? 'radio' : 'checkbox';
+      input.name = `q_${q.id}`;
+      input.value = letter;
+      const text = document.createElement('div');
+      text.className = 'option-text';
+      const letterEl = document.createElement('span');
+      letterEl.className = 'option-letter';
+      letterEl.textContent = `${letter})`;
+      const contentEl = document.createElement('span');
+      contentEl.className = 'option-content';
+      appendLines(contentEl, content);
+      text.append(letterEl, contentEl);
+      label.append(input, text);
+      option.appendChild(label);
+      fs.appendChild(option);
+    });
+
+    if (q.question_type === 'MULTI') {
+      const confirmBtn = document.createElement('button');
+      confirmBtn.type = 'button';
+      confirmBtn.className = 'nav-btn confirm-multi';
+      confirmBtn.textContent = 'Confirmar selección';
+      fs.appendChild(confirmBtn);
+    }
+
+    const badge = document.createElement('div');
+    badge.className = 'result-badge';
+    badge.setAttribute('aria-live', 'polite');
+    fs.appendChild(badge);
+    return fs;
+  };
+
+  // --- Verificación local (resúmenes HMAC, ver questions/answer_digests.py) ---
+  // Sin crypto.subtle (HTTP sin TLS, navegadores viejos) todo va al servidor
+  const salt = meta?.dataset.salt;
+  const subtle = window.crypto?.subtle;
+  const canVerifyLocally = !!(salt && subtle);
+  let hmacKey = null;
+
+  const localDigest = async (qtype, qid, letters) => {
+    const encoder = new TextEncoder();
+    hmacKey ??= subtle.importKey('raw', encoder.encode(salt), { name: 'HMAC', hash: 'SHA-256' }, false, ['sign']);
+    const message = `${qtype}:${qid}:${[...letters].sort().join('')}`;
+    const signature = await subtle.sign('HMAC', await hmacKey, encoder.encode(message));
+    return Array.from(new Uint8Array(signature), (b) => b.toString(16).padStart(2, '0')).join('');
+  };
+
+  let nextCursor = meta?.dataset.nextCursor || null;
+  let pageRequest = null;
+
+  // Trae la página siguiente en segundo plano (una sola solicitud a la vez)
+  const fetchNextPage = () => {
+    if (!nextCursor) return Promise.resolve();
+    if (pageRequest) return pageRequest;
+
+    const params = new URLSearchParams({ mode: 'practice', seed: meta.dataset.seed, cursor: nextCursor });
+    // Los resúmenes de la página van aparte (dependen de la sesión y no se cachean);
+    // si fallan, esas preguntas se verifican en el servidor
+    const digests = canVerifyLocally
+      ? fetch(`${meta.dataset.digestsApi}?${params}`, { credentials: 'same-origin' })
+          .then((res) => (res.ok ? res.json() : { digests: {} }))
+          .then((data) => data.digests)
+          .catch(() => ({}))
+      : Promise.resolve({});
+    pageRequest = withTimeout(Promise.all([fetch(`${meta.dataset.api}?${params}`), digests]))
+      .then(async ([res, pageDigests]) => {
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        return [await res.json(), pageDigests];
+      })
+      .then(([page, pageDigests]) => {
+        page.questions.forEach((q) => {
+          const fieldset = buildQuestion(q);
+          const digest = pageDigests[`${q.question_type}:${q.id}`];
+          if (digest) fieldset.dataset.digest = digest;
+          nav.before(fieldset);
+          attach(fieldset, questions.length);
+          questions.push(fieldset);
+        });
+        nextCursor = page.next_cursor;
+      })
+      .catch((err) => console.warn('No se pudo cargar la siguiente página de preguntas', err))
+      .finally(() => { pageRequest = null; });
+    return pageRequest;
+  };
+
   const show = (idx) => {
     questions.forEach((q, i) => {
       q.classList.toggle('hidden', i !== idx);
@@ -56,11 +219,13 @@ document.addEventListener('DOMContentLoaded', () => {
     });
     current = idx;
     updateHeader();
+    loadImage(idx);
+    loadImage(idx + 1);
+    if (questions.length - idx <= PREFETCH_AHEAD) fetchNextPage();
   };
 
   const setPending = (fieldset, isPending, message = null) => {
-    const qid = getQid(fieldset);
-    const st  = ensureState(qid);
+    const st  = ensureState(getKey(fieldset));
     st.pending = isPending;
 
     // Deshabilitar/rehabilitar inputs
@@ -124,43 +289,116 @@ document.addEventListener('DOMContentLoaded', () => {
       : `<span class="result-bad">❌ Incorrecto. Respuesta: ${result.correct_letters.join(', ')}</span>`;
   };
 
-  // --- Red segura con cancelación + timeout + requestId ---
+  // --- Red segura con timeout + requestId ---
   const withTimeout = (p, ms = 8000) =>
     Promise.race([ p, new Promise((_, rej) => setTimeout(() => rej(new Error('timeout')), ms)) ]);
 
+  // --- Verificación en lote (api/check-answers/) ---
+  // Las respuestas se encolan y se envían juntas tras una ventana corta; sin
+  // conexión quedan en cola y salen en un solo lote al volver la red.
+  const BATCH_WINDOW_MS = 150;
+  const MAX_BATCH = 50;  // settings.CHECK_ANSWERS_MAX_ITEMS
+  const checkQueue = new Map();  // "TIPO:id" -> { payload, resolve, reject }
+  const payloadKey = (payload) => questionKey(payload.question_type, payload.question_id);
+  let flushTimer = null;
+
+  const scheduleFlush = () => {
+    if (flushTimer || !checkQueue.size || !navigator.onLine) return;
+    flushTimer = setTimeout(flushChecks, BATCH_WINDOW_MS);
+  };
+
+  const flushChecks = async () => {
+    flushTimer = null;
+    const entries = Array.from(checkQueue.values()).slice(0, MAX_BATCH);
+    entries.forEach((e) => checkQueue.delete(payloadKey(e.payload)));
+    scheduleFlush();  // lo que no entró en este lote
+
+    try {
+      const res = await withTimeout(fetch(meta?.dataset.checkApi || '/api/check-answers/', {
+        method: 'POST',
+        headers: { 'X-CSRFToken': csrfToken, 'Content-Type': 'application/json' },
+        body: JSON.stringify({ items: entries.map((e) => e.payload) })
+      }));
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const { results } = await res.json();
+      entries.forEach((e, i) => {
+        const result = results[i];
+        if (!result || result.error) e.reject(new Error(result?.error || 'sin resultado'));
+        else e.resolve(result);
+      });
+    } catch (err) {
+      if (!navigator.onLine) {
+        // Se cortó la red a mitad: volver a encolar (sin pisar respuestas más nuevas)
+        entries.forEach((e) => {
+          const key = payloadKey(e.payload);
+          if (!checkQueue.has(key)) checkQueue.set(key, e);
+        });
+        entries.forEach((e) => e.onQueued?.());
+        return;
+      }
+      entries.forEach((e) => e.reject(err));
+    }
+  };
+
+  window.addEventListener('online', scheduleFlush);
+
+  const checkAnswer = (payload, onQueued) => new Promise((resolve, reject) => {
+    const key = payloadKey(payload);
+    checkQueue.get(key)?.reject(new DOMException('reemplazada', 'AbortError'));
+    checkQueue.set(key, { payload, resolve, reject, onQueued });
+    if (!navigator.onLine) onQueued?.();
+    scheduleFlush();
+  });
+
+  // Veredicto inmediato en el navegador; el servidor (en segundo plano y en lote)
+  // aporta las letras correctas cuando se falló y registra el intento
+  const localCheck = async (fieldset, payload) => {
+    const st = ensureState(getKey(fieldset));
+    const letters = Array.isArray(payload.answer) ? payload.answer : [payload.answer];
+    const correct = (await localDigest(payload.question_type, payload.question_id, letters)) === fieldset.dataset.digest;
+
+    st.attempted = true;
+    st.correct = correct;
+    paintFeedback(fieldset, { correct, correct_letters: correct ? letters : [] }, letters);
+    const badge = fieldset.querySelector('.result-badge');
+    if (!correct) badge.innerHTML = `<span class="result-bad">❌ Incorrecto.</span>`;
+    lockQuestion(fieldset);
+    recomputeScore();
+    updateHeader();
+
+    checkAnswer(payload)
+      .then((json) => { if (!correct) paintFeedback(fieldset, json, letters); })
+      .catch(() => {});  // el veredicto ya se mostró; sólo faltan las letras
+    return { ok:true, local:true };
+  };
+
   const safeCheck = async (fieldset, payload) => {
-    const qid = getQid(fieldset);
-    const st  = ensureState(qid);
+    if (canVerifyLocally && fieldset.dataset.digest) {
+      try {
+        return await localCheck(fieldset, payload);
+      } catch (err) {
+        console.warn('Verificación local no disponible; se usa el servidor', err);
+      }
+    }
+
+    const st  = ensureState(getKey(fieldset));
 
-    // Cancelar solicitud previa
-    if (st.abortCtl) st.abortCtl.abort();
-    st.abortCtl = new AbortController();
     st.lastReqId += 1;
     const myReq = st.lastReqId;
 
-    // Body form-urlencoded
-    const body = new URLSearchParams();
-    Object.entries(payload).forEach(([k, v]) => {
-      if (Array.isArray(v)) v.forEach(item => body.append(k, item));
-      else body.append(k, v);
-    });
-
     setPending(fieldset, true);
 
     try {
-      const res = await withTimeout(fetch('/api/check-answer/', {
-        method: 'POST',
-        headers: { 'X-CSRFToken': csrfToken, 'Content-Type': 'application/x-www-form-urlencoded' },
-        body,
-        signal: st.abortCtl.signal
-      }));
+      const json = await checkAnswer(payload, () => {
+        if (myReq === st.lastReqId) {
+          fieldset.querySelector('.result-badge').innerHTML =
+            `<span class="result-pending">📴 Sin conexión: se verificará al reconectar</span>`;
+        }
+      });
 
       // Ignorar respuestas viejas
       if (myReq !== st.lastReqId) return { stale:true };
 
-      if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      const json = await res.json();
-
       if (!st.attempted) st.attempted = true;
       st.correct = !!json.correct;
 
@@ -203,7 +441,6 @@ document.addEventListener('DOMContentLoaded', () => {
       return { error: err };
 
     } finally {
-      if (myReq === st.lastReqId) st.abortCtl = null;
       updateHeader();
     }
   };
@@ -211,7 +448,7 @@ document.addEventListener('DOMContentLoaded', () => {
   // --- Handlers ---
   const handleSingle = (fieldset) => {
     const qid = getQid(fieldset);
-    const st  = ensureState(qid);
+    const st  = ensureState(getKey(fieldset));
     if (st.attempted || st.pending) return;
 
     const selected = fieldset.querySelector('input[type="radio"]:checked');
@@ -226,7 +463,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
   const handleMultiConfirm = (fieldset) => {
     const qid = getQid(fieldset);
-    const st  = ensureState(qid);
+    const st  = ensureState(getKey(fieldset));
     if (st.attempted || st.pending) return;
 
     const checked = Array.from(fieldset.querySelectorAll('input[type="checkbox"]:checked')).map(i => i.value);
@@ -245,7 +482,7 @@ document.addEventListener('DOMContentLoaded', () => {
   };
 
   // --- Listeners por pregunta ---
-  questions.forEach((fieldset, idx) => {
+  const attach = (fieldset, idx) => {
     fieldset.dataset.index = idx;
 
     fieldset.addEventListener('change', (e) => {
@@ -261,11 +498,17 @@ document.addEventListener('DOMContentLoaded', () => {
     if (confirmBtn) {
       confirmBtn.addEventListener('click', () => handleMultiConfirm(fieldset));
     }
-  });
+  };
+  questions.forEach(attach);
 
   // --- Navegación ---
   prevBtn.addEventListener('click', () => { if (current > 0) show(current - 1); });
-  nextBtn.addEventListener('click', () => { if (current < total - 1) show(current + 1); });
+  nextBtn.addEventListener('click', async () => {
+    if (current >= total - 1) return;
+    // Si la siguiente aún no llegó (red lenta), esperar a su página
+    if (current + 1 >= questions.length) await fetchNextPage();
+    if (current + 1 < questions.length) show(current + 1);
+  });
 
   // --- Inicio ---
   recomputeScore();
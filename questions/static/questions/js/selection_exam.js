@@ -17,72 +17,38 @@ document.addEventListener('DOMContentLoaded', () => {
     // Cache de imágenes cargadas
     const imageCache = new Map();
 
-    // Función para cargar imagen progresivamente
-    const loadImage = async (questionIndex) => {
+    // Cargar la imagen de una pregunta bajo demanda: el HTML sólo trae
+    // data-src/data-srcset y el contenedor ya reserva su espacio (ancho/alto)
+    const loadImage = (questionIndex) => {
         const question = questions[questionIndex];
-        if (!question) return;
-
-        const imageElement = question.querySelector('.question-image img');
-        if (!imageElement || imageCache.has(questionIndex)) return;
-
-        const imageSrc = imageElement.src;
-        if (!imageSrc || imageSrc.includes('data:') || imageSrc === '') return;
-
-        try {
-            // Crear loader si no existe
-            let loader = question.querySelector('.image-loader');
-            if (!loader) {
-                loader = document.createElement('div');
-                loader.className = 'image-loader';
-                loader.innerHTML = '<div class="loader-spinner"></div>';
-                
-                const imageContainer = question.querySelector('.question-image');
-                if (imageContainer) {
-                    imageContainer.prepend(loader);
-                    imageElement.style.display = 'none';
-                }
-            }
-
-            // Precargar imagen
-            const img = new Image();
-            
-            img.onload = () => {
-                // Crear contenedor con efecto
-                const container = document.createElement('div');
-                container.className = 'image-container';
-                
-                const newImg = imageElement.cloneNode(true);
-                newImg.style.opacity = '0';
-                newImg.style.transition = 'opacity 0.5s ease';
-                newImg.style.display = 'block';
-                container.appendChild(newImg);
-                
-                // Reemplazar loader con imagen
-                if (loader && loader.parentNode) {
-                    loader.replaceWith(container);
-                }
-                
-                // Fade in effect
-                setTimeout(() => {
-                    newImg.style.opacity = '1';
-                }, 100);
-
-                imageCache.set(questionIndex, container);
-            };
-
-            img.onerror = () => {
-                // Si falla, ocultar el contenedor de imagen
-                if (loader && loader.parentNode) {
-                    loader.style.display = 'none';
-                }
-                console.warn(`Error loading image for question ${questionIndex + 1}`);
-            };
-
-            img.src = imageSrc;
-            
-        } catch (error) {
-            console.error('Error in loadImage:', error);
-        }
+        if (!question || imageCache.has(questionIndex)) return;
+
+        const container = question.querySelector('.question-image');
+        const imageElement = container?.querySelector('img[data-src]');
+        if (!imageElement) return;
+        imageCache.set(questionIndex, container);
+
+        container.classList.add('loading');
+        imageElement.style.opacity = '0';
+        imageElement.style.transition = 'opacity 0.5s ease';
+
+        imageElement.onload = () => {
+            container.classList.remove('loading');
+            imageElement.style.opacity = '1';
+        };
+
+        imageElement.onerror = () => {
+            // Si falla, ocultar el contenedor de imagen
+            container.style.display = 'none';
+            console.warn(`Error loading image for question ${questionIndex + 1}`);
+        };
+
+        container.querySelectorAll('source[data-srcset]').forEach((source) => {
+            source.srcset = source.dataset.srcset;
+            source.removeAttribute('data-srcset');
+        });
+        imageElement.src = imageElement.dataset.src;
+        imageElement.removeAttribute('data-src');
     };
 
     // Precargar imagen actual y siguiente
@@ -1,3 +1,975 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import answer_keys, attempts, bank_version, exams, fragments, images, importer, question_stats, reviews, search
+from .answer_digests import answer_digest, question_digests
+from .forms import MultipleChoiceQuestionForm
+from .grading import grade_submission, parse_submission
+from .models import (
+    Attempt, BankVersion, ImageVariant, ImportBatch, MultipleChoiceQuestion, QuestionReadModel, QuestionStats, ReviewItem,
+    SingleChoiceQuestion, answer_text_to_mask,
+)
+
+CSV_HEADER = 'Question,OptionA,OptionB,OptionC,OptionD,Answer,question_type,Image,NP\n'
+
+
+def byte_chunks(text, size, encoding='utf-8'):
+    """Trozos de `size` bytes, como UploadedFile.chunks() (pueden partir un carácter)"""
+    data = text.encode(encoding) if isinstance(text, str) else text
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def query_dict(data):
+    """QueryDict como request.POST a partir de {campo: [valores]}"""
+    query = QueryDict(mutable=True)
+    for key, values in data.items():
+        query.setlist(key, values)
+    return query
+
+
+# Sin escritor de intentos de fondo: usaría otra conexión, fuera de la transacción del test
+@override_settings(ATTEMPT_LOG=False)
+class QuestionsTestCase(TestCase):
+    def setUp(self):
+        # Cada test revierte la base y la versión puede repetirse: nada cacheado de otro test
+        cache.clear()
+        answer_keys._local.clear()
+        bank_version._forget()
+
+    def single(self, np='S1', answer='dos'):
+        return SingleChoiceQuestion.objects.create(
+            np=np, text=f'Pregunta {np}', option_a='uno', option_b='dos', option_c='tres', option_d='cuatro', option_e='', answer=answer,
+        )
+
+    def multi(self, np='M1', answer='x-1-z-2'):
+        return MultipleChoiceQuestion.objects.create(
+            np=np, text=f'Pregunta {np}', option_a='x-1', option_b='y', option_c='z-2', option_d='w', option_e='', answer=answer,
+        )
+
+
+class AnswerKeyTests(QuestionsTestCase):
+    def check(self, question, answer):
+        data = {'question_id': question.pk, 'question_type': question.question_type, 'answer': answer}
+        return self.client.post(reverse('check_answer_api'), data).json()
+
+    def test_warm_check_does_not_query(self):
+        single = self.single()
+        self.assertEqual(self.check(single, 'A'), {'correct': False, 'correct_letters': ['B'], 'explain': None})
+        with self.assertNumQueries(0):
+            self.assertTrue(self.check(single, 'B')['correct'])
+
+    def test_save_invalidates_on_commit(self):
+        single = self.single()
+        self.check(single, 'B')
+        with self.captureOnCommitCallbacks(execute=True):
+            single.correct_mask = 0b100
+            single.save()
+        self.assertEqual(self.check(single, 'C'), {'correct': True, 'correct_letters': ['C'], 'explain': None})
+
+    def test_unknown_question_is_rejected(self):
+        response = self.client.post(reverse('check_answer_api'), {'question_id': 999, 'question_type': 'SINGLE', 'answer': 'A'})
+        self.assertEqual(response.status_code, 400)
+
+
+def single_payload(text, answer='dos', mask=0b10):
+    return {
+        'text': text, 'option_a': 'uno', 'option_b': 'dos', 'option_c': 'tres', 'option_d': 'cuatro', 'option_e': '',
+        'answer': answer, 'correct_mask': mask, 'has_image': False, 'image_filename': None,
+        'image_width': None, 'image_height': None, 'image_bytes': None,
+    }
+
+
+class ApplyChangesTests(QuestionsTestCase):
+    def test_creates_and_updates_in_batches(self):
+        self.single(np='S1')
+        proposed = [
+            {'question_type': 'SINGLE', 'np': np, 'new': {'np': np, **single_payload(f'texto {np}')}}
+            for np in ('S1', 'S2', 'S3', 'S4')
+        ]
+        report = importer.apply_changes(proposed, batch_size=2)
+        self.assertEqual((report['created'], report['updated']), (3, 1))
+        # Un lote de `batch_size` cambios a la vez: [S1 (existe), S2], luego [S3, S4]
+        self.assertEqual([(b['operation'], b['rows']) for b in report['batches']], [
+            ('create', 1), ('update', 1), ('read_model', 2), ('create', 2), ('read_model', 2),
+        ])
+        self.assertEqual(SingleChoiceQuestion.objects.get(np='S1').text, 'texto S1')
+
+    def test_failure_rolls_back_the_whole_import(self):
+        proposed = [
+            {'question_type': 'SINGLE', 'np': 'S1', 'new': single_payload('nueva')},
+            {'question_type': 'MULTI', 'np': 'M1', 'new': {'campo_inexistente': 1}},
+        ]
+        with self.assertRaises(TypeError):
+            importer.apply_changes(proposed)
+        self.assertFalse(SingleChoiceQuestion.objects.exists())
+
+
+class PreviewQueryTests(QuestionsTestCase):
+    def rows(self, codes):
+        return [(i, 'SINGLE', np, {'np': np, **single_payload(f'texto {np}')}) for i, np in enumerate(codes, start=2)]
+
+    def test_preview_loads_existing_rows_in_bulk(self):
+        for np in ('S1', 'S2', 'S3'):
+            self.single(np=np)
+        rows = self.rows([f'S{i}' for i in range(1, 51)])
+        with self.assertNumQueries(2):  # hashes guardados + in_bulk de las que cambiaron
+            changes = list(importer.iter_proposed_changes(rows))
+        self.assertEqual([c['action'] for c in changes[:4]], ['UPDATE', 'UPDATE', 'UPDATE', 'CREATE'])
+        self.assertEqual(changes[0]['diff'], {'text': {'old': 'Pregunta S1', 'new': 'texto S1'}})
+
+    def test_large_previews_are_chunked(self):
+        with self.assertNumQueries(3):
+            list(importer.iter_proposed_changes(self.rows(['S1', 'S2', 'S3', 'S4', 'S5']), chunk_size=2))
+
+
+class CsvParsingTests(QuestionsTestCase):
+    def parse(self, data, chunk_size=7, **kwargs):
+        errors = []
+        rows = list(importer.parse_csv_rows(importer.iter_csv_lines(byte_chunks(data, chunk_size)), errors, **kwargs))
+        return rows, errors
+
+    def test_crlf_and_multiline_fields_across_chunks(self):
+        data = (CSV_HEADER + '"¿Qué hace\nla señal?","a","b","c","d","B","SINGLE","0","C1"\n'
+                '"q2","a","b","c","d","A-C","MULTI","0","C2"\n').replace('\n', '\r\n')
+        rows, errors = self.parse(data)
+        self.assertEqual(errors, [])
+        self.assertEqual([(line, qtype, np) for line, qtype, np, _ in rows], [(2, 'SINGLE', 'C1'), (3, 'MULTI', 'C2')])
+        self.assertEqual(rows[0][3]['text'], '¿Qué hace\r\nla señal?')
+        self.assertEqual(rows[1][3]['answer'], 'a-c')
+
+    def test_reported_errors_are_capped(self):
+        data = CSV_HEADER + ''.join(f'"q{i}","a","b","c","d","Z","SINGLE","0","E{i}"\n' for i in range(20))
+        rows, errors = self.parse(data, max_errors=3)
+        self.assertEqual(rows, [])
+        self.assertEqual(len(errors), 4)
+        self.assertTrue(errors[0].startswith('🔴 Línea 2:'))
+        self.assertEqual(errors[-1], '... (más errores omitidos)')
+
+    def test_bad_encoding_is_reported(self):
+        rows, errors = self.parse(CSV_HEADER.encode() + b'"caf\xe9","a","b","c","d","A","SINGLE","0","X1"\n')
+        self.assertEqual(rows, [])
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith('❌ Error leyendo CSV'))
+
+    def test_missing_columns(self):
+        rows, errors = self.parse('Question,OptionA\n"q","a"\n')
+        self.assertEqual((rows, len(errors)), ([], 1))
+        self.assertIn('Columnas faltantes', errors[0])
+
+    def test_unexpected_normalize_error_becomes_a_row_error(self):
+        data = CSV_HEADER + '"q1","a","b","c","d","B","SINGLE","0","U1"\n"q2","a","b","c","d","C","SINGLE","0","U2"\n'
+        real = importer.normalize_row
+        with mock.patch.object(importer, 'normalize_row', side_effect=lambda row: real(row) if row['NP'] != 'U1' else 1 / 0):
+            rows, errors = self.parse(data)
+        self.assertEqual((rows, errors), ([], ['🔴 Línea 2: fila ilegible (division by zero)']))
+
+
+class StagingTests(QuestionsTestCase):
+    csv = CSV_HEADER + '"q1","a","b","c","d","B","SINGLE","0","T1"\n"q2","a","b","c","d","A-C","MULTI","0","T2"\n'
+
+    def upload(self):
+        response = self.client.post(reverse('upload_csv'), {'csv_file': SimpleUploadedFile('banco.csv', self.csv.encode())})
+        self.assertEqual(response.status_code, 302)
+        return ImportBatch.objects.get().token
+
+    def confirm(self, token):
+        return self.client.post(reverse('upload_csv'), {'confirm': '1', 'token': token})
+
+    def test_preview_is_staged_and_paginated(self):
+        token = self.upload()
+        with self.settings(CSV_PREVIEW_PAGE_SIZE=1):
+            response = self.client.get(reverse('upload_csv'), {'token': token, 'page': 2})
+        self.assertEqual((response.context['pending_creates'], response.context['pending_updates']), (2, 0))
+        self.assertEqual([c.np for c in response.context['page_obj']], ['T2'])
+        self.assertFalse(SingleChoiceQuestion.objects.exists())
+
+    def test_token_is_single_use(self):
+        token = self.upload()
+        self.assertIn('2 creadas', self.confirm(token).context['success_message'])
+        self.assertIn('caducó', self.confirm(token).context['error'])
+        self.assertFalse(ImportBatch.objects.exists())
+        self.assertEqual(SingleChoiceQuestion.objects.count(), 1)
+
+    def test_expired_token_is_rejected_and_purged(self):
+        token = self.upload()
+        ImportBatch.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIn('caducó', self.confirm(token).context['error'])
+        self.assertFalse(SingleChoiceQuestion.objects.exists())
+
+        self.upload()  # Una carga nueva descarta las caducadas
+        self.assertEqual(ImportBatch.objects.exclude(token=token).count(), 1)
+        self.assertFalse(ImportBatch.objects.filter(token=token).exists())
+
+
+class ImportCommandTests(QuestionsTestCase):
+    def run_import(self, text, *args, **options):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as fh:
+            fh.write(text)
+        self.addCleanup(os.remove, fh.name)
+        out = StringIO()
+        call_command('import_questions', fh.name, *args, stdout=out, **options)
+        return out.getvalue()
+
+    def bank(self, count):
+        return CSV_HEADER + ''.join(f'"q{i}","a","b","c","d","B","SINGLE","0","I{i}"\n' for i in range(count))
+
+    def test_parallel_import_keeps_file_order(self):
+        out = self.run_import(self.bank(9) + '"m","a","b","c","d","A-D","MULTI","0","I9"\n', workers=2, batch_size=2)
+        self.assertIn('SINGLE: 9 a crear, 0 a actualizar', out)
+        self.assertIn('10 creadas, 0 actualizadas', out)
+        self.assertEqual(MultipleChoiceQuestion.objects.get(np='I9').answer, 'a-d')
+
+        out = self.run_import(self.bank(9).replace('"q3"', '"q3 editada"'), workers=1)
+        self.assertIn('SINGLE: 0 a crear, 1 a actualizar', out)
+        self.assertIn('Sin cambios: 8', out)
+
+    def test_dry_run_writes_nothing(self):
+        out = self.run_import(self.bank(3), '--dry-run', workers=1)
+        self.assertIn('--dry-run', out)
+        self.assertFalse(SingleChoiceQuestion.objects.exists())
+
+    def test_validation_error_aborts_the_import(self):
+        text = self.bank(5) + '"roto","a","b","c","d","Z","SINGLE","0","I5"\n'
+        with self.assertRaisesMessage(CommandError, 'Línea 7'):
+            self.run_import(text, workers=1, batch_size=2)
+        self.assertFalse(SingleChoiceQuestion.objects.exists())
+
+
+class ImportHashTests(QuestionsTestCase):
+    csv = CSV_HEADER + '"q1","a","b","c","d","B","SINGLE","0","H1"\n"q2","a","b","c","d","C-A","MULTI","0","H2"\n'
+
+    def proposed(self, text):
+        errors = []
+        rows = list(importer.parse_csv_rows(importer.iter_csv_lines([text.encode()]), errors))
+        self.assertEqual(errors, [])
+        return list(importer.iter_proposed_changes(rows))
+
+    def test_unchanged_rows_are_skipped_by_hash(self):
+        importer.apply_changes(self.proposed(self.csv))
+        errors = []
+        rows = list(importer.parse_csv_rows(importer.iter_csv_lines([self.csv.encode()]), errors))
+        with self.assertNumQueries(2):  # sólo (np, content_hash) de SINGLE y de MULTI
+            self.assertEqual(list(importer.iter_proposed_changes(rows)), [])
+
+    def test_hash_matches_model_save(self):
+        importer.apply_changes(self.proposed(self.csv))
+        for question in [SingleChoiceQuestion.objects.get(np='H1'), MultipleChoiceQuestion.objects.get(np='H2')]:
+            stored = question.content_hash
+            question.save()
+            self.assertEqual(question.content_hash, stored)
+
+    def test_changed_row_is_diffed(self):
+        importer.apply_changes(self.proposed(self.csv))
+        changes = self.proposed(self.csv.replace('"q1"', '"q1 editada"'))
+        self.assertEqual([(c['np'], c['action'], list(c['diff'])) for c in changes], [('H1', 'UPDATE', ['text'])])
+
+
+class CorrectMaskTests(QuestionsTestCase):
+    def test_importer_sets_mask_from_letters(self):
+        text = CSV_HEADER + '"q","x-1","y","z-2","w","C-A","MULTI","0","K1"\n'
+        errors = []
+        rows = importer.parse_csv_rows(importer.iter_csv_lines([text.encode()]), errors)
+        importer.apply_changes(importer.iter_proposed_changes(rows))
+        question = MultipleChoiceQuestion.objects.get(np='K1')
+        self.assertEqual((question.correct_mask, question.correct_letters, question.answer), (0b101, ['A', 'C'], 'x-1-z-2'))
+
+    def test_legacy_text_matches_whole_options(self):
+        options = ('x-1', 'y', 'z-2', 'w', None)
+        self.assertEqual(answer_text_to_mask('MULTI', options, 'z-2-x-1'), 0b101)
+        self.assertEqual(answer_text_to_mask('MULTI', options, 'x - 1'), 0)
+        self.assertEqual(answer_text_to_mask('SINGLE', options, 'y'), 0b10)
+        self.assertEqual(self.multi().correct_mask, 0b101)
+
+    def test_backfill_migration_keeps_hyphenated_options(self):
+        question = self.multi()
+        MultipleChoiceQuestion.objects.update(answer='z-2-x-1', correct_mask=0, content_hash='')
+        migration = importlib.import_module('questions.migrations.0004_correct_mask')
+        migration.backfill_correct_mask(apps, None)
+        question.refresh_from_db()
+        self.assertEqual((question.correct_mask, question.answer), (0b101, 'x-1-z-2'))
+        stored = question.content_hash
+        question.save()
+        self.assertEqual(question.content_hash, stored)
+
+    def test_answer_is_derived_from_mask(self):
+        question = self.multi()
+        question.correct_mask = 0b1010
+        question.answer = 'ignorado'
+        question.save()
+        question.refresh_from_db()
+        self.assertEqual((question.answer, question.correct_letters), ('y-w', ['B', 'D']))
+
+    def test_admin_form_edits_the_mask(self):
+        multi = self.multi()
+        data = {field: getattr(multi, field) for field in ('np', 'text', 'option_a', 'option_b', 'option_c', 'option_d')}
+        form = MultipleChoiceQuestionForm({**data, 'correct_letters': ['B', 'D']}, instance=multi)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        multi.refresh_from_db()
+        self.assertEqual((multi.correct_mask, multi.answer), (0b1010, 'y-w'))
+        for letters in (['A'], ['A', 'E']):  # MULTI necesita dos; E está vacía
+            self.assertFalse(MultipleChoiceQuestionForm({**data, 'correct_letters': letters}, instance=multi).is_valid())
+
+    def test_multi_check_compares_masks(self):
+        multi = self.multi()
+        data = {'question_id': multi.pk, 'question_type': 'MULTI', 'answer': ['C', 'A']}
+        self.assertEqual(self.client.post(reverse('check_answer_api'), data).json(), {'correct': True, 'correct_letters': ['A', 'C'], 'explain': None})
+
+
+class GradingTests(QuestionsTestCase):
+    def test_missing_answers_count_as_wrong_and_foreign_ones_are_ignored(self):
+        refs = [('SINGLE', 1), ('MULTI', 1)]
+        post = {'question_SINGLE_1': ['B'], 'question_MULTI_1': ['A', 'C'], 'question_MULTI_99': ['A']}
+        submitted = parse_submission(query_dict(post), refs)
+        self.assertEqual(submitted, {('SINGLE', 1): 0b10, ('MULTI', 1): 0b101})
+        self.assertEqual(parse_submission(query_dict({}), refs), {('SINGLE', 1): 0, ('MULTI', 1): 0})
+
+    def test_bitmask_grading(self):
+        single, multi = self.single(), self.multi()
+        correct, results = grade_submission({('SINGLE', single.pk): 0b10, ('MULTI', multi.pk): 0b001, ('SINGLE', 999): 1})
+        self.assertEqual(correct, 1)
+        self.assertEqual([(r['question_id'], r['correct']) for r in results], [(single.pk, True), (multi.pk, False)])
+        self.assertEqual((results[1]['chosen_letters'], results[1]['correct_letters']), (['A'], ['A', 'C']))
+
+    def test_exam_is_graded_against_the_issued_list(self):
+        single, multi = self.single(), self.multi()
+        self.client.get(reverse('selection_exam'), {'seed': 7})
+        self.assertCountEqual(exams.exam_question_refs('selection', 7), [('SINGLE', single.pk), ('MULTI', multi.pk)])
+
+        # Sólo se envía la respuesta correcta: la otra pregunta igual se corrige
+        response = self.client.post(reverse('selection_exam'), {'seed': 7, f'question_SINGLE_{single.pk}': 'B'})
+        self.assertEqual((response.context['correct_answers'], response.context['total_questions']), (1, 2))
+        self.assertEqual(response.context['score'], 50)
+        self.assertEqual(self.client.post(reverse('selection_exam'), {}).status_code, 400)
+        # Una semilla que nunca se emitió no se muestrea al corregir
+        self.assertEqual(self.client.post(reverse('selection_exam'), {'seed': 8}).status_code, 400)
+
+    @override_settings(EXAM_SIZES={'selection': 3})
+    def test_bank_changes_during_the_exam_do_not_change_the_grading(self):
+        for i in range(4):
+            self.single(np=f'S{i}')
+        exam = self.client.get(reverse('selection_exam'), {'seed': 7}).context['questions']
+        perfect = {'seed': 7, **{f'question_SINGLE_{q.question_id}': 'B' for q in exam}}
+
+        # Otra pregunta en el banco y la caché vacía: la corrección no vuelve a muestrear
+        self.single(np='S9')
+        cache.clear()
+        response = self.client.post(reverse('selection_exam'), perfect)
+        self.assertEqual((response.context['score'], response.context['total_questions']), (100, 3))
+        self.assertEqual([r['question_id'] for r in response.context['results']], [q.question_id for q in exam])
+
+
+class SeededExamTests(QuestionsTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(6):
+            self.single(np=f'S{i}')
+            self.multi(np=f'M{i}')
+
+    @override_settings(EXAM_SIZES={'selection': 5})
+    def test_same_seed_gives_the_same_sample(self):
+        exam = [(q.question_type, q.pk) for q in exams.build_exam('selection', 42)]
+        self.assertEqual(len(exam), 5)
+        self.assertEqual([(q.question_type, q.pk) for q in exams.build_exam('selection', 42)], exam)
+        self.assertNotEqual([(q.question_type, q.pk) for q in exams.build_exam('selection', 43)], exam)
+
+    @override_settings(EXAM_SIZES={'selection': 5})
+    def test_reopening_after_a_bank_change_shows_the_same_exam(self):
+        def reopen():
+            return [(q.question_type, q.question_id) for q in self.client.get(reverse('selection_exam'), {'seed': 5}).context['questions']]
+
+        exam = reopen()
+        self.single(np='S9')
+        cache.clear()
+        self.assertEqual(reopen(), exam)
+
+    def test_sample_is_drawn_in_the_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            ids = exams.sample_question_ids(3)
+        self.assertEqual((len(ids), len(set(ids))), (3, 3))
+        self.assertEqual(len(queries), 1)
+        self.assertIn('LIMIT 3', queries[0]['sql'])
+        self.assertEqual(len(exams.sample_question_ids(0)), 12)
+
+    def test_missing_seed_redirects_to_a_new_one(self):
+        response = self.client.get(reverse('study_mode'))
+        self.assertEqual(response.status_code, 302)
+        seed = exams.parse_seed(response.url.split('?seed=')[1])
+        self.assertIsNotNone(seed)
+        self.assertEqual(self.client.get(response.url).context['seed'], seed)
+        self.assertIsNone(exams.parse_seed('0'))
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=[10])
+class ImageVariantTests(QuestionsTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        os.makedirs(os.path.join(media.name, images.SOURCE_DIR))
+        Image.new('RGB', (20, 10), 'red').save(images.source_path('1.png'))
+
+    def test_variants_are_generated_once(self):
+        formats = images.available_formats()
+        self.assertEqual(images.optimize_images(), (1, 2 * len(formats), []))
+        self.assertEqual(images.optimize_images(), (0, 0, []))
+        self.assertEqual(sorted(ImageVariant.objects.values_list('width', flat=True).distinct()), [10, 20])
+        for variant in ImageVariant.objects.all():
+            self.assertTrue(os.path.isfile(os.path.join(settings.MEDIA_ROOT, variant.path)))
+
+    def test_changed_image_replaces_its_variants(self):
+        images.optimize_images()
+        old_paths = set(ImageVariant.objects.values_list('path', flat=True))
+        Image.new('RGB', (20, 10), 'blue').save(images.source_path('1.png'))
+        self.assertEqual(images.optimize_images()[0], 1)
+        new_paths = set(ImageVariant.objects.values_list('path', flat=True))
+        self.assertFalse(old_paths & new_paths)
+        for path in old_paths:
+            self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, path)))
+
+    def test_one_run_bumps_the_bank_version_once(self):
+        Image.new('RGB', (20, 10), 'blue').save(images.source_path('2.png'))
+        for i, name in enumerate(['1.png', '1.png', '2.png']):
+            question = self.single(np=f'I{i}')
+            question.has_image, question.image_filename = True, name
+            question.save()
+        version = BankVersion.objects.get().version
+        self.assertEqual(images.optimize_images()[0], 2)
+        self.assertEqual(BankVersion.objects.get().version, version + 1)
+        rows = QuestionReadModel.objects.filter(np__startswith='I')
+        self.assertTrue(all(row.image_sources and row.image_width == 20 for row in rows))
+
+    def test_import_does_not_encode_images(self):
+        csv = CSV_HEADER + '"con imagen","a","b","c","d","B","SINGLE","1","Q1"\n'
+        with mock.patch.object(images, 'encode_variants') as encode:
+            rows = list(importer.parse_csv_rows(importer.iter_csv_lines([csv.encode()]), []))
+            with self.captureOnCommitCallbacks(execute=True):
+                importer.apply_changes(importer.iter_proposed_changes(rows))
+        encode.assert_not_called()
+        self.assertFalse(ImageVariant.objects.exists())
+
+    def test_exam_questions_carry_picture_sources(self):
+        question = self.single(np='I1')
+        question.has_image, question.image_filename = True, '1.png'
+        question.save()
+        images.optimize_images()
+        (question,) = exams.build_exam('selection', 1)
+        self.assertEqual([s['type'] for s in question.image_sources], [images.FORMATS[f][1] for f in images.available_formats()])
+        self.assertIn('/variants/1-', question.image_sources[0]['srcset'])
+
+
+class ImageMetadataTests(QuestionsTestCase):
+    csv = CSV_HEADER + '"con imagen","a","b","c","d","B","SINGLE","1","Q7"\n'
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        os.makedirs(os.path.join(media.name, images.SOURCE_DIR))
+        Image.new('RGB', (30, 20), 'red').save(images.source_path('7.png'))
+
+    def import_csv(self):
+        errors = []
+        rows = list(importer.parse_csv_rows(importer.iter_csv_lines([self.csv.encode()]), errors))
+        return importer.apply_changes(importer.iter_proposed_changes(rows))
+
+    def test_import_stores_dimensions_outside_the_hash(self):
+        self.import_csv()
+        question = SingleChoiceQuestion.objects.get(np='Q7')
+        self.assertEqual((question.image_filename, question.image_width, question.image_height), ('7.png', 30, 20))
+        self.assertGreater(question.image_bytes, 0)
+        self.assertEqual(self.import_csv(), {'created': 0, 'updated': 0, 'batches': []})
+
+    def test_save_reads_the_file_only_when_the_image_changes(self):
+        self.import_csv()
+        os.remove(images.source_path('7.png'))
+        question = SingleChoiceQuestion.objects.get(np='Q7')
+        question.text = 'editada'
+        question.save()
+        question.refresh_from_db()
+        self.assertEqual((question.image_width, question.image_height), (30, 20))
+        question.image_filename = '8.png'
+        question.save()
+        question.refresh_from_db()
+        self.assertEqual((question.image_width, question.image_height, question.image_bytes), (None, None, None))
+
+    def test_pages_defer_images_and_reserve_their_space(self):
+        self.import_csv()
+        html = self.client.get(reverse('selection_exam'), {'seed': 1}).content.decode()
+        self.assertIn('data-src="/media/images/7.png"', html)
+        self.assertIn('width="30" height="20"', html)
+        self.assertNotIn(' src="/media/images/7.png"', html)
+
+
+class ReadModelTests(QuestionsTestCase):
+    def row(self, question):
+        return QuestionReadModel.objects.get(question_type=question.question_type, question_id=question.pk)
+
+    def test_save_and_delete_keep_the_row_in_sync(self):
+        multi = self.multi()
+        row = self.row(multi)
+        self.assertEqual((row.np, row.correct_letters, row.options[0]), ('M1', ['A', 'C'], ['A', 'x-1']))
+        multi.text = 'editada'
+        multi.save()
+        self.assertEqual(self.row(multi).text, 'editada')
+        multi.delete()
+        self.assertFalse(QuestionReadModel.objects.exists())
+
+    def test_import_syncs_bulk_writes(self):
+        text = CSV_HEADER + '"q1","a","b","c","d","B","SINGLE","0","R1"\n'
+        errors = []
+        rows = list(importer.parse_csv_rows(importer.iter_csv_lines([text.encode()]), errors))
+        self.assertEqual(errors, [])
+        importer.apply_changes(importer.iter_proposed_changes(rows))
+        row = QuestionReadModel.objects.get(np='R1')
+        self.assertEqual((row.question_type, row.correct_letters, len(row.options)), ('SINGLE', ['B'], 4))
+
+    def test_rebuild_restores_missing_rows(self):
+        single, multi = self.single(), self.multi()
+        QuestionReadModel.objects.all().delete()
+        call_command('rebuild_read_model', stdout=StringIO())
+        self.assertEqual(self.row(single).content_hash, single.content_hash)
+        self.assertEqual(self.row(multi).correct_mask, 0b101)
+
+
+class FragmentCacheTests(QuestionsTestCase):
+    def questions(self):
+        return exams.build_exam('practice', 1)
+
+    def test_cached_fragments_are_not_rendered_again(self):
+        self.single(), self.multi()
+        first = fragments.render_fragments('practice', self.questions())
+        with mock.patch('questions.fragments.render_to_string') as render:
+            self.assertEqual(fragments.render_fragments('practice', self.questions()), first)
+        render.assert_not_called()
+
+    def test_edit_invalidates_the_fragment(self):
+        single = self.single()
+        fragments.render_fragments('practice', self.questions())
+        single.text = 'texto editado'
+        single.save()
+        ((_, html),) = fragments.render_fragments('practice', self.questions())
+        self.assertIn('texto editado', html)
+        self.assertIn('texto editado', self.client.get(reverse('practice_exam'), {'seed': 1}).content.decode())
+
+
+class StudyConditionalGetTests(QuestionsTestCase):
+    def test_unchanged_bank_revalidates_without_queries(self):
+        self.single()
+        url = reverse('study_mode') + '?seed=7'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_bank_change_changes_the_etag(self):
+        single = self.single()
+        url = reverse('study_mode') + '?seed=7'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            single.text = 'editada'
+            single.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(EXAM_SIZES={'practice': 5}, QUESTIONS_API_PAGE_SIZE=2)
+class QuestionsApiTests(QuestionsTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(4):
+            self.single(np=f'S{i}')
+            self.multi(np=f'M{i}')
+
+    def get(self, headers=None, **params):
+        return self.client.get(reverse('questions_api'), {'seed': 9, **params}, headers=headers)
+
+    def test_cursor_walks_the_whole_exam_once(self):
+        seen, cursor = [], ''
+        while cursor is not None:
+            data = self.get(cursor=cursor).json()
+            self.assertEqual(data['total'], 5)
+            self.assertNotIn('correct_letters', data['questions'][0])
+            seen += [(q['question_type'], q['id']) for q in data['questions']]
+            cursor = data['next_cursor']
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen, [(q.question_type, q.question_id) for q in exams.build_exam('practice', 9)])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({'cursor': 'basura'}, {'limit': 0}, {'mode': 'study'}, {'seed': ''}):
+            self.assertEqual(self.get(**params).status_code, 400, params)
+
+    def test_pages_revalidate_with_the_bank_version(self):
+        response = self.get(limit=3)
+        self.assertEqual(self.get(limit=3, headers={'If-None-Match': response['ETag']}).status_code, 304)
+        self.assertNotEqual(self.get(limit=2)['ETag'], response['ETag'])
+
+    def test_practice_page_inlines_the_first_page(self):
+        response = self.client.get(reverse('practice_exam'), {'seed': 9})
+        self.assertEqual((len(response.context['questions']), response.context['total_questions']), (2, 5))
+        self.assertEqual(exams.decode_cursor(response.context['next_cursor']), 2)
+
+
+class CheckAnswersApiTests(QuestionsTestCase):
+    def post(self, items):
+        return self.client.post(reverse('check_answers_api'), json.dumps({'items': items}), content_type='application/json')
+
+    def test_results_keep_request_order(self):
+        single, multi = self.single(), self.multi()
+        response = self.post([
+            {'question_id': multi.pk, 'question_type': 'MULTI', 'answer': ['C', 'A']},
+            {'question_id': single.pk, 'question_type': 'SINGLE', 'answer': 'A'},
+            {'question_id': 999999, 'question_type': 'SINGLE', 'answer': 'A'},
+            {'question_id': 'x', 'question_type': 'SINGLE'},
+        ])
+        results = response.json()['results']
+        self.assertEqual([r.get('correct') for r in results[:2]], [True, False])
+        self.assertEqual(results[1]['correct_letters'], ['B'])
+        self.assertIn('error', results[2])
+        self.assertIn('error', results[3])
+
+    def test_warm_batch_runs_no_queries(self):
+        single, multi = self.single(), self.multi()
+        items = [
+            {'question_id': single.pk, 'question_type': 'SINGLE', 'answer': 'B'},
+            {'question_id': multi.pk, 'question_type': 'MULTI', 'answer': 'A,C'},
+        ]
+        self.post(items)
+        with self.assertNumQueries(0):
+            self.assertEqual([r['correct'] for r in self.post(items).json()['results']], [True, True])
+
+    def test_rejects_empty_or_oversized_batches(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        with override_settings(CHECK_ANSWERS_MAX_ITEMS=1):
+            item = {'question_id': 1, 'question_type': 'SINGLE', 'answer': 'A'}
+            self.assertEqual(self.post([item, item]).status_code, 400)
+
+
+class AnswerDigestTests(QuestionsTestCase):
+    def test_digests_are_keyed_by_type_and_id(self):
+        rows = [
+            QuestionReadModel(question_type='SINGLE', question_id=5, correct_letters=['B']),
+            QuestionReadModel(question_type='MULTI', question_id=5, correct_letters=['A', 'C']),
+        ]
+        digests = question_digests('sal', rows)
+        self.assertEqual(set(digests), {'SINGLE:5', 'MULTI:5'})
+        self.assertEqual(digests['MULTI:5'], answer_digest('sal', 'MULTI', 5, ['C', 'A']))
+        self.assertNotEqual(digests['SINGLE:5'], answer_digest('otra', 'SINGLE', 5, ['B']))
+
+    def test_practice_page_embeds_digest_per_question(self):
+        single, multi = self.single(), self.multi()
+        response = self.client.get(reverse('practice_exam'), {'seed': 3})
+        salt = response.context['answer_salt']
+        digests = {f'{q.question_type}:{q.question_id}': digest for q, _, digest in response.context['question_fragments']}
+        self.assertEqual(digests[f'SINGLE:{single.pk}'], answer_digest(salt, 'SINGLE', single.pk, ['B']))
+        self.assertEqual(digests[f'MULTI:{multi.pk}'], answer_digest(salt, 'MULTI', multi.pk, ['A', 'C']))
+
+    def test_digest_api_needs_an_open_practice(self):
+        single = self.single()
+        url = reverse('answer_digests_api')
+        self.assertEqual(self.client.get(url, {'seed': 3}).status_code, 403)
+        salt = self.client.get(reverse('practice_exam'), {'seed': 3}).context['answer_salt']
+        response = self.client.get(url, {'seed': 3})
+        self.assertEqual(response.json()['digests'], {f'SINGLE:{single.pk}': answer_digest(salt, 'SINGLE', single.pk, ['B'])})
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(self.client.get(url, {'seed': 3, 'mode': 'selection'}).status_code, 400)
+
+
+class SearchTests(QuestionsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ospf = self.single(np='S1')
+        self.ospf.text = '¿Qué protocolo usa el área 0 en OSPF?'
+        self.ospf.save()
+        self.eigrp = self.multi(np='M1')
+        self.eigrp.option_d = 'EIGRP'
+        self.eigrp.save()
+
+    def test_matches_text_and_options(self):
+        self.assertEqual([q.np for q in search.search_questions('ospf')], ['S1'])
+        self.assertEqual([q.np for q in search.search_questions('EIGRP')], ['M1'])
+        self.assertFalse(search.search_questions('').exists())
+        self.assertEqual([q.np for q in search.search_questions('ospf', ['MULTI'])], [])
+
+    def test_edits_update_the_index(self):
+        self.ospf.text = 'Spanning Tree'
+        self.ospf.save()
+        self.assertFalse(search.search_questions('ospf').exists())
+        self.ospf.delete()
+        self.assertFalse(search.search_questions('spanning').exists())
+
+    def test_api_returns_questions_without_answers(self):
+        results = self.client.get(reverse('search_api'), {'q': 'OSPF'}).json()['results']
+        self.assertEqual([(r['question_type'], r['id']) for r in results], [('SINGLE', self.ospf.pk)])
+        self.assertNotIn('correct_letters', results[0])
+        self.assertEqual(self.client.get(reverse('search_api'), {'q': ' '}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('search_api'), {'q': 'ospf', 'limit': 'x'}).status_code, 400)
+
+    def test_admin_search_uses_the_index(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+        response = self.client.get(reverse('admin:questions_singlechoicequestion_changelist'), {'q': 'OSPF'})
+        self.assertEqual([q.np for q in response.context['cl'].result_list], ['S1'])
+
+
+class InstrumentationTests(QuestionsTestCase):
+    def test_server_timing_counts_queries_and_templates(self):
+        self.single()
+        timing = self.client.get(reverse('practice_exam'), {'seed': 1})['Server-Timing']
+        self.assertRegex(timing, r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="[1-9]\d* queries", tpl;dur=[\d.]+$')
+        with override_settings(SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('practice_exam'), {'seed': 1}))
+
+    def test_metrics_are_labelled_by_view(self):
+        self.client.get(reverse('practice_exam'), {'seed': 1})
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('ccna_request_duration_seconds_count{method="GET",status="200",view="practice_exam"}', body)
+        self.assertIn('ccna_request_db_queries_bucket{le="1.0",view="practice_exam"}', body)
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+    @override_settings(SLOW_REQUEST_MS=1)
+    def test_slow_requests_log_their_sql(self):
+        self.single()
+        with self.assertLogs('questions.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('practice_exam'), {'seed': 1})
+        self.assertIn('SELECT', logs.output[0])
+
+
+class GenerateBankTests(QuestionsTestCase):
+    def generate(self, **options):
+        call_command('generate_bank', single=6, multi=4, drag=2, stdout=StringIO(), **options)
+
+    def test_reproducible_and_idempotent_per_prefix(self):
+        self.generate(seed=5)
+        texts = list(QuestionReadModel.objects.order_by('question_type', 'np').values_list('np', 'text', 'correct_mask'))
+        self.assertEqual(len(texts), 12)
+        self.generate(seed=5)
+        self.assertEqual(list(QuestionReadModel.objects.order_by('question_type', 'np').values_list('np', 'text', 'correct_mask')), texts)
+        self.generate(seed=5, prefix='OTRO')
+        self.assertEqual(QuestionReadModel.objects.count(), 24)
+
+    def test_requires_a_positive_count(self):
+        with self.assertRaises(CommandError):
+            call_command('generate_bank', stdout=StringIO())
+
+
+@override_settings(ATTEMPT_LOG=True)
+class AttemptLogTests(QuestionsTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(attempts, '_start_writer')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(attempts._buffer.clear)
+
+    def test_checks_are_buffered_until_flushed(self):
+        single = self.single()
+        data = {'question_id': single.pk, 'question_type': 'SINGLE', 'answer': 'B'}
+        self.client.post(reverse('check_answer_api'), data)  # claves ya compiladas
+        attempts._buffer.clear()
+        with self.assertNumQueries(0):
+            self.client.post(reverse('check_answer_api'), data)
+        self.assertFalse(Attempt.objects.exists())
+        self.assertEqual(attempts.flush(), 1)
+        attempt = Attempt.objects.get()
+        self.assertEqual((attempt.question_id, attempt.chosen_mask, attempt.correct, attempt.source), (single.pk, 0b10, True, 'CHECK'))
+
+    def test_batch_and_exam_attempts_are_recorded(self):
+        single, multi = self.single(), self.multi()
+        self.client.post(reverse('check_answers_api'), json.dumps({'items': [
+            {'question_id': multi.pk, 'question_type': 'MULTI', 'answer': ['A']},
+        ]}), content_type='application/json')
+        self.client.get(reverse('selection_exam'), {'seed': 7})
+        self.client.post(reverse('selection_exam'), {'seed': 7, f'question_SINGLE_{single.pk}': 'A'})
+        attempts.flush()
+        self.assertEqual(
+            sorted(Attempt.objects.values_list('source', 'question_type', 'chosen_mask', 'correct')),
+            [('CHECK', 'MULTI', 0b001, False), ('EXAM', 'MULTI', 0, False), ('EXAM', 'SINGLE', 0b001, False)],
+        )
+
+    @override_settings(ATTEMPT_BUFFER_MAX=2)
+    def test_failed_writes_are_requeued_up_to_the_cap(self):
+        graded = [('SINGLE', i, 1, True) for i in range(3)]
+        with self.assertLogs('questions.attempts', 'WARNING'):  # se descarta el más viejo
+            attempts.record(RequestFactory().get('/'), 'CHECK', graded)
+        self.assertEqual([a.question_id for a in attempts._buffer], [1, 2])
+        with mock.patch.object(Attempt.objects, 'bulk_create', side_effect=DatabaseError), self.assertLogs('questions.attempts'):
+            self.assertEqual(attempts.flush(), 0)
+        self.assertEqual(attempts.flush(), 2)
+
+
+@override_settings(ROLLUP_SAFETY_SECONDS=60)
+class RollupTests(QuestionsTestCase):
+    def attempts(self, *masks, qid=1, ids=None, age=120):
+        recorded_at = timezone.now() - timedelta(seconds=age)
+        Attempt.objects.bulk_create([
+            Attempt(id=ids[i] if ids else None, question_type='MULTI', question_id=qid, chosen_mask=mask,
+                    correct=mask == 0b101, source='CHECK', recorded_at=recorded_at)
+            for i, mask in enumerate(masks)
+        ])
+
+    def test_late_commits_below_the_watermark_are_not_lost(self):
+        self.attempts(0b101, ids=[10])
+        self.attempts(0b101, ids=[12], age=0)  # recién escrito: espera aunque sea el id mayor
+        self.assertEqual(question_stats.rollup(), (1, 1))
+        self.assertEqual(question_stats.watermark()[0], 10)
+
+        # El id 11 se confirma después que el 12: la marca no lo había pasado
+        self.attempts(0b001, ids=[11], age=0)
+        Attempt.objects.update(recorded_at=timezone.now() - timedelta(seconds=120))
+        self.assertEqual(question_stats.rollup(), (2, 1))
+        self.assertEqual(QuestionStats.objects.get().attempts, 3)
+
+    def test_rollup_counts_each_attempt_once(self):
+        self.attempts(0b101, 0b001, 0b100, 0b101)
+        self.assertEqual(question_stats.rollup(batch_size=3), (4, 2))  # dos tramos: 3 + 1
+        self.assertEqual(question_stats.rollup(), (0, 0))
+
+        self.attempts(0b010)
+        self.assertEqual(question_stats.rollup(), (1, 1))
+        stats = QuestionStats.objects.get(question_type='MULTI', question_id=1)
+        self.assertEqual((stats.attempts, stats.correct_count), (5, 2))
+        self.assertAlmostEqual(stats.correct_rate, 0.4)
+        self.assertEqual((stats.pick_a, stats.pick_b, stats.pick_c), (3, 1, 3))
+        self.assertEqual(question_stats.watermark()[0], Attempt.objects.order_by('-id').first().id)
+
+    def test_stats_api_orders_by_difficulty_and_revalidates(self):
+        self.attempts(0b101, 0b001, qid=1)
+        self.attempts(0b001, 0b001, qid=2)
+        call_command('rollup_attempts', stdout=StringIO())
+        url = reverse('question_stats_api')
+        response = self.client.get(url, {'question_type': 'MULTI'})
+        self.assertEqual([(q['id'], q['correct_rate']) for q in response.json()['questions']], [(2, 0.0), (1, 0.5)])
+        self.assertEqual(self.client.get(url, {'question_type': 'MULTI'}, headers={'If-None-Match': response['ETag']}).status_code, 304)
+        self.assertEqual(self.client.get(url, {'order': 'np'}).status_code, 400)
+
+
+@override_settings(ATTEMPT_LOG=True)
+class ReviewScheduleTests(QuestionsTestCase):
+    def test_sm2_intervals(self):
+        now = timezone.now()
+        item = ReviewItem(learner_key='k', question_type='SINGLE', question_id=1, due_at=now)
+        intervals = []
+        for _ in range(3):
+            reviews.review(item, reviews.QUALITY_CORRECT, item.due_at)
+            intervals.append(item.interval_days)
+        self.assertEqual(intervals, [1, 6, 15])
+
+        # Acertar antes de tiempo no alarga el intervalo; fallar lo reinicia
+        due_at = item.due_at
+        reviews.review(item, reviews.QUALITY_CORRECT, due_at - timedelta(days=1))
+        self.assertEqual((item.interval_days, item.due_at), (15, due_at))
+        reviews.review(item, reviews.QUALITY_WRONG, due_at)
+        self.assertEqual((item.repetitions, item.interval_days), (0, 1))
+        self.assertAlmostEqual(item.ease, 1.96)
+
+    def test_schedule_upserts_per_learner(self):
+        now = timezone.now()
+        batch = [
+            Attempt(question_type='SINGLE', question_id=1, chosen_mask=2, correct=True, source='CHECK', session_key='a', created_at=now),
+            Attempt(question_type='SINGLE', question_id=1, chosen_mask=1, correct=False, source='CHECK', session_key='b', created_at=now),
+            Attempt(question_type='SINGLE', question_id=2, chosen_mask=1, correct=False, source='CHECK', session_key='', created_at=now),
+        ]
+        self.assertEqual(reviews.schedule(batch), 2)
+        self.assertEqual(reviews.schedule(batch[:1]), 1)
+        items = {item.learner_key: item for item in ReviewItem.objects.all()}
+        self.assertEqual(set(items), {'a', 'b'})
+        self.assertEqual((items['a'].repetitions, items['b'].repetitions), (1, 0))
+
+    def test_review_mode_shows_only_what_is_due(self):
+        single, multi = self.single(), self.multi()
+        self.client.get(reverse('practice_exam'), {'seed': 1})
+        learner = self.client.session.session_key
+        now = timezone.now()
+        ReviewItem.objects.bulk_create([
+            ReviewItem(learner_key=key, question_type=qtype, question_id=qid, due_at=now + due, last_reviewed_at=now)
+            for key, qtype, qid, due in [
+                (learner, 'MULTI', multi.pk, -timedelta(hours=1)),
+                (learner, 'SINGLE', single.pk, timedelta(days=1)),
+                ('otra', 'SINGLE', single.pk, -timedelta(days=1)),
+            ]
+        ])
+        response = self.client.get(reverse('review_mode'))
+        self.assertEqual([(q.question_type, q.question_id) for q in response.context['questions']], [('MULTI', multi.pk)])
+
+        ReviewItem.objects.filter(question_type='MULTI').delete()
+        response = self.client.get(reverse('review_mode'))
+        self.assertEqual((response.context['questions'], response.context['next_due']), ([], now + timedelta(days=1)))
+
+    def test_flushed_attempts_are_scheduled(self):
+        single = self.single()
+        with mock.patch.object(attempts, '_start_writer'):
+            self.client.get(reverse('practice_exam'), {'seed': 1})
+            self.client.post(reverse('check_answer_api'), {'question_id': single.pk, 'question_type': 'SINGLE', 'answer': 'A'})
+            attempts.flush()
+        item = ReviewItem.objects.get()
+        self.assertEqual((item.learner_key, item.question_id, item.repetitions), (self.client.session.session_key, single.pk, 0))
+
+    def test_sessionless_exam_attempts_are_scheduled(self):
+        single = self.single()
+        self.client.get(reverse('selection_exam'), {'seed': 7})
+        self.assertNotIn('sessionid', self.client.cookies)
+        with mock.patch.object(attempts, '_start_writer'):
+            response = self.client.post(reverse('selection_exam'), {'seed': 7, f'question_SINGLE_{single.pk}': 'B'})
+            attempts.flush()
+        self.assertIn('sessionid', response.cookies)
+        self.assertEqual(ReviewItem.objects.get().learner_key, self.client.session.session_key)
+
+    @override_settings(PRACTICE_CLIENT_VERIFY=False)
+    def test_review_works_without_client_verification(self):
+        single = self.single()
+        self.client.get(reverse('practice_exam'), {'seed': 1})
+        with mock.patch.object(attempts, '_start_writer'):
+            self.client.post(reverse('check_answers_api'), json.dumps({'items': [
+                {'question_id': single.pk, 'question_type': 'SINGLE', 'answer': 'A'},
+            ]}), content_type='application/json')
+            attempts.flush()
+        ReviewItem.objects.update(due_at=timezone.now())
+        response = self.client.get(reverse('review_mode'))
+        self.assertEqual([q.question_id for q in response.context['questions']], [single.pk])
+
+    @override_settings(ATTEMPT_LOG=False)
+    def test_review_mode_needs_the_attempt_log(self):
+        self.assertEqual(self.client.get(reverse('review_mode')).status_code, 404)
+        self.assertNotContains(self.client.get(reverse('examen')), reverse('review_mode'))
+
+
+class BankVersionTests(QuestionsTestCase):
+    @override_settings(BANK_VERSION_TTL=60)
+    def test_other_processes_see_a_change_after_the_ttl(self):
+        version = bank_version.current()[0]
+        BankVersion.objects.filter(pk=bank_version.SINGLETON_PK).update(version=F('version') + 1)  # otro worker
+        self.assertEqual(bank_version.current()[0], version)
+        with mock.patch('questions.bank_version.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertEqual(bank_version.current()[0], version + 1)
+
+    @override_settings(BANK_VERSION_TTL=60)
+    def test_the_writing_process_sees_its_bump_on_commit(self):
+        version = bank_version.current()[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            bank_version.bump()
+        self.assertEqual(bank_version.current()[0], version + 1)
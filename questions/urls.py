@@ -8,5 +8,12 @@ urlpatterns = [
     path('cargar-csv/', views.upload_csv_view, name='upload_csv'),  # Ruta para cargar el CSV
     path('estudio/', views.study_mode, name='study_mode'),  # Ruta para el modo estudio
     path('practica/', views.practice_exam_view, name='practice_exam'),
+    path('repaso/', views.review_mode, name='review_mode'),  # Repetición espaciada (sólo lo que vence hoy)
     path('api/check-answer/', views.check_answer_api, name='check_answer_api'),
+    path('api/check-answers/', views.check_answers_api, name='check_answers_api'),  # Verificación en lote (práctica)
+    path('api/questions/', views.questions_api, name='questions_api'),  # Páginas de un examen sembrado (sin respuestas)
+    path('api/search/', views.search_api, name='search_api'),  # Búsqueda por tema (texto completo)
+    path('api/answer-digests/', views.answer_digests_api, name='answer_digests_api'),  # Verificación local en la práctica
+    path('api/question-stats/', views.question_stats_api, name='question_stats_api'),  # Dificultad por pregunta (rollup_attempts)
+    path('metrics', views.metrics, name='metrics'),  # Prometheus (ver instrumentation.py)
 ]
@@ -1,71 +1,59 @@
-import io
-import csv
 import json
-import random
 from .forms import CSVUploadForm
-import random
-from django.shortcuts import render
-from .models import SingleChoiceQuestion, MultipleChoiceQuestion, DragAndDropQuestion
-from django.http import JsonResponse, HttpResponseBadRequest
-from django.views.decorators.http import require_POST
-from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Count
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from .models import DragAndDropQuestion, IssuedExam, LETTERS, QuestionReadModel, QuestionStats, letters_to_mask, mask_to_letters
+from . import attempts, bank_version, reviews
+from .answer_digests import SESSION_KEY as ANSWER_SALT_KEY, question_digests, session_salt
+from .answer_keys import get_answer_key, get_answer_keys
+from .exams import (
+    EXAM_TYPES, build_exam, decode_cursor, encode_cursor, exam_page, exam_question_refs, exam_size, new_seed,
+    parse_seed,
+)
+from .fragments import FRAGMENT_VERSION, render_fragments
+from .grading import grade_submission, parse_submission
+from .instrumentation import render_metrics
+from .question_stats import watermark
+from .importer import apply_changes, get_active_batch, iter_csv_lines, iter_staged_changes, parse_csv_rows, stage_changes
+from .search import search_questions
+from django.http import Http404, HttpResponse, JsonResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import condition, require_GET, require_POST
 
 def exam_view(request):
     """Vista principal - menú de opciones"""
-    return render(request, 'exam/index.html')
+    return render(request, 'exam/index.html', {'review_enabled': settings.ATTEMPT_LOG})
+
+def _exam_seed(request):
+    """
+    Semilla del examen tomada de ?seed=. Devuelve (seed, None) o, si falta o no
+    es válida, (None, redirect) hacia la misma vista con una semilla nueva para
+    que la URL identifique siempre el examen y pueda reabrirse.
+    """
+    seed = parse_seed(request.GET.get('seed'))
+    if seed is None:
+        return None, redirect(f'{request.path}?seed={new_seed()}')
+    return seed, None
 
 def selection_exam_view(request):
     """Vista para preguntas de selección (SINGLE y MULTI)"""
     if request.method == "POST":
-        correct_answers = 0
-        total_questions = 0
-        
-        # Verificar las respuestas de las preguntas de selección única
-        single_choice_questions = SingleChoiceQuestion.objects.all()
-        for question in single_choice_questions:
-            total_questions += 1
-            user_answer = request.POST.get(f"question_{question.id}")
-            
-            # Mapear la letra a la opción correspondiente
-            option_mapping = {
-                'A': question.option_a,
-                'B': question.option_b,
-                'C': question.option_c,
-                'D': question.option_d,
-                'E': question.option_e
-            }
-            
-            if user_answer and option_mapping.get(user_answer) == question.answer:
-                correct_answers += 1
-        
-        # Verificar las respuestas de las preguntas de selección múltiple
-        multiple_choice_questions = MultipleChoiceQuestion.objects.all()
-        for question in multiple_choice_questions:
-            total_questions += 1
-            user_answers = request.POST.getlist(f"question_{question.id}")
-            correct_answers_list = question.answer.split("-")
-            
-            # Mapear las letras a opciones
-            user_options = []
-            option_mapping = {
-                'A': question.option_a,
-                'B': question.option_b,
-                'C': question.option_c,
-                'D': question.option_d,
-                'E': question.option_e
-            }
-            
-            for answer in user_answers:
-                if answer in option_mapping:
-                    user_options.append(option_mapping[answer])
-            
-            correct_options = []
-            for answer in correct_answers_list:
-                if answer in option_mapping:
-                    correct_options.append(option_mapping[answer])
-            
-            if sorted(user_options) == sorted(correct_options):
-                correct_answers += 1
+        # Se corrige la lista guardada al emitir el examen: ni la del cliente ni una muestra nueva
+        seed = parse_seed(request.POST.get('seed'))
+        if seed is None:
+            return HttpResponseBadRequest('Error: semilla del examen inválida')
+        try:
+            refs = exam_question_refs('selection', seed)
+        except IssuedExam.DoesNotExist:
+            return HttpResponseBadRequest('Error: el examen no existe o ya venció')
+        correct_answers, results = grade_submission(parse_submission(request.POST, refs))
+        total_questions = len(results)
+        attempts.record(request, 'EXAM', [
+            (r['question_type'], r['question_id'], letters_to_mask(r['chosen_letters']), r['correct']) for r in results
+        ])
         
         # Calcular el puntaje
         score = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
@@ -73,20 +61,21 @@ def selection_exam_view(request):
             'score': score, 
             'correct_answers': correct_answers, 
             'total_questions': total_questions,
-            'exam_type': 'selection'
+            'exam_type': 'selection',
+            'results': results,
+            'seed': seed
         }
         return render(request, 'exam/results.html', context)
     
     else:
-        # Obtener solo preguntas de selección (SINGLE y MULTI)
-        single_choice_questions = SingleChoiceQuestion.objects.all()
-        multiple_choice_questions = MultipleChoiceQuestion.objects.all()
+        seed, response = _exam_seed(request)
+        if response:
+            return response
 
-        # Mezclar preguntas aleatoriamente
-        questions = list(single_choice_questions) + list(multiple_choice_questions)
-        random.shuffle(questions)
+        # Muestra reproducible de preguntas SINGLE y MULTI (ver exams.py)
+        questions = build_exam('selection', seed)
 
-        context = {'questions': questions}
+        context = {'questions': questions, 'seed': seed}
         return render(request, 'exam/selection_exam.html', context)
 
 def drag_exam_view(request):
@@ -125,373 +114,100 @@ def drag_exam_view(request):
         return render(request, 'exam/drag_exam.html')
 
 def upload_csv_view(request):
-    # Confirmación para aplicar cambios
+    # Confirmación para aplicar cambios (sólo viaja el token del lote)
     if request.method == 'POST' and request.POST.get('confirm') == '1':
-        proposed = json.loads(request.POST['proposed_changes'])
-        created = updated = 0
-
-        for item in proposed:
-            qtype = item['question_type']
-            np_code = item['np']
-            payload = item['new']  # datos ya normalizados
-
-            if qtype == 'SINGLE':
-                obj, created_flag = SingleChoiceQuestion.objects.get_or_create(np=np_code, defaults=payload)
-                if not created_flag:
-                    for k, v in payload.items():
-                        setattr(obj, k, v)
-                    obj.save()
-                created += int(created_flag)
-                updated += int(not created_flag)
-
-            elif qtype == 'MULTI':
-                obj, created_flag = MultipleChoiceQuestion.objects.get_or_create(np=np_code, defaults=payload)
-                if not created_flag:
-                    for k, v in payload.items():
-                        setattr(obj, k, v)
-                    obj.save()
-                created += int(created_flag)
-                updated += int(not created_flag)
-
-            elif qtype == 'DRAG':
-                obj, created_flag = DragAndDropQuestion.objects.get_or_create(np=np_code, defaults=payload)
-                if not created_flag:
-                    for k, v in payload.items():
-                        setattr(obj, k, v)
-                    obj.save()
-                created += int(created_flag)
-                updated += int(not created_flag)
-
-        msg = f"✅ Cambios aplicados: {created} creadas, {updated} actualizadas"
-        return render(request, 'exam/upload_csv.html', {'form': CSVUploadForm(), 'success_message': msg})
+        batch = get_active_batch(request.POST.get('token', ''))
+        if batch is None:
+            return render(request, 'exam/upload_csv.html', {'form': CSVUploadForm(), 'error': 'La carga pendiente no existe o caducó. Vuelve a subir el CSV.'})
+        try:
+            report = apply_changes(iter_staged_changes(batch))
+        except Exception as e:
+            # La transacción se revirtió completa: el banco queda como estaba
+            return render(request, 'exam/upload_csv.html', {'form': CSVUploadForm(), 'error': f'Error aplicando los cambios: {str(e)}'})
+        batch.delete()
+
+        total_ms = sum(b['ms'] for b in report['batches'])
+        msg = f"✅ Cambios aplicados: {report['created']} creadas, {report['updated']} actualizadas ({len(report['batches'])} lotes en {total_ms:.0f} ms)"
+        return render(request, 'exam/upload_csv.html', {'form': CSVUploadForm(), 'success_message': msg, 'import_batches': report['batches']})
 
     # Subida/validación inicial del CSV
     if request.method == 'POST' and request.FILES.get('csv_file'):
         csv_file = request.FILES['csv_file']
         try:
-            csv_content = csv_file.read().decode('utf-8')
-            validation_errors = validate_csv_content(csv_content)
+            # Una sola pasada en streaming: decodificar, validar, normalizar y comparar
+            validation_errors = []
+            rows = parse_csv_rows(iter_csv_lines(csv_file.chunks()), validation_errors)
+            batch = stage_changes(rows)
             if validation_errors:
+                batch.delete()
                 return render(request, 'exam/upload_csv.html', {'form': CSVUploadForm(), 'validation_errors': validation_errors})
 
-            reader = csv.DictReader(io.StringIO(csv_content), quotechar='"')
-            proposed_changes = []  # lista de {row, np, question_type, action, diff, new}
-
-            for idx, row in enumerate(reader, start=2):  # empieza en 2 por cabecera
-                qtype = row['question_type'].strip().upper()
-                answer_raw = row['Answer'].strip()
-                has_image = row.get('Image', '0').strip() == '1'
-                np_code = row.get('NP', '').strip()  # <-- clave
-
-                # Derivar image_filename
-                image_filename = None
-                if has_image:
-                    if 'ImageFile' in row and row['ImageFile'].strip():
-                        image_filename = row['ImageFile'].strip()
-                    elif np_code:
-                        image_filename = f"{np_code.replace('Q','')}.png"
-
-                # Normalizar opciones
-                opt = {
-                    'A': row['OptionA'],
-                    'B': row['OptionB'],
-                    'C': row['OptionC'],
-                    'D': row['OptionD'],
-                    'E': row.get('OptionE', '')
-                }
-
-                # Construir payload "new" homogéneo según tipo
-                if qtype == 'SINGLE':
-                    payload = {
-                        'np': np_code,
-                        'text': row['Question'],
-                        'option_a': opt['A'],
-                        'option_b': opt['B'],
-                        'option_c': opt['C'],
-                        'option_d': opt['D'],
-                        'option_e': opt.get('E', ''),
-                        'answer': opt[answer_raw],  # letra -> texto
-                        'has_image': has_image,
-                        'image_filename': image_filename
-                    }
-                    try:
-                        obj = SingleChoiceQuestion.objects.get(np=np_code)
-                        action, diff = _diff_model(obj, payload, fields=[
-                            'text','option_a','option_b','option_c','option_d','option_e','answer','has_image','image_filename'
-                        ])
-                    except SingleChoiceQuestion.DoesNotExist:
-                        obj = None
-                        action, diff = 'CREATE', payload  # todo el payload
-
-                elif qtype == 'MULTI':
-                    letters = [x.strip() for x in answer_raw.split('-')]
-                    answer_texts = [opt[l] for l in letters if l in opt]
-                    payload = {
-                        'np': np_code,
-                        'text': row['Question'],
-                        'option_a': opt['A'],
-                        'option_b': opt['B'],
-                        'option_c': opt['C'],
-                        'option_d': opt['D'],
-                        'option_e': opt.get('E', ''),
-                        'answer': '-'.join(answer_texts),
-                        'has_image': has_image,
-                        'image_filename': image_filename
-                    }
-                    try:
-                        obj = MultipleChoiceQuestion.objects.get(np=np_code)
-                        action, diff = _diff_model(obj, payload, fields=[
-                            'text','option_a','option_b','option_c','option_d','option_e','answer','has_image','image_filename'
-                        ])
-                    except MultipleChoiceQuestion.DoesNotExist:
-                        obj = None
-                        action, diff = 'CREATE', payload
-
-                elif qtype == 'DRAG':
-                    options = json.loads(row['OptionA'])
-                    correct_answers = json.loads(row['Answer'])
-                    payload = {
-                        'np': np_code,
-                        'text': row['Question'],
-                        'options': options,
-                        'correct_answers': correct_answers,
-                        'has_image': has_image,
-                        'image_filename': image_filename
-                    }
-                    try:
-                        obj = DragAndDropQuestion.objects.get(np=np_code)
-                        action, diff = _diff_model(obj, payload, fields=[
-                            'text','options','correct_answers','has_image','image_filename'
-                        ])
-                    except DragAndDropQuestion.DoesNotExist:
-                        obj = None
-                        action, diff = 'CREATE', payload
-                else:
-                    continue  # tipo no válido, ya lo filtró validate
-
-                if action in ('CREATE','UPDATE'):
-                    proposed_changes.append({
-                        'row': idx,
-                        'np': np_code,
-                        'question_type': qtype,
-                        'action': action,
-                        'diff': diff,   # en UPDATE: {campo: {"old":..., "new":...}}
-                        'new': payload  # para aplicar si confirman
-                    })
-
-            # Mostrar pantalla de confirmación
-            return render(request, 'exam/upload_csv.html', {
-                'form': CSVUploadForm(),
-                'proposed_changes': proposed_changes,
-                'pending_confirmation': True,
-                'proposed_changes_json': json.dumps(proposed_changes, ensure_ascii=False)
-            })
+            # Los cambios quedan en el servidor; la confirmación se pagina por token
+            return redirect(f"{reverse('upload_csv')}?token={batch.token}")
 
         except Exception as e:
             return render(request, 'exam/upload_csv.html', {'form': CSVUploadForm(), 'error': f'Error procesando el archivo CSV: {str(e)}'})
 
+    # Pantalla de confirmación paginada de una carga pendiente
+    if request.GET.get('token'):
+        batch = get_active_batch(request.GET['token'])
+        if batch is None:
+            return render(request, 'exam/upload_csv.html', {'form': CSVUploadForm(), 'error': 'La carga pendiente no existe o caducó. Vuelve a subir el CSV.'})
+
+        counts = dict(batch.changes.values_list('action').annotate(n=Count('id')))
+        paginator = Paginator(batch.changes.order_by('row'), settings.CSV_PREVIEW_PAGE_SIZE)
+        return render(request, 'exam/upload_csv.html', {
+            'form': CSVUploadForm(),
+            'pending_confirmation': True,
+            'import_token': batch.token,
+            'page_obj': paginator.get_page(request.GET.get('page')),
+            'pending_creates': counts.get('CREATE', 0),
+            'pending_updates': counts.get('UPDATE', 0),
+        })
+
     # GET o sin archivo
     return render(request, 'exam/upload_csv.html', {'form': CSVUploadForm()})
 
-def _diff_model(obj, payload, fields):
-    """Compara obj vs payload y devuelve ('UPDATE', diff) o ('SKIP', {})"""
-    if obj is None:
-        return 'CREATE', payload
-    diff = {}
-    for f in fields:
-        old = getattr(obj, f)
-        new = payload[f]
-        if old != new:
-            diff[f] = {"old": old, "new": new}
-    return ('UPDATE', diff) if diff else ('SKIP', {})
-
-def validate_csv_content(csv_content):
-    """Valida el contenido del CSV antes de cargarlo"""
-    errors = []
-    
-    try:
-        reader = csv.DictReader(io.StringIO(csv_content), quotechar='"')
-        
-        # Verificar columnas requeridas básicas
-        required_columns = ['Question', 'OptionA', 'OptionB', 'OptionC', 'OptionD', 'Answer', 'question_type', 'Image']
-        missing_columns = [col for col in required_columns if col not in reader.fieldnames]
-        
-        if missing_columns:
-            errors.append(f"❌ Columnas faltantes: {', '.join(missing_columns)}")
-            return errors
-        
-        # Verificar si hay columna ImageFile para nombres personalizados
-        has_imagefile_column = 'ImageFile' in reader.fieldnames
-        has_np_column = 'NP' in reader.fieldnames
-        
-        if not has_imagefile_column and not has_np_column:
-            errors.append("❌ Se requiere al menos una columna 'ImageFile' (nombre del archivo) o 'NP' (número de pregunta)")
-            return errors
-        
-        # Validar cada fila
-        row_number = 1
-        for row in reader:
-            row_number += 1
-            row_errors = []
-            
-            # Validar que no esté vacía la pregunta
-            if not row['Question'].strip():
-                row_errors.append("Pregunta vacía")
-            
-            # Validar question_type
-            question_type = row['question_type'].strip().upper()
-            if question_type not in ['SINGLE', 'MULTI', 'DRAG']:
-                row_errors.append(f"question_type inválido: '{question_type}' (debe ser SINGLE, MULTI o DRAG)")
-            
-            # Validar Image (debe ser 0 o 1)
-            image_value = row.get('Image', '').strip()
-            if image_value not in ['0', '1']:
-                row_errors.append(f"Image debe ser 0 o 1, encontrado: '{image_value}'")
-            
-            # Si tiene imagen, validar que haya nombre de archivo
-            if image_value == '1':
-                has_filename = False
-                if has_imagefile_column and row.get('ImageFile', '').strip():
-                    has_filename = True
-                elif has_np_column and row.get('NP', '').strip():
-                    has_filename = True
-                
-                if not has_filename:
-                    row_errors.append("Si Image=1, debe especificar ImageFile o NP para determinar el archivo")
-            
-            # Validar opciones básicas
-            if not row['OptionA'].strip():
-                row_errors.append("OptionA vacía")
-            if not row['OptionB'].strip():
-                row_errors.append("OptionB vacía")
-            if not row['OptionC'].strip():
-                row_errors.append("OptionC vacía")
-            if not row['OptionD'].strip():
-                row_errors.append("OptionD vacía")
-            
-            # Validar Answer según el tipo
-            answer = row['Answer'].strip()
-            if question_type == 'SINGLE':
-                if answer not in ['A', 'B', 'C', 'D', 'E']:
-                    row_errors.append(f"Answer inválido para SINGLE: '{answer}' (debe ser A, B, C, D o E)")
-            
-            elif question_type == 'MULTI':
-                if '-' not in answer:
-                    row_errors.append(f"Answer inválido para MULTI: '{answer}' (debe tener formato A-B-C)")
-                else:
-                    answer_letters = answer.split('-')
-                    for letter in answer_letters:
-                        if letter.strip() not in ['A', 'B', 'C', 'D', 'E']:
-                            row_errors.append(f"Letra inválida en MULTI: '{letter}' (debe ser A, B, C, D o E)")
-            
-            elif question_type == 'DRAG':
-                try:
-                    json.loads(row['OptionA'])
-                    json.loads(row['Answer'])
-                except json.JSONDecodeError:
-                    row_errors.append("DRAG requiere JSON válido en OptionA y Answer")
-            
-            # Si hay errores en esta fila, agregarlos
-            if row_errors:
-                errors.append(f"🔴 Línea {row_number}: {'; '.join(row_errors)}")
-        
-        # Límite de errores mostrados
-        if len(errors) > 10:
-            errors = errors[:10]
-            errors.append("... (más errores omitidos)")
-            
-    except Exception as e:
-        errors.append(f"❌ Error leyendo CSV: {str(e)}")
-    
-    return errors
-
+def _study_etag(request):
+    """
+    El contenido del modo estudio sólo depende del banco y de la semilla: mientras
+    la versión del banco no cambie, la misma URL produce la misma página.
+    """
+    seed = parse_seed(request.GET.get('seed'))
+    if seed is None:
+        return None  # sin semilla se redirige: no hay nada que validar
+    version, _ = bank_version.current()
+    return f"study-{version}-{seed}-{exam_size('study')}-{FRAGMENT_VERSION}"
+
+def _study_last_modified(request):
+    if parse_seed(request.GET.get('seed')) is None:
+        return None
+    return bank_version.last_modified(request)
+
+# no-cache: el navegador (y nginx) revalidan siempre, pero con If-None-Match
+# reciben un 304 sin que la página se vuelva a generar
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=_study_etag, last_modified_func=_study_last_modified)
 def study_mode(request):
     """
     Vista para el modo estudio - muestra preguntas con respuestas correctas
-    Compatible con tus modelos: SingleChoiceQuestion, MultipleChoiceQuestion, DragAndDropQuestion
+    (filas de QuestionReadModel, ver read_model.py)
     """
+    seed, response = _exam_seed(request)
+    if response:
+        return response
+
     try:
-        # Obtener preguntas de selección (como en tu selection_exam_view)
-        single_choice_questions = SingleChoiceQuestion.objects.all()
-        multiple_choice_questions = MultipleChoiceQuestion.objects.all()
-        
-        # Preparar datos para el template
-        questions_data = []
-        
-        # Procesar preguntas de selección única
-        for question in single_choice_questions:
-            # Determinar cuál opción es la correcta
-            correct_answers = []
-            option_mapping = {
-                'A': question.option_a,
-                'B': question.option_b,
-                'C': question.option_c,
-                'D': question.option_d,
-                'E': question.option_e if question.option_e else None
-            }
-            
-            # Encontrar la letra de la respuesta correcta
-            for letter, option_text in option_mapping.items():
-                if option_text == question.answer:
-                    correct_answers.append(letter)
-                    break
-            
-            questions_data.append({
-                'id': question.id,
-                'text': question.text,
-                'question_type': 'SINGLE',
-                'option_a': question.option_a,
-                'option_b': question.option_b,
-                'option_c': question.option_c,
-                'option_d': question.option_d,
-                'option_e': question.option_e if question.option_e else None,
-                'correct_answers': correct_answers,
-                'explanation': getattr(question, 'explanation', None),
-                'has_image': getattr(question, 'has_image', False),
-                'image_path': question.image_path
-            })
-        
-        # Procesar preguntas de selección múltiple
-        for question in multiple_choice_questions:
-            # Las respuestas correctas están separadas por "-"
-            correct_answer_texts = question.answer.split("-")
-            correct_answers = []
-            
-            option_mapping = {
-                'A': question.option_a,
-                'B': question.option_b,
-                'C': question.option_c,
-                'D': question.option_d,
-                'E': question.option_e if question.option_e else None
-            }
-            
-            # Encontrar las letras de las respuestas correctas
-            for letter, option_text in option_mapping.items():
-                if option_text in correct_answer_texts:
-                    correct_answers.append(letter)
-            
-            questions_data.append({
-                'id': question.id,
-                'text': question.text,
-                'question_type': 'MULTI',
-                'option_a': question.option_a,
-                'option_b': question.option_b,
-                'option_c': question.option_c,
-                'option_d': question.option_d,
-                'option_e': question.option_e if question.option_e else None,
-                'correct_answers': correct_answers,
-                'explanation': getattr(question, 'explanation', None),
-                'has_image': getattr(question, 'has_image', False),
-                'image_path': question.image_path
-            })
-        
-        # Mezclar preguntas aleatoriamente (como en tu vista original)
-        random.shuffle(questions_data)
+        # Muestra reproducible de preguntas de selección, ya en orden aleatorio;
+        # las filas del modelo de lectura traen las letras correctas y las opciones
+        questions = build_exam('study', seed)
         
         context = {
-            'questions': questions_data,
-            'total_questions': len(questions_data),
-            'mode': 'study'
+            'questions': questions,
+            'question_fragments': render_fragments('study', questions),
+            'total_questions': len(questions),
+            'mode': 'study',
+            'seed': seed
         }
         
         return render(request, 'exam/study_exam.html', context)
@@ -508,51 +224,237 @@ def practice_exam_view(request):
     """
     Modo práctica: preguntas con verificación inmediata vía AJAX.
     """
-    single_choice_questions = SingleChoiceQuestion.objects.all()
-    multiple_choice_questions = MultipleChoiceQuestion.objects.all()
-
-    def build_image_fields(q):
-        # intenta usar la propiedad del modelo; si no, cae al FileField .url
-        path = getattr(q, "image_path", None) or getattr(getattr(q, "image", None), "url", None)
-        return bool(path), path  # (has_image, image_path)
-
-    def build_options(q):
-        raw = [
-            ('A', q.option_a),
-            ('B', q.option_b),
-            ('C', q.option_c),
-            ('D', q.option_d),
-            ('E', getattr(q, "option_e", None)),
-        ]
-        # filtra las opciones vacías/None para evitar <div> vacíos
-        return [(k, v) for (k, v) in raw if v not in (None, "",)]
-
-    questions = []
-
-    for q in single_choice_questions:
-        has_image, image_path = build_image_fields(q)
-        questions.append({
-            'id': q.id,
-            'question_type': 'SINGLE',
-            'text': q.text,
-            'options': build_options(q),
-            'has_image': has_image,
-            'image_path': image_path,
-        })
+    seed, response = _exam_seed(request)
+    if response:
+        return response
+
+    # Sólo la primera página va en el HTML; el resto lo pide practice_exam.js a questions_api
+    page_size = settings.QUESTIONS_API_PAGE_SIZE
+    questions, total = exam_page('practice', seed, 0, page_size)
+
+    context = {
+        **_practice_context(request, questions),
+        'total_questions': total,
+        'next_cursor': encode_cursor(page_size) if page_size < total else '',
+        'seed': seed,
+    }
+    return render(request, 'exam/practice_exam.html', context)
+
+def review_mode(request):
+    """
+    Modo repaso: sólo las preguntas que le tocan ahora a esta sesión según el
+    repaso espaciado (reviews.py), con la misma página que la práctica. Las
+    respuestas entran por check_answers_api y reprograman cada pregunta.
+    Sin ATTEMPT_LOG no se registra ningún intento, así que no hay repaso.
+    """
+    if not settings.ATTEMPT_LOG:
+        raise Http404('El modo repaso necesita ATTEMPT_LOG')
+    learner = reviews.learner_key(request.session)
+    questions = reviews.due_questions(learner, settings.REVIEW_BATCH_SIZE)
+    context = {
+        **_practice_context(request, questions),
+        'total_questions': len(questions),
+        'next_cursor': '',  # Todo el repaso va en la página
+        'mode': 'review',
+        'next_due': None if questions else reviews.next_due(learner),
+    }
+    return render(request, 'exam/practice_exam.html', context)
+
+def _practice_context(request, questions):
+    """Fragmentos de práctica de `questions` con el resumen de su respuesta para esta sesión"""
+    # Resumen firmado de la respuesta por pregunta para verificar en el navegador
+    # (ver answer_digests.py); va fuera del fragmento porque depende de la sesión
+    salt = session_salt(request.session) if settings.PRACTICE_CLIENT_VERIFY else None
+    digests = question_digests(salt, questions) if salt else {}
+    return {
+        'questions': questions,
+        'question_fragments': [
+            (q, fragment, digests.get(f'{q.question_type}:{q.question_id}', '')) for q, fragment in render_fragments('practice', questions)
+        ],
+        'answer_salt': salt or '',
+    }
+
+
+def _questions_api_params(request):
+    """(mode, seed, offset, limit) de la consulta; ValueError si algo no es válido"""
+    mode = request.GET.get('mode', 'practice')
+    if mode not in ('practice', 'selection'):
+        raise ValueError('mode inválido')
+    seed = parse_seed(request.GET.get('seed'))
+    if seed is None:
+        raise ValueError('seed inválida')
+    offset = decode_cursor(request.GET.get('cursor', ''))
+    limit = int(request.GET.get('limit') or settings.QUESTIONS_API_PAGE_SIZE)
+    if not 0 < limit <= settings.QUESTIONS_API_MAX_PAGE_SIZE:
+        raise ValueError('limit fuera de rango')
+    return mode, seed, offset, limit
+
+def _questions_api_etag(request):
+    # Una página sólo cambia si cambia el banco (los parámetros ya están en la URL)
+    try:
+        mode, seed, offset, limit = _questions_api_params(request)
+    except ValueError:
+        return None
+    version, _ = bank_version.current()
+    return f'questions-{version}-{mode}-{seed}-{exam_size(mode)}-{offset}-{limit}'
+
+@require_GET
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=_questions_api_etag, last_modified_func=bank_version.last_modified)
+def questions_api(request):
+    """
+    Página de preguntas de un examen sembrado, sin respuestas.
+    Parámetros: seed (obligatorio), mode ('practice' | 'selection'), cursor, limit.
+    Respuesta:
+      { total: int, next_cursor: str|null, questions: [{id, question_type, text, options,
+        image_path, image_width, image_height, image_sources}] }
+    """
+    try:
+        mode, seed, offset, limit = _questions_api_params(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(f'Error: {str(e)}')
 
-    for q in multiple_choice_questions:
-        has_image, image_path = build_image_fields(q)
-        questions.append({
-            'id': q.id,
-            'question_type': 'MULTI',
-            'text': q.text,
-            'options': build_options(q),
-            'has_image': has_image,
-            'image_path': image_path,
-        })
+    questions, total = exam_page(mode, seed, offset, limit)
+    next_offset = offset + limit
+    return JsonResponse({
+        'total': total,
+        'next_cursor': encode_cursor(next_offset) if next_offset < total else None,
+        'questions': [_question_json(q) for q in questions],
+    })
+
+def _question_json(q):
+    """Pregunta (QuestionReadModel) para las APIs JSON, sin respuestas"""
+    return {
+        'id': q.question_id,
+        'question_type': q.question_type,
+        'text': q.text,
+        'options': q.options,
+        'image_path': q.image_path,
+        'image_width': q.image_width,
+        'image_height': q.image_height,
+        'image_sources': q.image_sources,
+    }
+
+
+@require_GET
+def search_api(request):
+    """
+    Búsqueda de preguntas de selección por tema (texto y opciones), sin respuestas.
+    Parámetros: q (obligatorio), limit.
+    Respuesta: { query: str, results: [{id, question_type, text, options, image_path, ...}] }
+    """
+    query = request.GET.get('q', '').strip()
+    if not query or len(query) > settings.SEARCH_MAX_QUERY_LENGTH:
+        return HttpResponseBadRequest('Error: q vacío o demasiado largo')
+    try:
+        limit = int(request.GET.get('limit') or settings.QUESTIONS_API_PAGE_SIZE)
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= settings.QUESTIONS_API_MAX_PAGE_SIZE:
+        return HttpResponseBadRequest('Error: limit fuera de rango')
 
-    random.shuffle(questions)
-    return render(request, 'exam/practice_exam.html', {'questions': questions})
+    results = search_questions(query, EXAM_TYPES)[:limit]
+    return JsonResponse({'query': query, 'results': [_question_json(q) for q in results]})
+
+
+STATS_ORDERINGS = ('correct_rate', '-correct_rate', 'attempts', '-attempts')
+
+def _stats_watermark(request):
+    # @condition pide la ETag y la fecha por separado: una sola lectura por petición
+    if not hasattr(request, '_stats_watermark'):
+        request._stats_watermark = watermark()
+    return request._stats_watermark
+
+def _question_stats_etag(request):
+    # Los acumulados sólo cambian con cada rollup: su marca de agua es la versión
+    return f'stats-{_stats_watermark(request)[0]}'
+
+def _question_stats_last_modified(request):
+    return _stats_watermark(request)[1]
+
+@require_GET
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=_question_stats_etag, last_modified_func=_question_stats_last_modified)
+def question_stats_api(request):
+    """
+    Dificultad por pregunta desde el acumulado de rollup_attempts (no recorre los intentos).
+    Parámetros: question_type ('SINGLE' | 'MULTI'), order (correct_rate, -correct_rate,
+    attempts, -attempts; por defecto las más difíciles primero), min_attempts, limit.
+    Respuesta:
+      { updated_at: str|null, questions: [{id, question_type, np, attempts, correct,
+        correct_rate, picks: {letra: veces}}] }
+    """
+    qtype = request.GET.get('question_type', '').strip().upper()
+    order = request.GET.get('order', 'correct_rate')
+    try:
+        min_attempts = int(request.GET.get('min_attempts') or 1)
+        limit = int(request.GET.get('limit') or settings.QUESTIONS_API_PAGE_SIZE)
+    except ValueError:
+        return HttpResponseBadRequest('Error: min_attempts y limit deben ser enteros')
+    if (qtype and qtype not in ('SINGLE', 'MULTI')) or order not in STATS_ORDERINGS:
+        return HttpResponseBadRequest('Error: question_type u order inválido')
+    if not 0 < limit <= settings.QUESTIONS_API_MAX_PAGE_SIZE:
+        return HttpResponseBadRequest('Error: limit fuera de rango')
+
+    stats = QuestionStats.objects.filter(attempts__gte=min_attempts)
+    if qtype:
+        stats = stats.filter(question_type=qtype)
+    rows = list(stats.order_by(order, 'pk')[:limit])
+    updated_at = _stats_watermark(request)[1]
+    nps = {
+        (t, qid): np for t, qid, np in QuestionReadModel.objects.filter(
+            question_type__in={s.question_type for s in rows}, question_id__in=[s.question_id for s in rows],
+        ).values_list('question_type', 'question_id', 'np')
+    }
+    return JsonResponse({
+        'updated_at': updated_at.isoformat() if updated_at else None,
+        'questions': [{
+            'id': s.question_id,
+            'question_type': s.question_type,
+            'np': nps.get((s.question_type, s.question_id)),
+            'attempts': s.attempts,
+            'correct': s.correct_count,
+            'correct_rate': round(s.correct_rate, 4),
+            'picks': s.picks,
+        } for s in rows],
+    })
+
+
+def _answer_letters(qtype, answers):
+    """
+    Letras elegidas a partir de una lista de respuestas (se acepta también 'A,B').
+    SINGLE exige exactamente una letra válida; ValueError si no es válida.
+    """
+    letters = {part.strip().upper() for answer in answers for part in str(answer).split(',') if part.strip()}
+    if qtype == 'SINGLE':
+        if len(letters) != 1 or not letters <= set(LETTERS):
+            raise ValueError('Invalid answer for SINGLE')
+        return letters
+    letters &= set(LETTERS)
+    if not letters:
+        raise ValueError('Invalid answer list for MULTI')
+    return letters
+
+@require_GET
+@never_cache
+def answer_digests_api(request):
+    """
+    Resúmenes firmados de las respuestas de una página de práctica (mismos
+    parámetros que questions_api) para las preguntas que llegan por la API.
+    Respuesta: { digests: {'TIPO:question_id': hex} }. Privado: depende de la sesión.
+    """
+    try:
+        mode, seed, offset, limit = _questions_api_params(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(f'Error: {str(e)}')
+    if mode != 'practice' or not settings.PRACTICE_CLIENT_VERIFY:
+        return HttpResponseBadRequest('Error: sólo disponible en el modo práctica')
+
+    salt = request.session.get(ANSWER_SALT_KEY)
+    if salt is None:
+        return HttpResponseForbidden('Error: la sesión no tiene una práctica abierta')
+    questions, _ = exam_page(mode, seed, offset, limit)
+    return JsonResponse({'digests': question_digests(salt, questions)})
 
 
 @require_POST
@@ -573,74 +475,103 @@ def check_answer_api(request):
         if not qid or qtype not in ('SINGLE', 'MULTI'):
             return HttpResponseBadRequest('Invalid payload')
 
-        if qtype == 'SINGLE':
-            user_letter = (request.POST.get('answer', '') or '').strip().upper()
-            if user_letter not in ('A','B','C','D','E'):
-                return HttpResponseBadRequest('Invalid answer for SINGLE')
-
-            q = SingleChoiceQuestion.objects.get(id=qid)
-
-            option_mapping = {
-                'A': q.option_a,
-                'B': q.option_b,
-                'C': q.option_c,
-                'D': q.option_d,
-                'E': q.option_e
-            }
-            # Verdadero si el texto de la letra elegida coincide con la respuesta guardada
-            is_correct = (option_mapping.get(user_letter) == q.answer)
-
-            # Hallar la(s) letra(s) correcta(s) (en SINGLE será 1 letra)
-            correct_letters = []
-            for letter, text in option_mapping.items():
-                if text == q.answer:
-                    correct_letters.append(letter)
-                    break
-
-            return JsonResponse({
-                'correct': is_correct,
-                'correct_letters': correct_letters,
-                'explain': getattr(q, 'explanation', None)
-            })
-
-        elif qtype == 'MULTI':
-            # answer puede llegar como lista (JS) o como string 'A,B'
-            ans = request.POST.getlist('answer')
-            if not ans:
-                # intentar coma-separado
-                raw = (request.POST.get('answer', '') or '').strip()
-                ans = [x.strip().upper() for x in raw.split(',') if x.strip()]
-            user_letters = sorted({x for x in ans if x in ('A','B','C','D','E')})
-            if not user_letters:
-                return HttpResponseBadRequest('Invalid answer list for MULTI')
-
-            q = MultipleChoiceQuestion.objects.get(id=qid)
-
-            option_mapping = {
-                'A': q.option_a,
-                'B': q.option_b,
-                'C': q.option_c,
-                'D': q.option_d,
-                'E': q.option_e
-            }
-
-            # En tu almacenamiento, MultipleChoiceQuestion.answer es textos unidos por "-"
-            correct_texts = [t.strip() for t in q.answer.split('-') if t.strip()]
-            # Mapear letras correctas comparando textos
-            correct_letters = []
-            for letter, text in option_mapping.items():
-                if text and text in correct_texts:
-                    correct_letters.append(letter)
-            correct_letters = sorted(correct_letters)
-
-            is_correct = (sorted(user_letters) == correct_letters)
-
-            return JsonResponse({
-                'correct': is_correct,
-                'correct_letters': correct_letters,
-                'explain': getattr(q, 'explanation', None)
-            })
-
-    except (ValueError, SingleChoiceQuestion.DoesNotExist, MultipleChoiceQuestion.DoesNotExist) as e:
+        # answer puede llegar como lista (JS) o como string 'A,B'
+        try:
+            user_letters = _answer_letters(qtype, request.POST.getlist('answer'))
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+        # Clave precompilada en memoria: no toca la base de datos en caliente
+        correct_mask = get_answer_key(qtype, qid)
+        if correct_mask is None:
+            return HttpResponseBadRequest(f'Error: pregunta {qtype} {qid} no existe')
+
+        user_mask = letters_to_mask(user_letters)
+        attempts.record(request, 'CHECK', [(qtype, qid, user_mask, user_mask == correct_mask)])
+        return JsonResponse({
+            'correct': user_mask == correct_mask,
+            'correct_letters': mask_to_letters(correct_mask),
+            'explain': None
+        })
+
+    except ValueError as e:
         return HttpResponseBadRequest(f'Error: {str(e)}')
 
+
+
+def _parse_check_item(item):
+    """(question_id, question_type, letras) de un elemento del lote; ValueError si no es válido"""
+    if not isinstance(item, dict):
+        raise ValueError('Invalid payload')
+    try:
+        qid = int(item.get('question_id'))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid payload')
+    qtype = str(item.get('question_type') or '').strip().upper()
+    if not qid or qtype not in ('SINGLE', 'MULTI'):
+        raise ValueError('Invalid payload')
+    answer = item.get('answer')
+    return qid, qtype, _answer_letters(qtype, answer if isinstance(answer, list) else [answer or ''])
+
+@require_POST
+def check_answers_api(request):
+    """
+    Verificación en lote: practice_exam.js agrupa las respuestas que llegan seguidas
+    (o las que quedaron en cola sin conexión) en una sola petición.
+    Espera JSON:
+      { items: [{question_id, question_type, answer: 'B' | ['A','D']}] }
+    Respuesta, en el mismo orden que items:
+      { results: [{question_id, question_type, correct, correct_letters, explain}
+                  o {question_id, question_type, error}] }
+    Un elemento inválido sólo invalida su resultado, no el lote.
+    """
+    try:
+        items = json.loads(request.body)['items']
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest('Invalid payload')
+    if not isinstance(items, list) or not 0 < len(items) <= settings.CHECK_ANSWERS_MAX_ITEMS:
+        return HttpResponseBadRequest(f'Error: se esperan entre 1 y {settings.CHECK_ANSWERS_MAX_ITEMS} respuestas')
+
+    parsed = []
+    for item in items:
+        try:
+            parsed.append(_parse_check_item(item))
+        except ValueError as e:
+            parsed.append(e)
+
+    # Todas las claves de una vez (almacén en memoria, una carga por tipo si está frío)
+    valid = [entry for entry in parsed if not isinstance(entry, ValueError)]
+    keys = get_answer_keys([(qtype, qid) for qid, qtype, _ in valid])
+
+    results, graded = [], []
+    for item, entry in zip(items, parsed):
+        if isinstance(entry, ValueError):
+            ref = item if isinstance(item, dict) else {}
+            results.append({'question_id': ref.get('question_id'), 'question_type': ref.get('question_type'), 'error': str(entry)})
+            continue
+        qid, qtype, user_letters = entry
+        correct_mask = keys[(qtype, qid)]
+        if correct_mask is None:
+            results.append({'question_id': qid, 'question_type': qtype, 'error': f'pregunta {qtype} {qid} no existe'})
+            continue
+        user_mask = letters_to_mask(user_letters)
+        graded.append((qtype, qid, user_mask, user_mask == correct_mask))
+        results.append({
+            'question_id': qid,
+            'question_type': qtype,
+            'correct': user_mask == correct_mask,
+            'correct_letters': mask_to_letters(correct_mask),
+            'explain': None,
+        })
+    attempts.record(request, 'CHECK', graded)  # Sólo encola: no espera a la base
+    return JsonResponse({'results': results})
+
+
+@require_GET
+def metrics(request):
+    """Histogramas de instrumentation.py en formato Prometheus (sólo para METRICS_ALLOWED_IPS)"""
+    allowed = settings.METRICS_ALLOWED_IPS
+    if '*' not in allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden('Error: acceso no permitido')
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)